@@ -18,6 +18,7 @@ CREATE TABLE IF NOT EXISTS databases (
     id SERIAL PRIMARY KEY,
     server_id INT REFERENCES servers(id),
     name VARCHAR(100) NOT NULL,
+    modify_watermark TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -36,7 +37,16 @@ CREATE TABLE IF NOT EXISTS tables (
     id SERIAL PRIMARY KEY,
     schema_id INTEGER REFERENCES schemas(id) ON DELETE CASCADE,
     name VARCHAR(255) NOT NULL,
+    modify_date TIMESTAMP,
+    fingerprint VARCHAR(32),
+    -- size statistics from sys.dm_db_partition_stats / sys.indexes, refreshed by every sync
+    row_count BIGINT,
+    reserved_pages BIGINT,
+    used_pages BIGINT,
+    index_count INTEGER,
+    stats_updated_at TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP,
     UNIQUE(schema_id, name)
 );
 
@@ -53,9 +63,24 @@ CREATE TABLE IF NOT EXISTS columns (
     default_value TEXT,
     ordinal_position INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP,
     UNIQUE(table_id, name)
 );
 
+-- Foreign key edges: one row per column pair of a constraint
+CREATE TABLE IF NOT EXISTS foreign_keys (
+    id SERIAL PRIMARY KEY,
+    database_id INTEGER REFERENCES databases(id) ON DELETE CASCADE,
+    constraint_name VARCHAR(255) NOT NULL,
+    column_id INTEGER NOT NULL REFERENCES columns(id) ON DELETE CASCADE,
+    referenced_column_id INTEGER NOT NULL REFERENCES columns(id) ON DELETE CASCADE,
+    ordinal INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(column_id, constraint_name, ordinal)
+);
+CREATE INDEX IF NOT EXISTS foreign_keys_database_idx ON foreign_keys (database_id);
+CREATE INDEX IF NOT EXISTS foreign_keys_referenced_column_idx ON foreign_keys (referenced_column_id);
+
 -- ==============================
 -- Query Logs table
 -- ==============================
@@ -64,5 +89,55 @@ CREATE TABLE IF NOT EXISTS query_logs (
     query_text TEXT,
     target_scope JSONB,
     execution_time_ms INT,
+    status TEXT,
+    row_count INT,
+    cached BOOLEAN,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+CREATE INDEX IF NOT EXISTS query_logs_created_at_idx ON query_logs (created_at);
+
+-- Parent lookups of the listings and of /metadata/tree (tables and columns
+-- are covered by their UNIQUE constraints)
+CREATE INDEX IF NOT EXISTS databases_server_idx ON databases (server_id);
+CREATE INDEX IF NOT EXISTS schemas_database_idx ON schemas (database_id);
+
+-- ==============================
+-- Catalog state (single row)
+-- ==============================
+-- version is bumped by every sync that changes the catalog; API replicas
+-- use it to key their caches and ETags.
+CREATE TABLE IF NOT EXISTS catalog_state (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO catalog_state (id, version) VALUES (TRUE, 0) ON CONFLICT (id) DO NOTHING;
+
+-- ==============================
+-- Search indexes (/metadata/search)
+-- ==============================
+-- GiST trigram indexes serve the fuzzy name search as KNN scans
+-- (ORDER BY query <<-> name LIMIT n).
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS servers_name_trgm_idx ON servers USING gist (name gist_trgm_ops);
+CREATE INDEX IF NOT EXISTS databases_name_trgm_idx ON databases USING gist (name gist_trgm_ops);
+CREATE INDEX IF NOT EXISTS schemas_name_trgm_idx ON schemas USING gist (name gist_trgm_ops);
+CREATE INDEX IF NOT EXISTS tables_name_trgm_idx ON tables USING gist (name gist_trgm_ops);
+CREATE INDEX IF NOT EXISTS columns_name_trgm_idx ON columns USING gist (name gist_trgm_ops);
+
+-- ==============================
+-- Upgrades for existing metadata stores
+-- ==============================
+ALTER TABLE databases ADD COLUMN IF NOT EXISTS modify_watermark TIMESTAMP;
+ALTER TABLE tables ADD COLUMN IF NOT EXISTS modify_date TIMESTAMP;
+ALTER TABLE tables ADD COLUMN IF NOT EXISTS fingerprint VARCHAR(32);
+ALTER TABLE tables ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+ALTER TABLE tables ADD COLUMN IF NOT EXISTS row_count BIGINT;
+ALTER TABLE tables ADD COLUMN IF NOT EXISTS reserved_pages BIGINT;
+ALTER TABLE tables ADD COLUMN IF NOT EXISTS used_pages BIGINT;
+ALTER TABLE tables ADD COLUMN IF NOT EXISTS index_count INTEGER;
+ALTER TABLE tables ADD COLUMN IF NOT EXISTS stats_updated_at TIMESTAMP;
+ALTER TABLE columns ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+ALTER TABLE query_logs ADD COLUMN IF NOT EXISTS status TEXT;
+ALTER TABLE query_logs ADD COLUMN IF NOT EXISTS row_count INT;
+ALTER TABLE query_logs ADD COLUMN IF NOT EXISTS cached BOOLEAN;
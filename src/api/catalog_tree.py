@@ -0,0 +1,52 @@
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Query
+
+from config import settings
+from core.db.postgres_client import PostgresClient
+
+
+class TreeScope:
+    """
+    Query parameters of /metadata/tree: the subtree root (at most one of
+    server_id, database_id, schema_id, table_id; none for every server),
+    how many levels below it to include, and which column fields to return.
+    """
+
+    def __init__(
+        self,
+        server_id: Optional[int] = Query(None),
+        database_id: Optional[int] = Query(None),
+        schema_id: Optional[int] = Query(None),
+        table_id: Optional[int] = Query(None),
+        depth: Optional[int] = Query(None, ge=0, le=len(PostgresClient.TREE_LEVELS) - 1,
+                                     description="levels below the root (default: down to columns)"),
+        column_fields: Optional[List[str]] = Query(None, description="fields of column nodes (default: all)"),
+    ):
+        roots = [(level, node_id) for level, node_id in zip(PostgresClient.TREE_LEVELS,
+                                                             (server_id, database_id, schema_id, table_id))
+                 if node_id is not None]
+        if len(roots) > 1:
+            raise HTTPException(status_code=422, detail="Give at most one of server_id, database_id, schema_id, table_id")
+        self.root, self.root_id = roots[0] if roots else ("servers", None)
+        self.depth = depth
+        unknown = set(column_fields or ()) - set(PostgresClient.TREE_COLUMN_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown column field(s): {', '.join(sorted(unknown))}")
+        self.column_fields: Tuple[str, ...] = (tuple(dict.fromkeys(column_fields)) if column_fields
+                                               else PostgresClient.TREE_COLUMN_FIELDS)
+
+    @property
+    def key(self) -> tuple:
+        return (self.root, self.root_id, self.depth, self.column_fields)
+
+    def check_size(self, nodes: int):
+        """Refuse trees whose deepest level has more than METADATA_TREE_MAX_NODES nodes."""
+        if 0 < settings.METADATA_TREE_MAX_NODES < nodes:
+            raise HTTPException(status_code=422, detail=(
+                f"Tree has {nodes} nodes at its deepest level, more than the {settings.METADATA_TREE_MAX_NODES} "
+                f"allowed; choose a narrower root or a smaller depth"))
+
+    def check_found(self, tree: str):
+        if self.root_id is not None and tree == "[]":
+            raise HTTPException(status_code=404, detail=f"Unknown {self.root[:-1]} {self.root_id}")
@@ -0,0 +1,67 @@
+from typing import Any, Awaitable, Callable, Hashable
+
+import anyio
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+
+from core.cache.metadata_cache import metadata_cache
+
+
+def etag_for(version: int) -> str:
+    return f'"catalog-v{version}"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _response(request: Request, version: int, body: bytes = None) -> Response:
+    etag = etag_for(version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if body is None or _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cached_json(request: Request, endpoint: str, params: Hashable, producer: Callable[[], Any]) -> Response:
+    """
+    Serve a catalog read from the metadata cache with an ETag derived from
+    the catalog version. A matching If-None-Match gets a 304 without
+    touching the cache or the database.
+    """
+    version = metadata_cache.version.current()
+    if _not_modified(request, etag_for(version)):
+        return _response(request, version)
+    version, body = metadata_cache.get_or_build(endpoint, params, producer)
+    return _response(request, version, body)
+
+
+async def cached_json_async(request: Request, endpoint: str, params: Hashable,
+                            producer: Callable[[], Awaitable[Any]]) -> Response:
+    """Same as cached_json() for async handlers; `producer` is a coroutine function."""
+    version_source = metadata_cache.version
+    if version_source.is_stale():
+        version = await run_in_threadpool(version_source.current)
+    else:
+        version = version_source.current()
+    if _not_modified(request, etag_for(version)):
+        return _response(request, version)
+
+    body = metadata_cache.get(endpoint, params, version)
+    if body is None:
+        if metadata_cache.shared is None:
+            body = metadata_cache.serialize(await producer())
+        else:
+            # The Redis tier is blocking: run it off the event loop and hop
+            # back onto the loop only if this replica has to build the body.
+            body = await run_in_threadpool(
+                metadata_cache.fill, endpoint, params, version,
+                lambda: metadata_cache.serialize(anyio.from_thread.run(producer)),
+            )
+        metadata_cache.put(endpoint, params, version, body)
+    return _response(request, version, body)
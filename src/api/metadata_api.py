@@ -1,10 +1,16 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
-from typing import List, Dict, Any
+from functools import partial
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List, Dict, Any, Optional
 
 from core.db.postgres_client import PostgresClient
 from config import settings
-from init_metadata import sync_metadata
+from api.http_cache import cached_json
+from core.graph.relationships import RelationshipGraph, relationship_graphs
+from api.streaming import Page, ndjson_response
+from api.catalog_tree import TreeScope
+from core.cache.catalog_snapshot import catalog_snapshots
+from core.cache.catalog_version import catalog_version
 
 router = APIRouter(prefix="/metadata", tags=["Metadata"])
 
@@ -14,84 +20,183 @@ pg = PostgresClient(
     port=settings.POSTGRES_PORT,
     user=settings.POSTGRES_USER,
     password=settings.POSTGRES_PASSWORD,
-    dbname=settings.POSTGRES_DB
+    dbname=settings.POSTGRES_DB,
+    min_connections=settings.POSTGRES_POOL_MIN,
+    max_connections=settings.POSTGRES_POOL_MAX,
+    checkout_timeout=settings.POSTGRES_POOL_TIMEOUT,
+    validate_after=settings.POSTGRES_POOL_VALIDATE_AFTER,
 )
+catalog_version.set_loader(pg.get_catalog_version)
+
+
+def _list(request: Request, level: str, parent_id: Optional[int], page: Page, producer):
+    """
+    Serve one catalog listing as a cached JSON page or as a streamed NDJSON
+    body, from the mapped catalog snapshot when it is current.
+    """
+    snapshot = catalog_snapshots.get()
+    if page.streamed:
+        if snapshot is not None:
+            rows = snapshot.iter_rows(level, parent_id, page.after_id)
+        else:
+            rows = pg.iter_catalog(level, parent_id, page.after_id, settings.METADATA_STREAM_BATCH_SIZE)
+        return ndjson_response(rows, page.limit)
+    if snapshot is not None:
+        producer = partial(snapshot.rows, level, parent_id)
+    return cached_json(request, f"get_{level}", (parent_id,) + page.key,
+                             lambda: producer(limit=page.limit, after_id=page.after_id))
 
 
 @router.get("/servers", response_model=List[Dict[str, Any]])
-def get_servers():
-    """Return all registered servers."""
+def get_servers(request: Request, page: Page = Depends()):
+    """Return all registered servers (without their credentials)."""
     try:
-        return pg.get_servers()
+        return _list(request, "servers", None, page, partial(pg.get_servers, credentials=False))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/databases", response_model=List[Dict[str, Any]])
-def get_databases():
+def get_databases(request: Request, page: Page = Depends()):
     """Return all databases for a given server."""
     try:
-        return pg.get_databases()
+        return _list(request, "databases", None, page, pg.get_databases)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/servers/{server_id}/databases", response_model=List[Dict[str, Any]])
-def get_databases_for_server(server_id: int):
+def get_databases_for_server(request: Request, server_id: int, page: Page = Depends()):
     """Return all databases for a given server."""
     try:
-        return pg.get_databases(server_id)
+        return _list(request, "databases", server_id, page, partial(pg.get_databases, server_id))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/schemas", response_model=List[Dict[str, Any]])
-def get_schemas():
+def get_schemas(request: Request, page: Page = Depends()):
     """Return all schemas for a given database."""
     try:
-        return pg.get_schemas()
+        return _list(request, "schemas", None, page, pg.get_schemas)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/databases/{database_id}/schemas", response_model=List[Dict[str, Any]])
-def get_schemas_for_database(database_id: int):
+def get_schemas_for_database(request: Request, database_id: int, page: Page = Depends()):
     """Return all schemas for a given database."""
     try:
-        return pg.get_schemas(database_id)
+        return _list(request, "schemas", database_id, page, partial(pg.get_schemas, database_id))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/tables", response_model=List[Dict[str, Any]])
-def get_tables():
+def get_tables(request: Request, page: Page = Depends()):
     """Return all tables for a given schema."""
     try:
-        return pg.get_tables()
+        return _list(request, "tables", None, page, pg.get_tables)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/schemas/{schema_id}/tables", response_model=List[Dict[str, Any]])
-def get_tables_for_schema(schema_id: int):
+def get_tables_for_schema(request: Request, schema_id: int, page: Page = Depends()):
     """Return all tables for a given schema."""
     try:
-        return pg.get_tables(schema_id)
+        return _list(request, "tables", schema_id, page, partial(pg.get_tables, schema_id))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/columns", response_model=List[Dict[str, Any]])
+def get_all_columns(request: Request, page: Page = Depends()):
+    """Return all columns of every table."""
+    try:
+        return _list(request, "columns", None, page, pg.get_columns)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/tables/{table_id}/columns", response_model=List[Dict[str, Any]])
-def get_columns(table_id: int):
+def get_columns(request: Request, table_id: int, page: Page = Depends()):
     """Return all columns for a given table."""
     try:
-        return pg.get_columns(table_id)
+        return _list(request, "columns", table_id, page, partial(pg.get_columns, table_id))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/resync", response_model=List[Dict[str, Any]])
-def get_columns():
-    """Return all columns for a given table."""
+@router.get("/tree", response_model=List[Dict[str, Any]])
+def get_tree(request: Request, scope: TreeScope = Depends()):
+    """
+    Return the catalog below a server, database, schema or table (or below
+    every server) as one nested document, built by Postgres in a single
+    statement. Trees over METADATA_TREE_MAX_NODES nodes are refused.
+    """
+    def build():
+        scope.check_size(pg.get_tree_size(scope.root, scope.root_id, scope.depth))
+        tree = pg.get_tree(scope.root, scope.root_id, scope.depth, scope.column_fields)
+        scope.check_found(tree)
+        return tree.encode()
     try:
-        res, msgs = sync_metadata()
-        if res:
-            return JSONResponse(content={"message": "Resync completed successfully"}, status_code=200)
-        else:
-            return JSONResponse(content={"message": f"Resync completed with warnings : \n {msgs}"}, status_code=304)
+        return cached_json(request, "get_tree", scope.key, build)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/search", response_model=List[Dict[str, Any]])
+def search(
+    request: Request,
+    q: str = Query(..., min_length=2, max_length=200),
+    kind: Optional[List[str]] = Query(None, description="server, database, schema, table and/or column"),
+    data_type: Optional[str] = Query(None, description="ILIKE pattern; restricts the search to columns"),
+    limit: int = Query(20, ge=1, le=200),
+    min_score: float = Query(0.3, ge=0, le=1),
+):
+    """Ranked fuzzy search over catalog names, returning `server.db.schema.table.column` paths."""
+    unknown = set(kind or ()) - set(PostgresClient.SEARCH_KINDS)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown kind(s): {', '.join(sorted(unknown))}")
+    try:
+        params = (q, tuple(sorted(kind or ())), data_type, limit, min_score)
+        return cached_json(request, "search", params,
+                             lambda: pg.search(q, kind, data_type, limit=limit, min_score=min_score))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _relationship_graph(table_id: int) -> RelationshipGraph:
+    database_id = pg.get_table_database_id(table_id)
+    if database_id is None:
+        raise HTTPException(status_code=404, detail=f"Unknown table {table_id}")
+    return relationship_graphs.get(database_id, pg.get_relationship_edges)
+
+
+@router.get("/tables/{table_id}/relationships", response_model=List[Dict[str, Any]])
+def get_table_relationships(request: Request, table_id: int):
+    """Return the tables joined to a table by foreign keys, in both directions."""
+    try:
+        return cached_json(request, "get_relationships", (table_id,),
+                           lambda: _relationship_graph(table_id).neighbours(table_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/tables/{table_id}/join-paths", response_model=List[Dict[str, Any]])
+def get_join_paths(
+    request: Request,
+    table_id: int,
+    to: int = Query(..., description="id of the table to join to"),
+    max_hops: int = Query(4, ge=1, le=8),
+    limit: int = Query(5, ge=1, le=50),
+):
+    """Return the shortest foreign key join paths between two tables of the same database."""
+    def build():
+        graph = _relationship_graph(table_id)
+        if pg.get_table_database_id(to) != graph.database_id:
+            return []
+        return [{"hops": len(steps), "steps": steps}
+                for steps in graph.join_paths(table_id, to, max_hops=max_hops, limit=limit)]
+    try:
+        return cached_json(request, "get_join_paths", (table_id, to, max_hops, limit), build)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
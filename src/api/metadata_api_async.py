@@ -0,0 +1,205 @@
+from functools import partial
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Dict, Any, Optional
+
+from core.db.async_postgres_client import AsyncPostgresClient
+from core.db.postgres_client import PostgresClient
+from config import settings
+from api.http_cache import cached_json_async
+from core.graph.relationships import RelationshipGraph, relationship_graphs
+from api.streaming import Page, ndjson_response, ndjson_response_async
+from api.catalog_tree import TreeScope
+from core.cache.catalog_snapshot import catalog_snapshots
+
+# Same endpoints as api.metadata_api, served by `async def` handlers over
+# asyncpg. Selected with METADATA_API_BACKEND=async.
+router = APIRouter(prefix="/metadata", tags=["Metadata"])
+
+apg = AsyncPostgresClient(
+    host=settings.POSTGRES_HOST,
+    port=settings.POSTGRES_PORT,
+    user=settings.POSTGRES_USER,
+    password=settings.POSTGRES_PASSWORD,
+    dbname=settings.POSTGRES_DB,
+    min_size=settings.POSTGRES_POOL_MIN,
+    max_size=settings.POSTGRES_POOL_MAX,
+)
+
+
+async def _list(request: Request, level: str, parent_id: Optional[int], page: Page, producer):
+    """
+    Serve one catalog listing as a cached JSON page or as a streamed NDJSON
+    body, from the mapped catalog snapshot when it is current.
+    """
+    if catalog_snapshots.version.is_stale():
+        snapshot = await run_in_threadpool(catalog_snapshots.get)
+    else:
+        snapshot = catalog_snapshots.get()
+    if snapshot is not None:
+        if page.streamed:
+            # A plain iterator: StreamingResponse runs it on the threadpool.
+            return ndjson_response(snapshot.iter_rows(level, parent_id, page.after_id), page.limit)
+        producer = partial(run_in_threadpool, snapshot.rows, level, parent_id)
+    elif page.streamed:
+        rows = apg.iter_catalog(level, parent_id, page.after_id, settings.METADATA_STREAM_BATCH_SIZE)
+        return ndjson_response_async(rows, page.limit)
+    return await cached_json_async(request, f"get_{level}", (parent_id,) + page.key,
+                                   lambda: producer(limit=page.limit, after_id=page.after_id))
+
+
+@router.get("/servers", response_model=List[Dict[str, Any]])
+async def get_servers(request: Request, page: Page = Depends()):
+    """Return all registered servers (without their credentials)."""
+    try:
+        return await _list(request, "servers", None, page, partial(apg.get_servers, credentials=False))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/databases", response_model=List[Dict[str, Any]])
+async def get_databases(request: Request, page: Page = Depends()):
+    """Return all databases for a given server."""
+    try:
+        return await _list(request, "databases", None, page, apg.get_databases)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/servers/{server_id}/databases", response_model=List[Dict[str, Any]])
+async def get_databases_for_server(request: Request, server_id: int, page: Page = Depends()):
+    """Return all databases for a given server."""
+    try:
+        return await _list(request, "databases", server_id, page, partial(apg.get_databases, server_id))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/schemas", response_model=List[Dict[str, Any]])
+async def get_schemas(request: Request, page: Page = Depends()):
+    """Return all schemas for a given database."""
+    try:
+        return await _list(request, "schemas", None, page, apg.get_schemas)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/databases/{database_id}/schemas", response_model=List[Dict[str, Any]])
+async def get_schemas_for_database(request: Request, database_id: int, page: Page = Depends()):
+    """Return all schemas for a given database."""
+    try:
+        return await _list(request, "schemas", database_id, page, partial(apg.get_schemas, database_id))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/tables", response_model=List[Dict[str, Any]])
+async def get_tables(request: Request, page: Page = Depends()):
+    """Return all tables for a given schema."""
+    try:
+        return await _list(request, "tables", None, page, apg.get_tables)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/schemas/{schema_id}/tables", response_model=List[Dict[str, Any]])
+async def get_tables_for_schema(request: Request, schema_id: int, page: Page = Depends()):
+    """Return all tables for a given schema."""
+    try:
+        return await _list(request, "tables", schema_id, page, partial(apg.get_tables, schema_id))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/columns", response_model=List[Dict[str, Any]])
+async def get_all_columns(request: Request, page: Page = Depends()):
+    """Return all columns of every table."""
+    try:
+        return await _list(request, "columns", None, page, apg.get_columns)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/tables/{table_id}/columns", response_model=List[Dict[str, Any]])
+async def get_columns(request: Request, table_id: int, page: Page = Depends()):
+    """Return all columns for a given table."""
+    try:
+        return await _list(request, "columns", table_id, page, partial(apg.get_columns, table_id))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/tree", response_model=List[Dict[str, Any]])
+async def get_tree(request: Request, scope: TreeScope = Depends()):
+    """
+    Return the catalog below a server, database, schema or table (or below
+    every server) as one nested document, built by Postgres in a single
+    statement. Trees over METADATA_TREE_MAX_NODES nodes are refused.
+    """
+    async def build():
+        scope.check_size(await apg.get_tree_size(scope.root, scope.root_id, scope.depth))
+        tree = await apg.get_tree(scope.root, scope.root_id, scope.depth, scope.column_fields)
+        scope.check_found(tree)
+        return tree.encode()
+    try:
+        return await cached_json_async(request, "get_tree", scope.key, build)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/search", response_model=List[Dict[str, Any]])
+async def search(
+    request: Request,
+    q: str = Query(..., min_length=2, max_length=200),
+    kind: Optional[List[str]] = Query(None, description="server, database, schema, table and/or column"),
+    data_type: Optional[str] = Query(None, description="ILIKE pattern; restricts the search to columns"),
+    limit: int = Query(20, ge=1, le=200),
+    min_score: float = Query(0.3, ge=0, le=1),
+):
+    """Ranked fuzzy search over catalog names, returning `server.db.schema.table.column` paths."""
+    unknown = set(kind or ()) - set(PostgresClient.SEARCH_KINDS)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown kind(s): {', '.join(sorted(unknown))}")
+    try:
+        params = (q, tuple(sorted(kind or ())), data_type, limit, min_score)
+        return await cached_json_async(request, "search", params,
+                                       lambda: apg.search(q, kind, data_type, limit=limit, min_score=min_score))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _relationship_graph(table_id: int) -> RelationshipGraph:
+    database_id = await apg.get_table_database_id(table_id)
+    if database_id is None:
+        raise HTTPException(status_code=404, detail=f"Unknown table {table_id}")
+    return await relationship_graphs.get_async(database_id, apg.get_relationship_edges)
+
+
+@router.get("/tables/{table_id}/relationships", response_model=List[Dict[str, Any]])
+async def get_table_relationships(request: Request, table_id: int):
+    """Return the tables joined to a table by foreign keys, in both directions."""
+    async def build():
+        return (await _relationship_graph(table_id)).neighbours(table_id)
+    try:
+        return await cached_json_async(request, "get_relationships", (table_id,), build)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/tables/{table_id}/join-paths", response_model=List[Dict[str, Any]])
+async def get_join_paths(
+    request: Request,
+    table_id: int,
+    to: int = Query(..., description="id of the table to join to"),
+    max_hops: int = Query(4, ge=1, le=8),
+    limit: int = Query(5, ge=1, le=50),
+):
+    """Return the shortest foreign key join paths between two tables of the same database."""
+    async def build():
+        graph = await _relationship_graph(table_id)
+        if await apg.get_table_database_id(to) != graph.database_id:
+            return []
+        return [{"hops": len(steps), "steps": steps}
+                for steps in graph.join_paths(table_id, to, max_hops=max_hops, limit=limit)]
+    try:
+        return await cached_json_async(request, "get_join_paths", (table_id, to, max_hops, limit), build)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
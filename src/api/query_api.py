@@ -0,0 +1,355 @@
+import asyncio
+import time
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+import anyio
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
+
+from api.metadata_api import pg
+from api.streaming import NDJSON_MEDIA_TYPE, ndjson_line
+from config import settings
+from core.cache.query_cache import query_cache
+from core.query.dispatcher import FanOutDispatcher, FanOutTarget
+from core.query.execution import QueryCancelledError, QueryError, QueryExecution, QueryTimeoutError
+from core.query.query_log import QueryLogRecord, QueryLogWriter
+from core.query.readonly import ReadOnlyViolationError, ensure_read_only
+from core.query.scan_guard import LargeScanError, guard_scan, scan_shape
+from core.utils.circuit_breaker import CircuitOpenError
+
+router = APIRouter(prefix="/query", tags=["Query"])
+
+# Started and flushed by the app lifespan.
+query_log = QueryLogWriter(
+    pg.insert_query_logs,
+    capacity=settings.QUERY_LOG_BUFFER_SIZE,
+    batch_size=settings.QUERY_LOG_BATCH_SIZE,
+    flush_interval=settings.QUERY_LOG_FLUSH_INTERVAL,
+)
+
+
+class QueryRequest(BaseModel):
+    """A read-only statement and the database it runs in."""
+    statement: str = Field(..., min_length=1)
+    database_id: Optional[int] = Field(None, description="metadata id of the target database")
+    server_id: Optional[int] = Field(None, description="metadata id of the target server (with `database`)")
+    database: Optional[str] = Field(None, description="database name on `server_id`")
+    max_rows: Optional[int] = Field(None, ge=1, le=settings.QUERY_MAX_ROWS)
+    timeout: Optional[float] = Field(None, gt=0, le=settings.QUERY_MAX_TIMEOUT)
+    cache: bool = Field(True, description="serve from and store in the result cache (false: always run)")
+    cache_ttl: Optional[float] = Field(None, gt=0, le=settings.QUERY_CACHE_MAX_TTL,
+                                       description="seconds a stored result may be served")
+
+
+class FanOutScope(BaseModel):
+    """Which databases a fan-out statement runs on; every given criterion must match."""
+    server_ids: Optional[List[int]] = Field(None, description="only databases on these servers")
+    database_pattern: Optional[str] = Field(None, description="case-insensitive glob on the database name, e.g. tenant_*")
+    table: Optional[str] = Field(None, description="only databases containing this table (`name` or `schema.name`)")
+
+
+class FanOutRequest(BaseModel):
+    """A read-only statement run on every database of a scope, and how to merge the results."""
+    statement: str = Field(..., min_length=1)
+    scope: FanOutScope
+    merge: str = Field("concat", description="concat | merge | aggregate")
+    key: List[str] = Field([], description="merge: sort columns every target orders its rows by")
+    descending: bool = False
+    group_by: List[str] = Field([], description="aggregate: grouping columns")
+    aggregates: Dict[str, str] = Field({}, description="aggregate: {column: sum|count|min|max}")
+    max_rows: Optional[int] = Field(None, ge=1, le=settings.QUERY_MAX_ROWS, description="per target")
+    timeout: Optional[float] = Field(None, gt=0, le=settings.QUERY_MAX_TIMEOUT, description="per target")
+
+
+def resolve_target(server_id: Optional[int], database_id: Optional[int],
+                   database: Optional[str]) -> Tuple[Dict[str, Any], str]:
+    """Return (server row, database name) for a query target, or raise a 4xx HTTPException."""
+    if database_id is not None:
+        row = pg.get_database(database_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail=f"Unknown database {database_id}")
+        if server_id is not None and server_id != row["server_id"]:
+            raise HTTPException(status_code=422, detail=f"Database {database_id} is not on server {server_id}")
+        server_id, database = row["server_id"], row["name"]
+    elif server_id is None or not database:
+        raise HTTPException(status_code=422, detail="Give either database_id, or server_id and database")
+
+    server = pg.get_server(server_id)
+    if server is None:
+        raise HTTPException(status_code=404, detail=f"Unknown server {server_id}")
+    return server, database
+
+
+def check_large_scan(statement: str, databases: List[Tuple[int, str]], max_rows: int) -> Tuple[int, Dict[str, str]]:
+    """
+    Apply the large-scan guard to a statement about to run on `databases`
+    ((server_id, name) pairs), using the table sizes recorded by the last
+    sync. Returns the row limit to use and the response headers to add;
+    raises LargeScanError if the statement must be refused.
+    """
+    if settings.QUERY_SCAN_GUARD_ROWS <= 0:
+        return max_rows, {}
+    shape = scan_shape(statement)
+    if shape.bounded or not shape.tables:
+        return max_rows, {}
+    sizes = pg.get_table_sizes(databases, [table for _, table in shape.tables])
+    max_rows, large = guard_scan(shape, sizes, settings.QUERY_SCAN_GUARD_ROWS, settings.QUERY_SCAN_AUTO_LIMIT,
+                                 max_rows)
+    return max_rows, ({"X-Scan-Limit": str(max_rows)} if large else {})
+
+
+def query_http_error(error: Exception) -> HTTPException:
+    """Map a failure raised before any row was sent to an HTTP status."""
+    if isinstance(error, (ReadOnlyViolationError, LargeScanError)):
+        return HTTPException(status_code=400, detail=str(error))
+    if isinstance(error, QueryTimeoutError):
+        return HTTPException(status_code=504, detail=str(error))
+    if isinstance(error, (CircuitOpenError, TimeoutError)):
+        return HTTPException(status_code=503, detail=str(error))
+    if isinstance(error, QueryError):
+        return HTTPException(status_code=400, detail=str(error))
+    return HTTPException(status_code=502, detail=str(error))
+
+
+def log_query(statement: str, scope: Dict[str, Any], status: str, elapsed_ms: float,
+              rows: int = 0, cached: bool = False):
+    """Queue a query_logs record (never blocks; see QueryLogWriter)."""
+    query_log.record(QueryLogRecord(statement, scope, int(elapsed_ms), status, rows, cached))
+
+
+def query_status(error: Exception) -> str:
+    if isinstance(error, (ReadOnlyViolationError, LargeScanError)):
+        return "rejected"
+    if isinstance(error, QueryTimeoutError):
+        return "timeout"
+    if isinstance(error, QueryCancelledError):
+        return "cancelled"
+    return "error"
+
+
+async def _fetch(execution: QueryExecution) -> List[tuple]:
+    """
+    Fetch the next batch on a worker thread. Unlike run_in_threadpool, the
+    await can be cancelled while the driver is blocked, and cancelling it
+    cancels the statement on the server right away.
+    """
+    future = asyncio.get_running_loop().run_in_executor(None, execution.fetch)
+    try:
+        return await future
+    except asyncio.CancelledError:
+        execution.cancel()
+        raise
+
+
+async def _stream(execution: QueryExecution, scope: Dict[str, Any],
+                  store: Optional[Callable[[bytes, Dict[str, Any]], None]] = None) -> AsyncIterator[bytes]:
+    """
+    NDJSON body: a {"columns": [...]} header, one JSON array per row, then a
+    {"done": true, ...} trailer (or {"error": ...} if the statement fails
+    mid-stream). Each batch is fetched on the threadpool; when the client
+    disconnects the pending fetch is cancelled on the server.
+
+    When `store` is given, the body of a complete result no larger than
+    QUERY_CACHE_MAX_ENTRY_BYTES is handed to it with its trailer. The run
+    is logged to query_logs under `scope` once the stream ends.
+    """
+    chunks: Optional[List[bytes]] = [] if store is not None else None
+    size = 0
+    status = "cancelled"
+    try:
+        chunk = ndjson_line({"columns": execution.columns})
+        while True:
+            if chunks is not None:
+                size += len(chunk)
+                if size <= query_cache.max_entry_bytes:
+                    chunks.append(chunk)
+                else:
+                    chunks = None  # too large to cache
+            yield chunk
+            rows = await _fetch(execution)
+            if not rows:
+                break
+            chunk = b"".join(ndjson_line(list(row)) for row in rows)
+        trailer = {
+            "done": True,
+            "rows": execution.row_count,
+            "truncated": execution.truncated,
+            "elapsed_ms": round(execution.elapsed_ms, 1),
+        }
+        if chunks is not None:
+            store(b"".join(chunks), trailer)
+        status = "ok"
+        yield ndjson_line(trailer)
+    except QueryCancelledError:
+        raise
+    except Exception as e:
+        status = query_status(e)
+        yield ndjson_line({"error": str(e), "rows": execution.row_count})
+    finally:
+        # Runs on disconnect too (the pending await is cancelled): abort the
+        # statement and give the connection back to the pool.
+        with anyio.CancelScope(shield=True):
+            await run_in_threadpool(execution.cancel)
+        log_query(execution.statement, scope, status, execution.elapsed_ms, execution.row_count)
+
+
+@router.post("")
+async def run_query(request: QueryRequest, cache_control: Optional[str] = Header(None)):
+    """
+    Run a read-only statement on one database and stream the rows back as
+    NDJSON. Rows are capped at `max_rows` and the run time at `timeout`
+    seconds, both enforced on the server.
+
+    Complete results are cached per database, normalized statement and
+    row limit; a cached answer has "cached": true in its trailer and an
+    X-Cache: HIT header. `"cache": false` or `Cache-Control: no-cache`
+    skips the cache.
+
+    A statement reading a table over QUERY_SCAN_GUARD_ROWS rows without
+    WHERE or TOP is capped at QUERY_SCAN_AUTO_LIMIT rows (X-Scan-Limit
+    header) or, if a row cap would not shorten the scan, refused.
+    """
+    started = time.monotonic()
+    max_rows = request.max_rows or settings.QUERY_DEFAULT_MAX_ROWS
+    use_cache = (request.cache and query_cache.enabled
+                 and "no-cache" not in (cache_control or "") and "no-store" not in (cache_control or ""))
+    scope = {"server_id": request.server_id, "database_id": request.database_id, "database": request.database}
+    try:
+        ensure_read_only(request.statement)
+        server, database = await run_in_threadpool(
+            resolve_target, request.server_id, request.database_id, request.database)
+        scope.update(server_id=server["id"], server=server["name"], database=database)
+        max_rows, headers = await run_in_threadpool(
+            check_large_scan, request.statement, [(server["id"], database)], max_rows)
+        store = None
+        if use_cache:
+            key = query_cache.key(server["id"], database, request.statement, max_rows)
+            cached = query_cache.get(key)
+            if cached is not None:
+                trailer = {**cached.trailer, "cached": True,
+                           "age_s": round(time.monotonic() - cached.stored_at, 1)}
+                log_query(request.statement, scope, "ok", (time.monotonic() - started) * 1000,
+                          cached.trailer.get("rows", 0), cached=True)
+                return Response(cached.body + ndjson_line(trailer), media_type=NDJSON_MEDIA_TYPE,
+                                headers={**headers, "X-Cache": "HIT"})
+            store = partial(query_cache.put, key, request.statement, ttl=request.cache_ttl)
+        execution = QueryExecution(
+            server,
+            database,
+            request.statement,
+            max_rows=max_rows,
+            timeout=request.timeout or settings.QUERY_DEFAULT_TIMEOUT,
+            batch_size=settings.QUERY_BATCH_SIZE,
+        )
+        # Execute before answering so that errors up to the first row get a real status code.
+        await run_in_threadpool(execution.start)
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_query(request.statement, scope, query_status(e), (time.monotonic() - started) * 1000)
+        raise query_http_error(e)
+    # The background task also releases the connection if the body was never iterated.
+    return StreamingResponse(_stream(execution, scope, store), media_type=NDJSON_MEDIA_TYPE,
+                             background=BackgroundTask(execution.cancel),
+                             headers={**headers, "X-Cache": "MISS" if use_cache else "BYPASS"})
+
+
+def resolve_fanout_targets(scope: FanOutScope) -> List[FanOutTarget]:
+    """Return the targets of a fan-out scope, or raise a 422 HTTPException."""
+    if not (scope.server_ids or scope.database_pattern or scope.table):
+        raise HTTPException(status_code=422, detail="Give at least one of server_ids, database_pattern or table")
+    databases = pg.resolve_databases(scope.server_ids, scope.database_pattern, scope.table)
+    if len(databases) > settings.FANOUT_MAX_TARGETS:
+        raise HTTPException(status_code=422, detail=(
+            f"Scope matches {len(databases)} databases, more than the {settings.FANOUT_MAX_TARGETS} allowed"))
+    servers = {server["id"]: server for server in pg.get_servers()} if databases else {}
+    return [
+        FanOutTarget(servers[row["server_id"]], row["database_id"], row["database"])
+        for row in databases if row["server_id"] in servers
+    ]
+
+
+async def _next_event(dispatcher: FanOutDispatcher, events: Iterator[Tuple[str, Any]]) -> Optional[Tuple[str, Any]]:
+    """Like _fetch: advance the dispatcher on a worker thread, cancelling every target if the await is cancelled."""
+    future = asyncio.get_running_loop().run_in_executor(None, next, events, None)
+    try:
+        return await future
+    except asyncio.CancelledError:
+        dispatcher.cancel()
+        raise
+
+
+async def _stream_fanout(dispatcher: FanOutDispatcher, scope: Dict[str, Any]) -> AsyncIterator[bytes]:
+    """
+    NDJSON body: a {"columns": [...]} header, one JSON array per row and a
+    {"done": true, ...} trailer with per-target statuses. Failed targets are
+    reported in the trailer instead of failing the stream.
+    """
+    events = dispatcher.run()
+    started = time.monotonic()
+    status, rows = "cancelled", 0
+    try:
+        while True:
+            event = await _next_event(dispatcher, events)
+            if event is None:
+                break
+            kind, payload = event
+            if kind == "columns":
+                yield ndjson_line({"columns": payload})
+            elif kind == "rows":
+                rows += len(payload)
+                yield b"".join(ndjson_line(list(row)) for row in payload)
+            else:
+                status = "ok" if not payload["failed"] else "partial"
+                yield ndjson_line({"done": True, **payload})
+    except QueryCancelledError:
+        raise
+    except Exception as e:
+        status = query_status(e)
+        yield ndjson_line({"error": str(e)})
+    finally:
+        with anyio.CancelScope(shield=True):
+            await run_in_threadpool(dispatcher.cancel)
+        log_query(dispatcher.statement, scope, status, (time.monotonic() - started) * 1000, rows)
+
+
+@router.post("/fanout")
+async def run_fanout(request: FanOutRequest):
+    """
+    Run a read-only statement on every database matching `scope` and stream
+    the merged rows back as NDJSON. In concat and merge mode each row starts
+    with its _server and _database. Row limit and timeout apply per target;
+    at most FANOUT_PER_SERVER targets run on one server at a time. The
+    large-scan guard of /query applies to the largest table over all targets.
+    """
+    try:
+        targets = await run_in_threadpool(resolve_fanout_targets, request.scope)
+        max_rows, headers = await run_in_threadpool(
+            check_large_scan, request.statement, [(t.server["id"], t.database) for t in targets],
+            request.max_rows or settings.QUERY_DEFAULT_MAX_ROWS)
+        dispatcher = FanOutDispatcher(
+            request.statement,
+            targets,
+            merge=request.merge,
+            key=request.key,
+            descending=request.descending,
+            group_by=request.group_by,
+            aggregates=request.aggregates,
+            per_server=settings.FANOUT_PER_SERVER,
+            max_workers=settings.FANOUT_MAX_WORKERS,
+            timeout=request.timeout or settings.QUERY_DEFAULT_TIMEOUT,
+            max_rows=max_rows,
+            batch_size=settings.QUERY_BATCH_SIZE,
+            queue_size=settings.FANOUT_QUEUE_SIZE,
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    scope = {**request.scope.model_dump(exclude_none=True), "merge": request.merge, "targets": len(targets)}
+    return StreamingResponse(_stream_fanout(dispatcher, scope), media_type=NDJSON_MEDIA_TYPE,
+                             background=BackgroundTask(dispatcher.cancel), headers=headers)
@@ -0,0 +1,88 @@
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+
+from api.metadata_api import pg
+from api.query_api import log_query, query_http_error, query_status
+from api.streaming import ndjson_line
+from config import settings
+from core.cache.query_cache import sample_cache
+from core.query.sampling import SampleError, plan_sample, run_sample
+
+# Served whichever METADATA_API_BACKEND is selected: like /query, sampling
+# runs on the source server and only needs the sync client for lookups.
+router = APIRouter(prefix="/metadata", tags=["Metadata"])
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+@router.get("/tables/{table_id}/sample")
+async def get_table_sample(
+    table_id: int,
+    rows: int = Query(settings.SAMPLE_DEFAULT_ROWS, ge=1, le=settings.SAMPLE_MAX_ROWS),
+    cache_control: Optional[str] = Header(None),
+):
+    """
+    Return a few rows of a table, reading as little of it as possible:
+    tables over SAMPLE_TABLESAMPLE_ROWS rows (per the last sync's
+    statistics) are read with TABLESAMPLE, smaller ones with TOP. Only the
+    catalog columns are selected; spatial, xml and binary large objects are
+    left out and long text is cut to SAMPLE_MAX_VALUE_LENGTH characters.
+
+    Samples are cached (X-Cache: HIT, with an Age header) until the table's
+    definition changes or SAMPLE_CACHE_TTL expires; `Cache-Control:
+    no-cache` takes a fresh one.
+    """
+    started = time.monotonic()
+    target = await run_in_threadpool(pg.get_sample_target, table_id)
+    if target is None:
+        raise HTTPException(status_code=404, detail=f"Unknown table {table_id}")
+    database = target["database"]
+    scope = {"server_id": target["id"], "server": target["name"], "database": database, "table_id": table_id}
+    use_cache = (sample_cache.enabled
+                 and "no-cache" not in (cache_control or "") and "no-store" not in (cache_control or ""))
+    key = (target["id"], database.lower(), ("sample", table_id), rows)
+    if use_cache:
+        cached = sample_cache.get(key)
+        if cached is not None:
+            log_query(cached.trailer["statement"], scope, "ok", (time.monotonic() - started) * 1000,
+                      cached.trailer["rows"], cached=True)
+            return Response(cached.body, media_type=JSON_MEDIA_TYPE,
+                            headers={"X-Cache": "HIT", "Age": str(int(time.monotonic() - cached.stored_at))})
+
+    plan = None
+    try:
+        columns = await run_in_threadpool(pg.get_columns, table_id)
+        plan = plan_sample(target["schema"], target["table"], columns, rows, target["row_count"],
+                           target["used_pages"], settings.SAMPLE_TABLESAMPLE_ROWS, settings.SAMPLE_MAX_VALUE_LENGTH)
+        plan, fetched = await run_in_threadpool(run_sample, target, database, plan, rows, settings.SAMPLE_TIMEOUT)
+    except SampleError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        if plan is None:
+            raise HTTPException(status_code=500, detail=str(e))
+        log_query(plan.statement, scope, query_status(e), (time.monotonic() - started) * 1000)
+        raise query_http_error(e)
+
+    body = ndjson_line({
+        "table_id": table_id,
+        "server": target["name"],
+        "database": database,
+        "schema": target["schema"],
+        "table": target["table"],
+        "row_count": target["row_count"],
+        "method": plan.method,
+        "percent": plan.percent,
+        "columns": plan.columns,
+        "omitted_columns": plan.omitted,
+        "rows": [list(row) for row in fetched],
+        "sampled_at": datetime.now(timezone.utc).isoformat(),
+    })
+    if use_cache:
+        sample_cache.put(key, plan.statement, body, {"rows": len(fetched), "statement": plan.statement})
+    log_query(plan.statement, scope, "ok", (time.monotonic() - started) * 1000, len(fetched))
+    return Response(body, media_type=JSON_MEDIA_TYPE, headers={"X-Cache": "MISS" if use_cache else "BYPASS"})
@@ -0,0 +1,66 @@
+from fastapi import APIRouter
+from typing import Dict, Any
+
+from api.metadata_api import pg
+from api.metadata_api_async import apg
+from api.query_api import query_log
+from config.settings import METADATA_API_BACKEND
+from core.cache.catalog_snapshot import catalog_snapshots
+from core.cache.metadata_cache import metadata_cache
+from core.cache.query_cache import query_cache, sample_cache
+from core.db.sqlserver_pool import connection_manager
+from core.graph.relationships import relationship_graphs
+from core.utils.metrics import metrics
+from core.utils.secrets_manager import secret_resolver
+from core.utils.startup import startup_profile
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+
+@router.get("/postgres", response_model=Dict[str, Any])
+def get_postgres_stats():
+    """Return metadata store connection pool statistics for the active backend."""
+    stats = apg.pool_stats() if METADATA_API_BACKEND == "async" else pg.pool_stats()
+    return {"backend": METADATA_API_BACKEND, **stats}
+
+
+@router.get("/sqlserver", response_model=Dict[str, Any])
+def get_sqlserver_stats():
+    """Return per-server SQL Server connection pool and circuit breaker statistics."""
+    return connection_manager.stats()
+
+
+@router.get("/cache", response_model=Dict[str, Any])
+def get_cache_stats():
+    """Return metadata response, query result and sample cache hit/miss counts and memory size, relationship graph sizes and the mapped catalog snapshot."""
+    return {
+        **metadata_cache.stats(),
+        "relationship_graphs": relationship_graphs.stats(),
+        "query_results": query_cache.stats(),
+        "samples": sample_cache.stats(),
+        "snapshot": catalog_snapshots.stats(),
+    }
+
+
+@router.get("/query-log", response_model=Dict[str, Any])
+def get_query_log_stats():
+    """Return query_logs writer counters: records buffered, written, and dropped under backpressure."""
+    return query_log.stats()
+
+
+@router.get("/latency", response_model=Dict[str, Any])
+def get_latency_stats():
+    """Return count, errors, mean and p50/p95/p99 (ms) of every instrumented operation, by label."""
+    return metrics.snapshot()
+
+
+@router.get("/startup", response_model=Dict[str, Any])
+def get_startup_stats():
+    """Return how long this process took to start, by step (imports, secret resolution, connections)."""
+    return startup_profile.snapshot()
+
+
+@router.get("/secrets", response_model=Dict[str, Any])
+def get_secret_stats():
+    """Return secret backend, cache size and lookup/round-trip/refresh counts (never secret values)."""
+    return secret_resolver.stats()
@@ -0,0 +1,71 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from fastapi import Query
+from fastapi.responses import StreamingResponse
+
+from config import settings
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+
+def ndjson_line(row: Any) -> bytes:
+    return json.dumps(row, default=_default, separators=(",", ":")).encode() + b"\n"
+
+
+def ndjson_response(rows: Iterator[Dict[str, Any]], limit: Optional[int] = None) -> StreamingResponse:
+    """Stream rows as newline-delimited JSON, one line per row, as they are produced."""
+    if limit is not None:
+        rows = islice(rows, limit)
+    return StreamingResponse((ndjson_line(row) for row in rows), media_type=NDJSON_MEDIA_TYPE)
+
+
+def ndjson_response_async(rows: AsyncIterator[Dict[str, Any]], limit: Optional[int] = None) -> StreamingResponse:
+    """ndjson_response() for async row iterators."""
+    async def lines():
+        sent = 0
+        async for row in rows:
+            if limit is not None and sent >= limit:
+                break
+            sent += 1
+            yield ndjson_line(row)
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+
+class Page:
+    """
+    Common query parameters of the list endpoints: keyset pagination
+    (`limit` rows with id greater than `after_id`) and the response format
+    (`json` array, or `ndjson` streamed from a server-side cursor).
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=settings.METADATA_PAGE_MAX),
+        after_id: Optional[int] = Query(None, ge=0),
+        format: str = Query("json", pattern="^(json|ndjson)$"),
+    ):
+        self.limit = limit
+        self.after_id = after_id
+        self.format = format
+
+    @property
+    def streamed(self) -> bool:
+        return self.format == "ndjson"
+
+    @property
+    def key(self) -> tuple:
+        return (self.limit, self.after_id)
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from typing import List, Dict, Any
+
+from init_metadata import sync_jobs
+
+# Background resync jobs. Triggers return immediately with a job id;
+# progress is polled from /metadata/resync/jobs/{job_id}.
+router = APIRouter(prefix="/metadata", tags=["Metadata"])
+
+
+@router.get("/resync", response_model=Dict[str, Any], status_code=202)
+@router.post("/resync", response_model=Dict[str, Any], status_code=202)
+def resync(request: Request, full: bool = False):
+    """
+    Start a background resync (only modified tables unless `full` is set).
+    If a sync is already running, its job is returned instead of starting
+    another one.
+    """
+    job, created = sync_jobs.submit(full=full, trigger="api")
+    body = {
+        "job_id": job.id,
+        "state": job.state,
+        "full": job.full,
+        "created": created,
+        "status_url": str(request.url_for("get_resync_job", job_id=job.id)),
+    }
+    return JSONResponse(content=body, status_code=202 if created else 200)
+
+
+@router.get("/resync/jobs", response_model=List[Dict[str, Any]])
+def list_resync_jobs():
+    """Return recent resync jobs, most recent first."""
+    return jsonable_encoder([job.to_dict() for job in sync_jobs.list()])
+
+
+@router.get("/resync/jobs/{job_id}", response_model=Dict[str, Any])
+def get_resync_job(job_id: str):
+    """Return the state and progress of one resync job."""
+    job = sync_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown resync job {job_id}")
+    return jsonable_encoder(job.to_dict())
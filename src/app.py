@@ -1,29 +1,82 @@
+from core.utils.startup import startup_profile  # first, so the profile covers every import below
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 import uvicorn
 
-from config.settings import MCP_SERVER_PORT, MCP_SERVER_HOST
+from config.settings import MCP_SERVER_PORT, MCP_SERVER_HOST, METADATA_API_BACKEND, SYNC_SCHEDULE_INTERVAL
 from api.metadata_api import router, pg
+from api.metadata_api_async import router as async_router, apg
+from api.stats_api import router as stats_router
+from api.sync_api import router as sync_router
+from api.query_api import router as query_router, query_log
+from api.sample_api import router as sample_router
+from api.metrics_api import router as metrics_router, MetricsMiddleware
+from core.cache.catalog_snapshot import catalog_snapshots
+from core.cache.metadata_cache import metadata_cache
+from core.db.sqlserver_pool import connection_manager
+from core.utils.secrets_manager import secret_resolver
+from init_metadata import sync_scheduler
 
-app = FastAPI()
-app.include_router(router)
+startup_profile.mark("imports")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage startup/shutdown lifecycle for resources."""
-    print("🚀 Connecting to PostgreSQL metadata store...")
+    if catalog_snapshots.enabled:
+        with startup_profile.step("snapshot.map"):
+            snapshot = catalog_snapshots.open()
+        if snapshot is not None:
+            print(f"✅ Serving catalog listings from snapshot v{snapshot.version} ({catalog_snapshots.path}).")
+
+    print(f"🚀 Connecting to PostgreSQL metadata store ({METADATA_API_BACKEND} backend)...")
     try:
-        pg.connect()
-        print("✅ PostgreSQL connected.")
+        with startup_profile.step("postgres.connect"):
+            if METADATA_API_BACKEND == "async":
+                await apg.connect()
+                print(f"✅ PostgreSQL async connection pool ready (max {apg.max_size} connections).")
+            else:
+                pg.connect()
+                print(f"✅ PostgreSQL connection pool ready (max {pg.max_connections} connections).")
     except Exception as e:
         print(f"❌ Failed to connect to PostgreSQL: {e}")
 
+    if metadata_cache.shared is not None:
+        with startup_profile.step("redis.listen"):
+            metadata_cache.shared.listen()
+        print("✅ Listening for catalog invalidations on Redis.")
+
+    if SYNC_SCHEDULE_INTERVAL > 0:
+        sync_scheduler.start()
+        print(f"✅ Metadata sync scheduled every ~{SYNC_SCHEDULE_INTERVAL:.0f}s.")
+
+    query_log.start()
+    startup_profile.log()
+
     yield  # ← FastAPI will handle requests during this block
 
-    print("🧹 Closing PostgreSQL connection...")
+    sync_scheduler.stop()
+    print("🧹 Flushing query logs...")
+    query_log.stop()
+    print("🧹 Closing PostgreSQL connection pool...")
+    await apg.close()
     pg.close()
-    print("✅ PostgreSQL connection closed.")
+    print("✅ PostgreSQL connection pool closed.")
+    connection_manager.close_all()
+    if metadata_cache.shared is not None:
+        metadata_cache.shared.stop()
+    secret_resolver.stop()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+# METADATA_API_BACKEND selects which implementation serves /metadata/*:
+# "sync" (psycopg2 on the threadpool) or "async" (asyncpg on the event loop).
+app.include_router(async_router if METADATA_API_BACKEND == "async" else router)
+app.include_router(sync_router)
+app.include_router(query_router)
+app.include_router(sample_router)
+app.include_router(stats_router)
+app.include_router(metrics_router)
 
 @app.get("/")
 def root():
@@ -0,0 +1,79 @@
+"""
+Compare two benchmark reports written by benchmarks.run.
+
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 10]
+
+Prints the headline numbers side by side with their relative change and
+exits with status 1 if any of them regressed by more than --threshold percent.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# (label, path into the report, True if higher is better)
+Metric = Tuple[str, Tuple[str, ...], bool]
+
+
+def metrics_of(report: Dict[str, Any]) -> Iterator[Metric]:
+    for run in ("full", "incremental"):
+        if run in report.get("sync", {}):
+            yield f"sync {run} tables/s", ("sync", run, "tables_per_s"), True
+            yield f"sync {run} wall s", ("sync", run, "wall_s"), False
+    for route in report.get("api", {}).get("endpoints", {}):
+        yield f"{route} p50 ms", ("api", "endpoints", route, "p50_ms"), False
+        yield f"{route} p99 ms", ("api", "endpoints", route, "p99_ms"), False
+        yield f"{route} rps", ("api", "endpoints", route, "rps"), True
+    yield "peak RSS MB", ("peak_rss_bytes",), False
+
+
+def lookup(report: Dict[str, Any], path: Tuple[str, ...]) -> Optional[float]:
+    value: Any = report
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    if path == ("peak_rss_bytes",):
+        value = value / (1024 * 1024)
+    return value
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> List[str]:
+    """Print the comparison; returns the labels of metrics that regressed beyond `threshold` percent."""
+    regressions = []
+    print(f"{'metric':<58} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for label, path, higher_is_better in metrics_of(baseline):
+        old, new = lookup(baseline, path), lookup(candidate, path)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        regressed = (-change if higher_is_better else change) > threshold
+        if regressed:
+            regressions.append(label)
+        print(f"{label:<58} {old:>12.2f} {new:>12.2f} {change:>+8.1f}%{'  !' if regressed else ''}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression, in percent")
+    args = parser.parse_args(argv)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    for name, report in (("baseline", baseline), ("candidate", candidate)):
+        print(f"{name}: {report.get('git_commit')} at {report.get('timestamp')}, spec {report.get('spec')}")
+    if baseline.get("spec") != candidate.get("spec") or baseline.get("latency") != candidate.get("latency"):
+        print("[WARN] The reports were produced with different catalog specs or latencies.")
+    regressions = compare(baseline, candidate, args.threshold)
+    if regressions:
+        print(f"[WARN] {len(regressions)} metric(s) regressed by more than {args.threshold:g}%")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
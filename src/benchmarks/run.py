@@ -0,0 +1,236 @@
+"""
+Benchmark the metadata sync and the /metadata API against a synthetic catalog.
+
+    python -m benchmarks.run --databases 20 --tables 200 --latency-ms 2 --output bench.json
+
+Syncs a synthetic catalog (served in-process by FakeSQLServer, with
+injected latency) into the configured metadata store, fully and then
+incrementally, then starts the API and drives each /metadata endpoint with
+concurrent requests. Writes one JSON report; compare two reports with
+`python -m benchmarks.compare`. Point POSTGRES_* at a scratch database:
+the synthetic servers are registered in it like real ones.
+"""
+import argparse
+import json
+import platform
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from benchmarks.synthetic import CatalogSpec, FakeSQLServer, Latency
+from core.db.sqlserver_pool import SQLServerConnectionManager
+from core.sync.progress import SyncProgress
+from core.utils.metrics import metrics
+from init_metadata import sync_metadata
+
+
+def peak_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024  # kilobytes on Linux
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_sync(spec: CatalogSpec, fake: FakeSQLServer, full: bool) -> Dict[str, Any]:
+    """One sync_metadata() run over the synthetic servers, with its progress snapshot."""
+    connections = SQLServerConnectionManager(client_factory=fake.client)
+    progress = SyncProgress()
+    calls_before = dict(fake.stats)
+    started = time.perf_counter()
+    try:
+        ok, errors = sync_metadata(full=full, progress=progress, servers=spec.server_configs(),
+                                   connections=connections)
+    finally:
+        connections.close_all()
+    elapsed = time.perf_counter() - started
+    snapshot = progress.snapshot()
+    return {
+        "ok": ok,
+        "errors": errors[:20],
+        "wall_s": round(elapsed, 3),
+        "tables": snapshot["tables"],
+        "tables_per_s": round(snapshot["tables"]["done"] / elapsed, 1) if elapsed else 0.0,
+        "changes": snapshot["changes"],
+        "time_spent_s": snapshot["time_spent_s"],
+        "slowest_databases": snapshot["slowest_databases"],
+        "sqlserver_calls": fake.stats["calls"] - calls_before["calls"],
+        "sqlserver_rows": fake.stats["rows"] - calls_before["rows"],
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+class ApiServer:
+    """The FastAPI app served by uvicorn on a background thread."""
+
+    def __init__(self):
+        import uvicorn
+        from app import app
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, name="bench-api", daemon=True)
+
+    def __enter__(self) -> "ApiServer":
+        self.thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("API server did not start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(30)
+
+    def get(self, path: str) -> bytes:
+        with urllib.request.urlopen(f"http://127.0.0.1:{self.port}{path}", timeout=60) as response:
+            return response.read()
+
+    def get_json(self, path: str) -> Any:
+        return json.loads(self.get(path))
+
+
+def api_endpoints(api: ApiServer, spec: CatalogSpec) -> Dict[str, str]:
+    """Route template -> concrete path, with ids of the synthetic catalog."""
+    server = next(s for s in api.get_json("/metadata/servers") if s["name"] == "bench_srv_0")
+    database = api.get_json(f"/metadata/servers/{server['id']}/databases")[0]
+    schema = api.get_json(f"/metadata/databases/{database['id']}/schemas")[0]
+    tables = api.get_json(f"/metadata/schemas/{schema['id']}/tables")
+    first, last = tables[0]["id"], tables[-1]["id"]
+    return {
+        "/metadata/servers": "/metadata/servers",
+        "/metadata/databases": "/metadata/databases?limit=500",
+        "/metadata/servers/{server_id}/databases": f"/metadata/servers/{server['id']}/databases",
+        "/metadata/databases/{database_id}/schemas": f"/metadata/databases/{database['id']}/schemas",
+        "/metadata/tables": "/metadata/tables?limit=500",
+        "/metadata/schemas/{schema_id}/tables": f"/metadata/schemas/{schema['id']}/tables",
+        "/metadata/tables/{table_id}/columns": f"/metadata/tables/{first}/columns",
+        "/metadata/columns": "/metadata/columns?limit=500",
+        "/metadata/search": f"/metadata/search?q=table_0_{spec.tables // 2}",
+        "/metadata/tables/{table_id}/relationships": f"/metadata/tables/{first}/relationships",
+        "/metadata/tables/{table_id}/join-paths": f"/metadata/tables/{first}/join-paths?to={last}",
+    }
+
+
+def load_endpoint(api: ApiServer, path: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    """`requests` GETs of `path` from `concurrency` threads: latency percentiles, throughput, errors."""
+    started = time.perf_counter()
+    api.get(path)
+    first_ms = (time.perf_counter() - started) * 1000
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    sizes: List[int] = []
+
+    def request():
+        began = time.perf_counter()
+        try:
+            sizes.append(len(api.get(path)))
+            latencies.append((time.perf_counter() - began) * 1000)
+        except Exception as e:
+            errors.append(str(e))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(requests):
+            pool.submit(request)
+    elapsed = time.perf_counter() - started
+    return {
+        "path": path,
+        "first_ms": round(first_ms, 3),
+        "requests": requests,
+        "errors": len(errors),
+        "sample_error": errors[0] if errors else None,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        **{f"p{int(q * 100)}_ms": round(percentile(latencies, q), 3) for q in (0.5, 0.95, 0.99)},
+        "response_bytes": max(sizes, default=0),
+    }
+
+
+def run_api(spec: CatalogSpec, requests: int, concurrency: int) -> Dict[str, Any]:
+    with ApiServer() as api:
+        endpoints = api_endpoints(api, spec)
+        results = {route: load_endpoint(api, path, requests, concurrency) for route, path in endpoints.items()}
+    return {"concurrency": concurrency, "requests_per_endpoint": requests, "endpoints": results,
+            "peak_rss_bytes": peak_rss_bytes()}
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--servers", type=int, default=CatalogSpec.servers)
+    parser.add_argument("--databases", type=int, default=CatalogSpec.databases, help="per server")
+    parser.add_argument("--schemas", type=int, default=CatalogSpec.schemas, help="per database")
+    parser.add_argument("--tables", type=int, default=CatalogSpec.tables, help="per schema")
+    parser.add_argument("--columns", type=int, default=CatalogSpec.columns, help="per table")
+    parser.add_argument("--fk-density", type=float, default=CatalogSpec.fk_density,
+                        help="fraction of tables with a foreign key")
+    parser.add_argument("--seed", type=int, default=CatalogSpec.seed)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="SQL Server round trip per query")
+    parser.add_argument("--row-latency-us", type=float, default=0.0, help="SQL Server cost per row fetched")
+    parser.add_argument("--jitter", type=float, default=0.0, help="relative latency jitter, e.g. 0.2")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--skip-sync", action="store_true", help="benchmark the API against the last sync")
+    parser.add_argument("--skip-api", action="store_true")
+    parser.add_argument("--output", default="benchmark.json", help="JSON report path")
+    args = parser.parse_args(argv)
+
+    spec = CatalogSpec(servers=args.servers, databases=args.databases, schemas=args.schemas, tables=args.tables,
+                       columns=args.columns, fk_density=args.fk_density, seed=args.seed)
+    latency = Latency(per_call=args.latency_ms / 1000, per_row=args.row_latency_us / 1_000_000, jitter=args.jitter)
+    fake = FakeSQLServer(spec, latency)
+
+    report: Dict[str, Any] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "spec": {**asdict(spec), "total_tables": spec.total_tables},
+        "latency": asdict(latency),
+    }
+    if not args.skip_sync:
+        print(f"[INFO] Syncing {spec.total_tables} synthetic tables (full)...")
+        full = run_sync(spec, fake, full=True)
+        print(f"[INFO] Syncing {spec.total_tables} synthetic tables (incremental)...")
+        report["sync"] = {"full": full, "incremental": run_sync(spec, fake, full=False)}
+    if not args.skip_api:
+        print(f"[INFO] Benchmarking /metadata endpoints ({args.concurrency} concurrent clients)...")
+        report["api"] = run_api(spec, args.requests, args.concurrency)
+    report["peak_rss_bytes"] = peak_rss_bytes()
+    report["latency_histograms"] = metrics.snapshot()
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+        f.write("\n")
+    print(f"[INFO] Wrote {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import json
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+from core.db.catalog_records import ColumnRecord, ForeignKeyRecord, SchemaRecord, TableRecord, TableStatsRecord
+from core.db.sqlserver_client import CatalogRecord
+
+_DATA_TYPES = [
+    ("int", 10, 0), ("bigint", 19, 0), ("nvarchar", 255, None), ("varchar", 50, None),
+    ("datetime2", None, None), ("decimal", 18, 2), ("bit", None, None), ("uniqueidentifier", None, None),
+]
+_BASE_DATE = datetime(2024, 1, 1)
+
+
+@dataclass
+class CatalogSpec:
+    """Shape of a synthetic catalog: every count is per parent object."""
+    servers: int = 2
+    databases: int = 5
+    schemas: int = 3
+    tables: int = 50
+    columns: int = 12
+    # fraction of tables with a foreign key to another table of the same database
+    fk_density: float = 0.3
+    seed: int = 42
+
+    @property
+    def total_tables(self) -> int:
+        return self.servers * self.databases * self.schemas * self.tables
+
+    def server_configs(self) -> List[Dict[str, Any]]:
+        """servers.yml-style entries for the synthetic servers (hosts are resolved by FakeSQLServer)."""
+        return [
+            {"name": f"bench_srv_{i}", "host": f"bench-{i}", "port": 1433, "username": "bench", "password": "bench"}
+            for i in range(self.servers)
+        ]
+
+    def database_names(self, server: int) -> List[str]:
+        return [f"bench_db_{server}_{d}" for d in range(self.databases)]
+
+    def records(self, server: int, database: str,
+                modified_since: Optional[datetime] = None) -> Iterator[CatalogRecord]:
+        """
+        The catalog of one database in harvest_database() order, generated
+        deterministically from (seed, server, database). As with the real
+        harvest, columns and foreign keys are only produced for tables
+        modified at or after `modified_since`; table statistics always are.
+        """
+        rng = random.Random(f"{self.seed}:{server}:{database}")
+        schemas = [f"schema_{s}" for s in range(self.schemas)]
+        tables = [(schema, f"table_{s}_{t}", _BASE_DATE + timedelta(minutes=s * self.tables + t))
+                  for s, schema in enumerate(schemas) for t in range(self.tables)]
+        references = {
+            (schema, name): rng.choice(tables)[:2]
+            for schema, name, _ in tables
+            if len(tables) > 1 and rng.random() < self.fk_density
+        }
+        # Table sizes spread from tens to tens of millions of rows.
+        row_counts = [int(10 ** rng.uniform(1, 7.5)) for _ in tables]
+
+        for schema in schemas:
+            yield SchemaRecord(name=schema)
+        harvested = []
+        for object_id, (schema, name, modify_date) in enumerate(tables, start=1):
+            columns_harvested = modified_since is None or modify_date >= modified_since
+            if columns_harvested:
+                harvested.append((schema, name))
+            yield TableRecord(schema_name=schema, name=name, object_id=object_id,
+                              modify_date=modify_date, columns_harvested=columns_harvested)
+        for schema, name in harvested:
+            reference = references.get((schema, name))
+            yield ColumnRecord(schema, name, "id", "int", 10, 0, False, None, 1, True, False)
+            for position in range(2, self.columns + 1):
+                if reference is not None and position == 2:
+                    yield ColumnRecord(schema, name, f"{reference[1]}_id", "int", 10, 0, True, None, position,
+                                       False, True)
+                    continue
+                data_type, length, scale = _DATA_TYPES[(position + len(name)) % len(_DATA_TYPES)]
+                yield ColumnRecord(schema, name, f"col_{position}", data_type, length, scale, position % 3 == 0,
+                                   None, position, False, False)
+        for schema, name in harvested:
+            reference = references.get((schema, name))
+            if reference is not None:
+                yield ForeignKeyRecord(f"FK_{name}_{reference[1]}", schema, name, f"{reference[1]}_id",
+                                       reference[0], reference[1], "id", 1)
+        for (schema, name, modify_date), row_count in zip(tables, row_counts):
+            pages = row_count // 40 + 1
+            yield TableStatsRecord(schema, name, row_count, pages + 8, pages, 1 + ((schema, name) in references), modify_date)
+
+
+@dataclass
+class Latency:
+    """Injected SQL Server latency: a round trip per query plus a cost per row fetched."""
+    per_call: float = 0.0
+    per_row: float = 0.0
+    jitter: float = 0.0
+
+    def sleep(self, rows: int = 0) -> float:
+        seconds = self.per_call + self.per_row * rows
+        if self.jitter:
+            seconds *= 1 + random.uniform(-self.jitter, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+        return seconds
+
+
+class _FakeCursor:
+    def execute(self, *args):
+        return self
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class _FakeConnection:
+    """Enough of a pyodbc connection for the pool's liveness probe."""
+
+    def cursor(self):
+        return _FakeCursor()
+
+    def close(self):
+        pass
+
+
+class FakeSQLServer:
+    """
+    In-process stand-in for the SQL Servers of a CatalogSpec.
+
+    FakeSQLServer(spec, latency).client is a client_factory for
+    SQLServerConnectionManager: it builds FakeSQLServerClients that serve
+    the synthetic catalog of the server named by their host (`bench-N`)
+    through the SQLServerClient discovery interface, sleeping `latency` on
+    every call. Counts calls and rows so benchmarks can report them.
+    """
+
+    def __init__(self, spec: CatalogSpec, latency: Optional[Latency] = None):
+        self.spec = spec
+        self.latency = latency or Latency()
+        self._lock = threading.Lock()
+        self.stats = {"logins": 0, "calls": 0, "rows": 0}
+
+    def client(self, host: str, port: int, username: str, password: str) -> "FakeSQLServerClient":
+        return FakeSQLServerClient(self, host, port, username, password)
+
+    def count(self, rows: int):
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["rows"] += rows
+
+
+class FakeSQLServerClient:
+    """SQLServerClient look-alike backed by a FakeSQLServer."""
+
+    def __init__(self, server: FakeSQLServer, host: str, port: int, username: str, password: str):
+        self.server = server
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.conn = None
+        self.driver_seconds = 0.0
+
+    def _index(self) -> int:
+        prefix, _, index = (self.host or "").rpartition("-")
+        if prefix != "bench" or not index.isdigit() or int(index) >= self.server.spec.servers:
+            raise ConnectionError(f"Unknown synthetic server {self.host}")
+        return int(index)
+
+    def _call(self, rows: int):
+        self.driver_seconds += self.server.latency.sleep(rows)
+        self.server.count(rows)
+
+    def connect(self):
+        self._index()
+        self.server.latency.sleep()
+        with self.server._lock:
+            self.server.stats["logins"] += 1
+        self.conn = _FakeConnection()
+
+    def close(self):
+        self.conn = None
+
+    def discover_databases(self) -> List[str]:
+        databases = self.server.spec.database_names(self._index())
+        self._call(len(databases))
+        return databases
+
+    def discover_schemas(self, database_name: str) -> List[str]:
+        schemas = [r.name for r in self._records(database_name) if isinstance(r, SchemaRecord)]
+        self._call(len(schemas))
+        return schemas
+
+    def discover_tables(self, database_name: str, schema_name: str) -> List[str]:
+        tables = [r.name for r in self._records(database_name)
+                  if isinstance(r, TableRecord) and r.schema_name == schema_name]
+        self._call(len(tables))
+        return tables
+
+    def discover_columns(self, database_name: str, schema_name: str, table_name: str) -> str:
+        records = list(self._records(database_name))
+        references = {
+            fk.column_name: f"{fk.referenced_schema}.{fk.referenced_table}({fk.referenced_column})"
+            for fk in records
+            if isinstance(fk, ForeignKeyRecord) and fk.schema_name == schema_name and fk.table_name == table_name
+        }
+        columns = [
+            {**{key: value for key, value in asdict(r).items() if key not in ("schema_name", "table_name")},
+             "foreign_key_references": references.get(r.name)}
+            for r in records
+            if isinstance(r, ColumnRecord) and r.schema_name == schema_name and r.table_name == table_name
+        ]
+        self._call(len(columns))
+        return json.dumps(columns)
+
+    def harvest_database(self, database_name: str, batch_size: int = 5000,
+                         modified_since: Optional[datetime] = None) -> Iterator[CatalogRecord]:
+        """Like SQLServerClient.harvest_database: one query per level, fetched in batches."""
+        level, batch = None, 0
+        for record in self._records(database_name, modified_since):
+            if type(record) is not level:
+                if level is not None:
+                    self._call(batch)  # last fetch of the previous level
+                level, batch = type(record), 0
+                self._call(0)  # this level's query
+            batch += 1
+            if batch == batch_size:
+                self._call(batch)
+                batch = 0
+            yield record
+        if level is not None:
+            self._call(batch)
+
+    def _records(self, database_name: str, modified_since: Optional[datetime] = None) -> Iterator[CatalogRecord]:
+        return self.server.spec.records(self._index(), database_name, modified_since)
@@ -1,4 +1,25 @@
-from core.utils.secrets_manager import get_secret
+from core.utils.secrets_manager import get_secret, prefetch_secrets
+
+# Every name below, resolved in one batched pass when SECRET_BACKEND is a
+# cloud store (names missing here still resolve, one lookup each).
+prefetch_secrets([
+    "POSTGRES_HOST", "POSTGRES_PORT", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB", "MCP_SERVER_PORT",
+    "MCP_SERVER_HOST", "PASSWORD_ENCRYPTION_KEY", "SYNC_HARVEST_BATCH_SIZE", "SYNC_MAX_PARALLEL_SERVERS",
+    "SYNC_MAX_PARALLEL_DATABASES", "SYNC_QUEUE_SIZE", "SYNC_STREAM_TIMEOUT", "POSTGRES_POOL_MIN", "POSTGRES_POOL_MAX",
+    "POSTGRES_POOL_TIMEOUT", "POSTGRES_POOL_VALIDATE_AFTER", "SQLSERVER_POOL_MAX", "SQLSERVER_POOL_TIMEOUT",
+    "SQLSERVER_POOL_IDLE_TIMEOUT", "SQLSERVER_POOL_VALIDATE_AFTER", "SQLSERVER_BREAKER_THRESHOLD",
+    "SQLSERVER_BREAKER_COOLDOWN", "METADATA_API_BACKEND", "CATALOG_VERSION_REFRESH_SECONDS",
+    "METADATA_CACHE_MAX_ENTRIES", "METADATA_CACHE_MAX_BYTES", "REDIS_URL", "METADATA_REDIS_TTL",
+    "METADATA_REDIS_LOCK_TTL", "METADATA_PAGE_MAX", "METADATA_STREAM_BATCH_SIZE", "SYNC_SCHEDULE_INTERVAL",
+    "SYNC_SCHEDULE_JITTER", "SYNC_JOB_HISTORY", "QUERY_DEFAULT_MAX_ROWS", "QUERY_MAX_ROWS",
+    "QUERY_DEFAULT_TIMEOUT", "QUERY_MAX_TIMEOUT", "QUERY_BATCH_SIZE", "FANOUT_MAX_WORKERS",
+    "FANOUT_PER_SERVER", "FANOUT_MAX_TARGETS", "FANOUT_QUEUE_SIZE", "QUERY_CACHE_MAX_ENTRIES",
+    "QUERY_CACHE_MAX_BYTES", "QUERY_CACHE_MAX_ENTRY_BYTES", "QUERY_CACHE_TTL", "QUERY_CACHE_MAX_TTL",
+    "QUERY_LOG_BUFFER_SIZE", "QUERY_LOG_BATCH_SIZE", "QUERY_LOG_FLUSH_INTERVAL", "QUERY_SCAN_GUARD_ROWS",
+    "QUERY_SCAN_AUTO_LIMIT", "SAMPLE_DEFAULT_ROWS", "SAMPLE_MAX_ROWS", "SAMPLE_TIMEOUT",
+    "SAMPLE_TABLESAMPLE_ROWS", "SAMPLE_MAX_VALUE_LENGTH", "SAMPLE_CACHE_MAX_ENTRIES", "SAMPLE_CACHE_MAX_BYTES",
+    "SAMPLE_CACHE_MAX_ENTRY_BYTES", "SAMPLE_CACHE_TTL", "CATALOG_SNAPSHOT_PATH", "METADATA_TREE_MAX_NODES",
+])
 
 POSTGRES_HOST = get_secret("POSTGRES_HOST")
 POSTGRES_PORT = get_secret("POSTGRES_PORT")
@@ -7,4 +28,63 @@ POSTGRES_PASSWORD = get_secret("POSTGRES_PASSWORD")
 POSTGRES_DB = get_secret("POSTGRES_DB")
 MCP_SERVER_PORT = int(get_secret("MCP_SERVER_PORT", 8080))
 MCP_SERVER_HOST = get_secret("MCP_SERVER_HOST")
-PASSWORD_ENCRYPTION_KEY = get_secret("PASSWORD_ENCRYPTION_KEY")
\ No newline at end of file
+PASSWORD_ENCRYPTION_KEY = get_secret("PASSWORD_ENCRYPTION_KEY")
+SYNC_HARVEST_BATCH_SIZE = int(get_secret("SYNC_HARVEST_BATCH_SIZE", 5000))
+SYNC_MAX_PARALLEL_SERVERS = int(get_secret("SYNC_MAX_PARALLEL_SERVERS", 4))
+SYNC_MAX_PARALLEL_DATABASES = int(get_secret("SYNC_MAX_PARALLEL_DATABASES", 2))
+SYNC_QUEUE_SIZE = int(get_secret("SYNC_QUEUE_SIZE", 8))
+SYNC_STREAM_TIMEOUT = float(get_secret("SYNC_STREAM_TIMEOUT", 600))
+POSTGRES_POOL_MIN = int(get_secret("POSTGRES_POOL_MIN", 1))
+POSTGRES_POOL_MAX = int(get_secret("POSTGRES_POOL_MAX", 20))
+POSTGRES_POOL_TIMEOUT = float(get_secret("POSTGRES_POOL_TIMEOUT", 30))
+POSTGRES_POOL_VALIDATE_AFTER = float(get_secret("POSTGRES_POOL_VALIDATE_AFTER", 30))
+SQLSERVER_POOL_MAX = int(get_secret("SQLSERVER_POOL_MAX", 4))
+SQLSERVER_POOL_TIMEOUT = float(get_secret("SQLSERVER_POOL_TIMEOUT", 30))
+SQLSERVER_POOL_IDLE_TIMEOUT = float(get_secret("SQLSERVER_POOL_IDLE_TIMEOUT", 300))
+SQLSERVER_POOL_VALIDATE_AFTER = float(get_secret("SQLSERVER_POOL_VALIDATE_AFTER", 30))
+SQLSERVER_BREAKER_THRESHOLD = int(get_secret("SQLSERVER_BREAKER_THRESHOLD", 3))
+SQLSERVER_BREAKER_COOLDOWN = float(get_secret("SQLSERVER_BREAKER_COOLDOWN", 30))
+METADATA_API_BACKEND = get_secret("METADATA_API_BACKEND", "sync").lower()
+CATALOG_VERSION_REFRESH_SECONDS = float(get_secret("CATALOG_VERSION_REFRESH_SECONDS", 5))
+# Catalog snapshot file published by syncs and mapped by API processes ("" disables).
+CATALOG_SNAPSHOT_PATH = get_secret("CATALOG_SNAPSHOT_PATH", "data/catalog.snapshot")
+METADATA_CACHE_MAX_ENTRIES = int(get_secret("METADATA_CACHE_MAX_ENTRIES", 1024))
+METADATA_CACHE_MAX_BYTES = int(get_secret("METADATA_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+REDIS_URL = get_secret("REDIS_URL")
+METADATA_REDIS_TTL = int(get_secret("METADATA_REDIS_TTL", 3600))
+METADATA_REDIS_LOCK_TTL = float(get_secret("METADATA_REDIS_LOCK_TTL", 10))
+METADATA_PAGE_MAX = int(get_secret("METADATA_PAGE_MAX", 10000))
+METADATA_STREAM_BATCH_SIZE = int(get_secret("METADATA_STREAM_BATCH_SIZE", 2000))
+# Largest /metadata/tree, counted at its deepest level (0: no limit).
+METADATA_TREE_MAX_NODES = int(get_secret("METADATA_TREE_MAX_NODES", 200000))
+SYNC_SCHEDULE_INTERVAL = float(get_secret("SYNC_SCHEDULE_INTERVAL", 0))
+SYNC_SCHEDULE_JITTER = float(get_secret("SYNC_SCHEDULE_JITTER", 0.1))
+SYNC_JOB_HISTORY = int(get_secret("SYNC_JOB_HISTORY", 20))
+QUERY_DEFAULT_MAX_ROWS = int(get_secret("QUERY_DEFAULT_MAX_ROWS", 10000))
+QUERY_MAX_ROWS = int(get_secret("QUERY_MAX_ROWS", 1000000))
+QUERY_DEFAULT_TIMEOUT = float(get_secret("QUERY_DEFAULT_TIMEOUT", 30))
+QUERY_MAX_TIMEOUT = float(get_secret("QUERY_MAX_TIMEOUT", 600))
+QUERY_BATCH_SIZE = int(get_secret("QUERY_BATCH_SIZE", 1000))
+FANOUT_MAX_WORKERS = int(get_secret("FANOUT_MAX_WORKERS", 32))
+FANOUT_PER_SERVER = int(get_secret("FANOUT_PER_SERVER", 4))
+FANOUT_MAX_TARGETS = int(get_secret("FANOUT_MAX_TARGETS", 500))
+FANOUT_QUEUE_SIZE = int(get_secret("FANOUT_QUEUE_SIZE", 16))
+QUERY_CACHE_MAX_ENTRIES = int(get_secret("QUERY_CACHE_MAX_ENTRIES", 4096))
+QUERY_CACHE_MAX_BYTES = int(get_secret("QUERY_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+QUERY_CACHE_MAX_ENTRY_BYTES = int(get_secret("QUERY_CACHE_MAX_ENTRY_BYTES", 8 * 1024 * 1024))
+QUERY_CACHE_TTL = float(get_secret("QUERY_CACHE_TTL", 300))
+QUERY_CACHE_MAX_TTL = float(get_secret("QUERY_CACHE_MAX_TTL", 3600))
+QUERY_LOG_BUFFER_SIZE = int(get_secret("QUERY_LOG_BUFFER_SIZE", 10000))
+QUERY_LOG_BATCH_SIZE = int(get_secret("QUERY_LOG_BATCH_SIZE", 500))
+QUERY_LOG_FLUSH_INTERVAL = float(get_secret("QUERY_LOG_FLUSH_INTERVAL", 2))
+QUERY_SCAN_GUARD_ROWS = int(get_secret("QUERY_SCAN_GUARD_ROWS", 10000000))
+QUERY_SCAN_AUTO_LIMIT = int(get_secret("QUERY_SCAN_AUTO_LIMIT", 1000))
+SAMPLE_DEFAULT_ROWS = int(get_secret("SAMPLE_DEFAULT_ROWS", 20))
+SAMPLE_MAX_ROWS = int(get_secret("SAMPLE_MAX_ROWS", 200))
+SAMPLE_TIMEOUT = float(get_secret("SAMPLE_TIMEOUT", 15))
+SAMPLE_TABLESAMPLE_ROWS = int(get_secret("SAMPLE_TABLESAMPLE_ROWS", 100000))
+SAMPLE_MAX_VALUE_LENGTH = int(get_secret("SAMPLE_MAX_VALUE_LENGTH", 256))
+SAMPLE_CACHE_MAX_ENTRIES = int(get_secret("SAMPLE_CACHE_MAX_ENTRIES", 4096))
+SAMPLE_CACHE_MAX_BYTES = int(get_secret("SAMPLE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+SAMPLE_CACHE_MAX_ENTRY_BYTES = int(get_secret("SAMPLE_CACHE_MAX_ENTRY_BYTES", 1024 * 1024))
+SAMPLE_CACHE_TTL = float(get_secret("SAMPLE_CACHE_TTL", 3600))
@@ -0,0 +1,393 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import settings
+from core.cache.catalog_version import CatalogVersion, catalog_version
+
+MAGIC = b"MCPCATS1"
+FORMAT = 1
+# magic, directory offset, directory length
+_PREAMBLE = struct.Struct("<8sQQ")
+
+# Field kinds: i int32, q int64, b bool (int8), t timestamp (int64 microseconds
+# since 1970-01-01, naive like the metadata store's TIMESTAMP columns) and
+# s string (uint32 index into the string table).
+_TYPECODES = {"i": "i", "q": "q", "b": "b", "t": "q", "s": "I"}
+_NULLS = {"i": -2 ** 31, "q": -2 ** 63, "b": -1, "t": -2 ** 63, "s": 2 ** 32 - 1}
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# level -> (parent id field or None, fields). The fields are those of the
+# PostgresClient listings (servers without their password).
+LEVELS: Dict[str, Tuple[Optional[str], Tuple[Tuple[str, str], ...]]] = {
+    "servers": (None, (("id", "i"), ("name", "s"), ("host", "s"), ("port", "i"), ("username", "s"))),
+    "databases": ("server_id", (("id", "i"), ("name", "s"), ("server_id", "i"), ("created_at", "t"))),
+    "schemas": ("database_id", (("id", "i"), ("name", "s"), ("database_id", "i"), ("created_at", "t"))),
+    "tables": ("schema_id", (
+        ("id", "i"), ("name", "s"), ("schema_id", "i"), ("row_count", "q"), ("reserved_pages", "q"),
+        ("used_pages", "q"), ("index_count", "i"), ("stats_updated_at", "t"), ("created_at", "t"),
+    )),
+    "columns": ("table_id", (
+        ("id", "i"), ("name", "s"), ("data_type", "s"), ("max_length", "i"), ("is_nullable", "b"),
+        ("is_primary_key", "b"), ("is_foreign_key", "b"), ("default_value", "s"), ("ordinal_position", "i"),
+        ("table_id", "i"), ("created_at", "t"),
+    )),
+}
+
+
+class SnapshotFormatError(ValueError):
+    """Raised when a file is not a catalog snapshot this code can read."""
+
+
+# ---------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------
+
+class _StringTable:
+    """Interned UTF-8 strings: each distinct value is stored once."""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.offsets = array("Q", [0])
+        self.data = bytearray()
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NULLS["s"]
+        ref = self.index.get(value)
+        if ref is None:
+            ref = self.index[value] = len(self.offsets) - 1
+            self.data += value.encode()
+            self.offsets.append(len(self.data))
+        return ref
+
+
+def _encode(kind: str, value: Any, strings: _StringTable) -> int:
+    if kind == "s":
+        return strings.add(value)
+    if value is None:
+        return _NULLS[kind]
+    if kind == "t":
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return (value - _EPOCH) // _MICROSECOND
+    return int(value)
+
+
+def _inverse(ranks: array) -> array:
+    """The row positions in rank order (ranks is a permutation of 0..n-1)."""
+    positions = array("I", bytes(4 * len(ranks)))
+    for position, rank in enumerate(ranks):
+        positions[rank] = position
+    return positions
+
+
+def write_snapshot(path: str, version: int, levels: Dict[str, Iterable[Dict[str, Any]]]) -> Dict[str, int]:
+    """
+    Write a snapshot of catalog `version` to `path`. `levels` maps each
+    level of LEVELS to its rows in id order, with `rank` and `parent_rank`
+    (PostgresClient.iter_catalog(..., ranked=True)). The file is written
+    next to `path` and renamed over it, so readers see either the old or
+    the new snapshot, never a partial one. Returns the row count per level.
+    """
+    strings = _StringTable()
+    sections: List[Tuple[str, array]] = []
+    counts: Dict[str, int] = {}
+    for level, (parent, fields) in LEVELS.items():
+        columns = {name: array(_TYPECODES[kind]) for name, kind in fields}
+        ranks, parent_ranks = array("I"), array("I")
+        for row in levels[level]:
+            for name, kind in fields:
+                columns[name].append(_encode(kind, row[name], strings))
+            ranks.append(row["rank"])
+            if parent is not None:
+                parent_ranks.append(row["parent_rank"])
+        counts[level] = len(ranks)
+        sections.extend((f"{level}.{name}", values) for name, values in columns.items())
+        sections.append((f"{level}.rank", ranks))
+        sections.append((f"{level}.order", _inverse(ranks)))
+        if parent is not None:
+            sections.append((f"{level}.by_parent", _inverse(parent_ranks)))
+    sections.append(("strings.offsets", strings.offsets))
+    sections.append(("strings.data", array("B", strings.data)))
+
+    directory: Dict[str, Any] = {
+        "format": FORMAT,
+        "byteorder": sys.byteorder,
+        "catalog_version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "levels": counts,
+        "sections": {},
+    }
+    directory_path = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory_path, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(bytes(_PREAMBLE.size))
+            for name, values in sections:
+                f.write(bytes(-f.tell() % 8))  # keep every array 8-byte aligned
+                directory["sections"][name] = [f.tell(), len(values), values.typecode]
+                values.tofile(f)
+            body = json.dumps(directory).encode()
+            offset = f.tell()
+            f.write(body)
+            f.seek(0)
+            f.write(_PREAMBLE.pack(MAGIC, offset, len(body)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return counts
+
+
+def snapshot_version(path: str) -> Optional[int]:
+    """The catalog version of the snapshot at `path`, or None if there is no readable one."""
+    try:
+        with open(path, "rb") as f:
+            magic, offset, length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != MAGIC:
+                return None
+            f.seek(offset)
+            directory = json.loads(f.read(length))
+    except (OSError, ValueError, struct.error):
+        return None
+    return directory.get("catalog_version") if directory.get("format") == FORMAT else None
+
+
+# ---------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------
+
+class CatalogSnapshot:
+    """
+    A catalog snapshot file mapped read-only into memory.
+
+    Every level is stored column-wise: one fixed-width array per field,
+    rows in id order, names as references into one table of interned
+    strings. Row lookups read the mapped pages directly; nothing is copied
+    into Python objects until a row is returned, and processes mapping the
+    same file share its pages through the OS page cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, offset, length = _PREAMBLE.unpack_from(self._mmap)
+            if magic != MAGIC:
+                raise SnapshotFormatError(f"{path} is not a catalog snapshot")
+            directory = json.loads(self._mmap[offset:offset + length])
+            if directory["format"] != FORMAT or directory["byteorder"] != sys.byteorder:
+                raise SnapshotFormatError(f"{path} has format {directory['format']} ({directory['byteorder']}-endian)")
+        except Exception:
+            self._mmap.close()
+            raise
+        self.version: int = directory["catalog_version"]
+        self.created_at: str = directory["created_at"]
+        self.counts: Dict[str, int] = directory["levels"]
+        self.size = len(self._mmap)
+        view = memoryview(self._mmap)
+        itemsize = {code: array(code).itemsize for code in "bBiIqQ"}
+        self._sections = {
+            name: view[start:start + count * itemsize[code]].cast(code)
+            for name, (start, count, code) in directory["sections"].items()
+        }
+        self._offsets = self._sections["strings.offsets"]
+        self._data = self._sections["strings.data"]
+
+    def _string(self, ref: int) -> Optional[str]:
+        if ref == _NULLS["s"]:
+            return None
+        return bytes(self._data[self._offsets[ref]:self._offsets[ref + 1]]).decode()
+
+    def _decode(self, kind: str, value: int) -> Any:
+        if kind == "s":
+            return self._string(value)
+        if value == _NULLS[kind]:
+            return None
+        if kind == "b":
+            return bool(value)
+        if kind == "t":
+            return _EPOCH + value * _MICROSECOND
+        return value
+
+    def _row(self, level: str, position: int) -> Dict[str, Any]:
+        return {name: self._decode(kind, self._sections[f"{level}.{name}"][position])
+                for name, kind in LEVELS[level][1]}
+
+    def _positions(self, level: str, parent_id: Optional[int], after_id: Optional[int],
+                   by_id: bool) -> Iterable[int]:
+        """Row positions of a listing, in id order (`by_id`) or in the unpaged listing order."""
+        parent = LEVELS[level][0]
+        ids = self._sections[f"{level}.id"]
+        if parent_id is None:
+            if not by_id:
+                return self._sections[f"{level}.order"]
+            return range(bisect_right(ids, after_id) if after_id is not None else 0, len(ids))
+        if parent is None:
+            return ()
+        parents = self._sections[f"{level}.{parent}"]
+        by_parent = self._sections[f"{level}.by_parent"]
+        low = bisect_left(by_parent, parent_id, key=parents.__getitem__)
+        high = bisect_right(by_parent, parent_id, lo=low, key=parents.__getitem__)
+        positions = by_parent[low:high]  # in id order
+        if not by_id:
+            return sorted(positions, key=self._sections[f"{level}.rank"].__getitem__)
+        if after_id is not None:
+            positions = positions[bisect_right(positions, after_id, key=ids.__getitem__):]
+        return positions
+
+    def rows(self, level: str, parent_id: Optional[int] = None, limit: Optional[int] = None,
+             after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Same rows, in the same order, as the PostgresClient listing of `level` (get_tables, ...)."""
+        paged = limit is not None or after_id is not None
+        positions = self._positions(level, parent_id, after_id, by_id=paged)
+        return [self._row(level, position) for position in islice(positions, limit)]
+
+    def iter_rows(self, level: str, parent_id: Optional[int] = None,
+                  after_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Same rows as PostgresClient.iter_catalog(level, parent_id, after_id), produced lazily."""
+        for position in self._positions(level, parent_id, after_id, by_id=True):
+            yield self._row(level, position)
+
+    def info(self) -> Dict[str, Any]:
+        return {"path": self.path, "catalog_version": self.version, "created_at": self.created_at,
+                "bytes": self.size, "levels": dict(self.counts)}
+
+
+class CatalogSnapshotStore:
+    """
+    The catalog snapshot a process serves /metadata/* listings from.
+
+    A sync that changed the catalog publishes a new snapshot file
+    (publish()), replacing the previous one atomically. get() returns the
+    mapped snapshot only while it is as recent as the catalog version; when
+    a sync elsewhere moved the version on, the file is checked again (at
+    most every `check_interval` seconds) and the new one mapped in place of
+    the old, which is unmapped once in-flight reads are done. If the
+    metadata store cannot be reached, the version stays where it was and
+    the snapshot keeps being served. An empty `path` disables snapshots.
+    """
+
+    def __init__(self, path: str, version: CatalogVersion, check_interval: float = 5.0):
+        self.path = path
+        self.version = version
+        self.check_interval = check_interval
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._file_id: Optional[Tuple[int, int, int]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"loads": 0, "publishes": 0, "served": 0, "fallbacks": 0, "errors": 0}
+        version.subscribe(self._on_version)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def open(self) -> Optional[CatalogSnapshot]:
+        """Map the snapshot at startup; until the stored version is read, assume the snapshot's."""
+        snapshot = self._load(force=True)
+        if snapshot is not None:
+            self.version.seed(snapshot.version)
+        return snapshot
+
+    def get(self) -> Optional[CatalogSnapshot]:
+        """The snapshot to serve from, or None to read the metadata store."""
+        if not self.enabled:
+            return None
+        current = self.version.current()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version < current:
+            snapshot = self._load()
+        served = snapshot is not None and snapshot.version >= current
+        with self._lock:
+            self._stats["served" if served else "fallbacks"] += 1
+        return snapshot if served else None
+
+    def _load(self, force: bool = False) -> Optional[CatalogSnapshot]:
+        """Map the file if it changed since it was last mapped (checked at most every check_interval)."""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._checked_at < self.check_interval:
+                return self._snapshot
+            self._checked_at = now
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return self._snapshot
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_id == self._file_id:
+            return self._snapshot
+        try:
+            snapshot = CatalogSnapshot(self.path)
+        except Exception as e:
+            print(f"[WARN] Cannot map catalog snapshot {self.path}: {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+            return self._snapshot
+        with self._lock:
+            # The previous mapping is released when its last reader drops it.
+            self._snapshot, self._file_id = snapshot, file_id
+            self._stats["loads"] += 1
+        print(f"[INFO] Mapped catalog snapshot v{snapshot.version} ({snapshot.size / 1e6:.1f} MB, "
+              f"{snapshot.counts.get('columns', 0)} columns)")
+        return snapshot
+
+    def publish(self, pg: Any, version: Optional[int] = None, batch_size: int = 5000):
+        """
+        Write the catalog of `pg` (a PostgresClient) as the snapshot of
+        `version` (default: the stored version) unless the file already
+        holds it, then map it.
+        """
+        if not self.enabled:
+            return
+        if version is None:
+            version = pg.get_catalog_version()
+        if snapshot_version(self.path) == version:
+            self._load(force=True)
+            return
+        started = time.perf_counter()
+        counts = write_snapshot(self.path, version, {
+            level: pg.iter_catalog(level, batch_size=batch_size, ranked=True) for level in LEVELS
+        })
+        with self._lock:
+            self._stats["publishes"] += 1
+        print(f"[INFO] Published catalog snapshot v{version} in {time.perf_counter() - started:.2f}s "
+              f"({', '.join(f'{count} {level}' for level, count in counts.items())})")
+        self._load(force=True)
+
+    def _on_version(self, version: int):
+        with self._lock:
+            self._checked_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        with self._lock:
+            stats = dict(self._stats)
+        stats["enabled"] = self.enabled
+        stats["snapshot"] = snapshot.info() if snapshot is not None else None
+        return stats
+
+
+catalog_snapshots = CatalogSnapshotStore(
+    settings.CATALOG_SNAPSHOT_PATH,
+    catalog_version,
+    check_interval=settings.CATALOG_VERSION_REFRESH_SECONDS,
+)
@@ -0,0 +1,83 @@
+import threading
+import time
+from typing import Callable, List, Optional
+
+from config import settings
+
+
+class CatalogVersion:
+    """
+    Process-local view of the catalog version stored in catalog_state.
+
+    The version only changes when a sync commits catalog changes. A sync
+    running in this process calls set() and the new version is visible
+    immediately; syncs running elsewhere (CLI, other replicas) are picked
+    up by re-reading the stored version at most every `refresh_interval`
+    seconds, so steady-state reads cost no database round trip.
+
+    Listeners registered with subscribe() are called with the new version
+    whenever it changes, so dependent caches can drop stale entries.
+    """
+
+    def __init__(self, refresh_interval: float = 5.0):
+        self.refresh_interval = refresh_interval
+        self._loader: Optional[Callable[[], int]] = None
+        self._version = 0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[int], None]] = []
+
+    def set_loader(self, loader: Callable[[], int]):
+        """Set the function that reads the stored version (e.g. PostgresClient.get_catalog_version)."""
+        self._loader = loader
+        self._checked_at = 0.0
+
+    def subscribe(self, listener: Callable[[int], None]):
+        self._listeners.append(listener)
+
+    def is_stale(self) -> bool:
+        return self._loader is not None and time.monotonic() - self._checked_at > self.refresh_interval
+
+    def current(self) -> int:
+        """Return the catalog version, re-reading it if the local copy is stale."""
+        if self.is_stale():
+            try:
+                self.set(self._loader())
+            except Exception as e:
+                print(f"[WARN] Cannot refresh catalog version: {e}")
+                self._checked_at = time.monotonic()
+        return self._version
+
+    def seed(self, version: int):
+        """Assume `version` until the stored version is first read (e.g. from a snapshot mapped at startup)."""
+        with self._lock:
+            if self._version == 0:
+                self._version = version
+
+    def set(self, version: int):
+        """Record a version read from or written to the metadata store."""
+        self._update(version, newer_only=False)
+
+    def advance(self, version: int):
+        """
+        Record a version announced by another process, unless the local copy
+        is already as new: announcements can arrive late or out of order.
+        """
+        self._update(version, newer_only=True)
+
+    def _update(self, version: int, newer_only: bool):
+        with self._lock:
+            if newer_only and version <= self._version:
+                return
+            changed = version != self._version
+            self._version = version
+            self._checked_at = time.monotonic()
+        if changed:
+            for listener in self._listeners:
+                try:
+                    listener(version)
+                except Exception as e:
+                    print(f"[WARN] Catalog version listener failed: {e}")
+
+
+catalog_version = CatalogVersion(refresh_interval=settings.CATALOG_VERSION_REFRESH_SECONDS)
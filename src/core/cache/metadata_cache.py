@@ -0,0 +1,86 @@
+import json
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from config import settings
+from core.cache.catalog_version import CatalogVersion, catalog_version
+from core.cache.lru import LRUCache
+from core.cache.redis_cache import RedisMetadataCache
+
+
+class MetadataCache:
+    """
+    Cache of serialized /metadata/* responses, keyed by endpoint, request
+    parameters and catalog version.
+
+    Bodies are stored as ready-to-send JSON bytes, so a hit costs neither
+    a database round trip nor re-serialization. Entries of older catalog
+    versions can never be served; they are dropped as soon as the version
+    changes.
+
+    When a `shared` RedisMetadataCache is configured, local misses are
+    served from Redis (filled single-flight across replicas) before
+    falling back to Postgres.
+    """
+
+    def __init__(self, version: CatalogVersion, max_entries: int, max_bytes: int,
+                 shared: Optional[RedisMetadataCache] = None):
+        self.version = version
+        self.lru = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+        self.shared = shared
+        version.subscribe(lambda _: self.lru.clear())
+
+    @staticmethod
+    def serialize(data: Any) -> bytes:
+        """JSON body of `data`; bytes are taken as an already serialized body (e.g. JSON built by Postgres)."""
+        if isinstance(data, bytes):
+            return data
+        return json.dumps(jsonable_encoder(data), separators=(",", ":")).encode()
+
+    def get(self, endpoint: str, params: Hashable, version: int):
+        return self.lru.get((endpoint, params, version))
+
+    def put(self, endpoint: str, params: Hashable, version: int, body: bytes):
+        self.lru.put((endpoint, params, version), body)
+
+    def get_or_build(self, endpoint: str, params: Hashable, producer: Callable[[], Any]) -> Tuple[int, bytes]:
+        """Return (catalog version, JSON body), calling `producer` only on a miss."""
+        version = self.version.current()
+        body = self.get(endpoint, params, version)
+        if body is None:
+            body = self.fill(endpoint, params, version, lambda: self.serialize(producer()))
+            self.put(endpoint, params, version, body)
+        return version, body
+
+    def fill(self, endpoint: str, params: Hashable, version: int, filler: Callable[[], bytes]) -> bytes:
+        """Build a body after a local miss, through the shared tier when there is one."""
+        if self.shared is None:
+            return filler()
+        return self.shared.get_or_fill(endpoint, params, version, filler)
+
+    def publish_version(self, version: int):
+        """Record a version committed by a sync in this process and notify other replicas."""
+        self.version.set(version)
+        if self.shared is not None:
+            self.shared.publish_version(version)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.lru.stats()
+        stats["catalog_version"] = self.version.current()
+        if self.shared is not None:
+            stats["shared"] = self.shared.stats()
+        return stats
+
+
+metadata_cache = MetadataCache(
+    catalog_version,
+    max_entries=settings.METADATA_CACHE_MAX_ENTRIES,
+    max_bytes=settings.METADATA_CACHE_MAX_BYTES,
+    shared=RedisMetadataCache.from_url(
+        settings.REDIS_URL,
+        catalog_version,
+        ttl=settings.METADATA_REDIS_TTL,
+        lock_ttl=settings.METADATA_REDIS_LOCK_TTL,
+    ) if settings.REDIS_URL else None,
+)
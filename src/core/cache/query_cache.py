@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from config import settings
+from core.cache.catalog_version import CatalogVersion, catalog_version
+from core.query.normalize import normalize_statement, referenced_tables
+
+
+@dataclass
+class CachedResult:
+    """A complete /query response body (header and rows) and its trailer."""
+    body: bytes
+    trailer: Dict[str, Any]
+    server_id: int
+    database: str
+    tables: Set[Tuple[Optional[str], str]]
+    stored_at: float
+    expires_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+
+class QueryResultCache:
+    """
+    Cache of /query results, keyed by target (server, database), normalized
+    statement (see normalize_statement) and row limit.
+
+    Bounded by entry count and total body size with LRU eviction; every
+    entry also expires after its TTL. Entries remember the tables their
+    statement reads from, and the metadata sync drops the ones reading a
+    table whose definition changed (invalidate_tables). A catalog version
+    change this process was not told about (a sync elsewhere) drops
+    everything, since the changed tables are unknown.
+
+    A second instance, sample_cache, holds /metadata/tables/{id}/sample
+    bodies under the same rules.
+    """
+
+    def __init__(self, version: CatalogVersion, max_entries: int, max_bytes: int,
+                 max_entry_bytes: int, ttl: float):
+        self.version = version
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, CachedResult]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._handled_version: Optional[int] = None
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0,
+                       "invalidations": 0, "bytes_saved": 0, "rows_saved": 0}
+        version.subscribe(self._on_version)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.max_entries > 0
+
+    @staticmethod
+    def key(server_id: int, database: str, statement: str, max_rows: int) -> Hashable:
+        return server_id, database.lower(), normalize_statement(statement), max_rows
+
+    def get(self, key: Hashable) -> Optional[CachedResult]:
+        self.version.current()  # notices syncs run elsewhere
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry.expires_at <= now:
+                self._remove(key)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self._stats["hits"] += 1
+            self._stats["bytes_saved"] += entry.size
+            self._stats["rows_saved"] += entry.trailer.get("rows", 0)
+            return entry
+
+    def put(self, key: Hashable, statement: str, body: bytes, trailer: Dict[str, Any],
+            ttl: Optional[float] = None):
+        if len(body) > self.max_entry_bytes:
+            return
+        now = time.monotonic()
+        server_id, database = key[0], key[1]
+        entry = CachedResult(body, trailer, server_id, database, referenced_tables(statement),
+                             stored_at=now, expires_at=now + (ttl or self.ttl))
+        with self._lock:
+            self._remove(key)
+            self._data[key] = entry
+            self._bytes += entry.size
+            self._stats["stores"] += 1
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def _remove(self, key: Hashable):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    # ------------------------
+    # Invalidation
+    # ------------------------
+
+    def invalidate_tables(self, server_id: int, database: str, tables: Iterable[Tuple[str, str]]) -> int:
+        """Drop the entries of a database reading any of `tables` ((schema, table) pairs). Returns the count."""
+        changed = {(schema.upper(), table.upper()) for schema, table in tables}
+        names = {table for _, table in changed}
+        database = database.lower()
+
+        def reads_changed(entry: CachedResult) -> bool:
+            return any(
+                (schema, table) in changed if schema is not None else table in names
+                for schema, table in entry.tables
+            )
+
+        return self._drop(lambda entry: entry.server_id == server_id and entry.database == database
+                          and reads_changed(entry))
+
+    def retain_databases(self, server_id: int, databases: Iterable[str]) -> int:
+        """Drop the entries of databases of `server_id` that are not in `databases` (dropped at the source)."""
+        live = {database.lower() for database in databases}
+        return self._drop(lambda entry: entry.server_id == server_id and entry.database not in live)
+
+    def _drop(self, predicate) -> int:
+        with self._lock:
+            keys = [key for key, entry in self._data.items() if predicate(entry)]
+            for key in keys:
+                self._remove(key)
+            self._stats["invalidations"] += len(keys)
+        return len(keys)
+
+    def mark_version_handled(self, version: int):
+        """Record that the changes leading to `version` were already invalidated table by table."""
+        self._handled_version = version
+
+    def _on_version(self, version: int):
+        if version != self._handled_version:
+            self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._stats["invalidations"] += len(self._data)
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._data)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+
+query_cache = QueryResultCache(
+    catalog_version,
+    max_entries=settings.QUERY_CACHE_MAX_ENTRIES,
+    max_bytes=settings.QUERY_CACHE_MAX_BYTES,
+    max_entry_bytes=settings.QUERY_CACHE_MAX_ENTRY_BYTES,
+    ttl=settings.QUERY_CACHE_TTL,
+)
+
+sample_cache = QueryResultCache(
+    catalog_version,
+    max_entries=settings.SAMPLE_CACHE_MAX_ENTRIES,
+    max_bytes=settings.SAMPLE_CACHE_MAX_BYTES,
+    max_entry_bytes=settings.SAMPLE_CACHE_MAX_ENTRY_BYTES,
+    ttl=settings.SAMPLE_CACHE_TTL,
+)
@@ -0,0 +1,195 @@
+import json
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import redis
+
+from core.cache.catalog_version import CatalogVersion
+
+
+class RedisMetadataCache:
+    """
+    Shared, cross-replica tier of the metadata cache.
+
+    Serialized catalog slices are stored under versioned keys
+    (`<prefix>:v<catalog version>:<endpoint>:<params>`), so a new catalog
+    version never reads stale entries and old ones simply expire after
+    `ttl` seconds.
+
+    Fills are single-flight: on a miss, one replica takes a short-lived
+    lock (SET NX PX) and rebuilds the entry while the others poll for it,
+    so N replicas missing the same key cost one Postgres query instead of
+    N. When a sync commits, publish_version() stores the new version under
+    `<prefix>:version` and broadcasts it on a pub/sub channel; every
+    replica running listen() advances its CatalogVersion, which drops its
+    local cache. Versions only move forward, and a listener that was
+    disconnected re-reads the stored version once it has subscribed again,
+    so announcements missed in between are not lost.
+
+    Only plain GET/SET/DELETE/PUBLISH/SUBSCRIBE are used, so any redis-py
+    compatible client (e.g. fakeredis) can be injected. Redis errors never
+    fail a request: the value is then built directly.
+    """
+
+    def __init__(self, client: redis.Redis, version: CatalogVersion, prefix: str = "mcp:catalog",
+                 ttl: int = 3600, lock_ttl: float = 10.0, wait_timeout: float = 5.0, poll_interval: float = 0.05,
+                 retry_interval: float = 1.0):
+        self.client = client
+        self.version = version
+        self.prefix = prefix
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self.channel = f"{prefix}:invalidate"
+        self.version_key = f"{prefix}:version"
+        self._listener: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "fills": 0,
+            "waits": 0,
+            "wait_timeouts": 0,
+            "errors": 0,
+            "invalidations_sent": 0,
+            "invalidations_received": 0,
+        }
+
+    @classmethod
+    def from_url(cls, url: str, version: CatalogVersion, **kwargs) -> "RedisMetadataCache":
+        return cls(redis.Redis.from_url(url), version, **kwargs)
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def key(self, endpoint: str, params: Hashable, version: int) -> str:
+        return f"{self.prefix}:v{version}:{endpoint}:{json.dumps(params, default=str)}"
+
+    # ------------------------
+    # Single-flight read-through
+    # ------------------------
+
+    def get_or_fill(self, endpoint: str, params: Hashable, version: int, filler: Callable[[], bytes]) -> bytes:
+        """Return the cached body for the key, building it with `filler` at most once across replicas."""
+        key = self.key(endpoint, params, version)
+        try:
+            body = self.client.get(key)
+        except redis.RedisError as e:
+            self._count("errors")
+            print(f"[WARN] Redis cache unavailable: {e}")
+            return filler()
+        if body is not None:
+            self._count("hits")
+            return body
+        self._count("misses")
+
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        try:
+            acquired = self.client.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+        except redis.RedisError:
+            self._count("errors")
+            return filler()
+
+        if acquired:
+            try:
+                body = filler()
+                self.client.set(key, body, ex=self.ttl)
+                self._count("fills")
+                return body
+            except redis.RedisError:
+                self._count("errors")
+                return body
+            finally:
+                self._release(lock_key, token)
+
+        # Another replica is filling this key: wait for its result.
+        self._count("waits")
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            try:
+                body = self.client.get(key)
+            except redis.RedisError:
+                self._count("errors")
+                break
+            if body is not None:
+                return body
+        self._count("wait_timeouts")
+        return filler()
+
+    def _release(self, lock_key: str, token: str):
+        # GET + DELETE rather than a Lua compare-and-delete keeps this usable with
+        # simple Redis stand-ins; the lock TTL bounds the (tiny) race window.
+        try:
+            current = self.client.get(lock_key)
+            if current is not None and current.decode() == token:
+                self.client.delete(lock_key)
+        except redis.RedisError:
+            self._count("errors")
+
+    # ------------------------
+    # Cross-replica invalidation
+    # ------------------------
+
+    def publish_version(self, version: int):
+        """Tell every replica that the catalog moved to `version`."""
+        try:
+            self.client.set(self.version_key, str(version))
+            self.client.publish(self.channel, str(version))
+            self._count("invalidations_sent")
+        except redis.RedisError as e:
+            self._count("errors")
+            print(f"[WARN] Cannot publish catalog invalidation: {e}")
+
+    def listen(self):
+        """Start a daemon thread applying invalidations published by other replicas."""
+        if self._listener is not None:
+            return
+        self._stop.clear()
+        self._listener = threading.Thread(target=self._listen_loop, name="redis-invalidation", daemon=True)
+        self._listener.start()
+
+    def _listen_loop(self):
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Catch up on versions published while this replica was not subscribed.
+                stored = self.client.get(self.version_key)
+                if stored is not None:
+                    self.version.advance(int(stored))
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self._count("invalidations_received")
+                        self.version.advance(int(message["data"]))
+            except (redis.RedisError, ValueError) as e:
+                self._count("errors")
+                print(f"[WARN] Redis invalidation listener error: {e}; retrying")
+                self._stop.wait(self.retry_interval)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except redis.RedisError:
+                        pass
+
+    def stop(self):
+        self._stop.set()
+        if self._listener is not None:
+            self._listener.join(timeout=2.0)
+            self._listener = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["listening"] = self._listener is not None
+        return stats
@@ -0,0 +1,181 @@
+from typing import List, Dict, Any, Optional, AsyncIterator, Iterable, Sequence
+
+import asyncpg
+
+from core.db.postgres_client import PostgresClient
+
+
+class AsyncPostgresClient:
+    """
+    asyncio PostgreSQL client for the read side of the metadata API.
+
+    Mirrors the get_* methods of PostgresClient on top of an asyncpg
+    connection pool so that `async def` endpoints never block the event
+    loop. The sync PostgresClient remains the writer used by
+    init_metadata.py.
+    """
+
+    def __init__(self, host: str, port: int, user: str, password: str, dbname: str,
+                 min_size: int = 1, max_size: int = 20, command_timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.dbname = dbname
+        self.min_size = min_size
+        self.max_size = max_size
+        self.command_timeout = command_timeout
+        self.pool: Optional[asyncpg.Pool] = None
+
+    async def connect(self):
+        if self.pool is None:
+            self.pool = await asyncpg.create_pool(
+                host=self.host,
+                port=int(self.port) if self.port else None,
+                user=self.user,
+                password=self.password,
+                database=self.dbname,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                command_timeout=self.command_timeout,
+            )
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Size and occupancy of the asyncpg pool."""
+        if self.pool is None:
+            return {}
+        size = self.pool.get_size()
+        idle = self.pool.get_idle_size()
+        return {
+            "min_size": self.pool.get_min_size(),
+            "max_size": self.pool.get_max_size(),
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+            "saturation": (size - idle) / self.pool.get_max_size(),
+        }
+
+    # ---------------------------------------------------------------------
+    # Generic query runner
+    # ---------------------------------------------------------------------
+
+    async def _fetch(self, query: str, args: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        """Run a query on a pooled connection and return the rows as dicts."""
+        if self.pool is None:
+            await self.connect()
+        rows = await self.pool.fetch(query, *args)
+        return [dict(row) for row in rows]
+
+    def _list_query(self, level: str, parent_id: Optional[int] = None,
+                    limit: Optional[int] = None, after_id: Optional[int] = None,
+                    keyset: bool = False) -> tuple:
+        """Same listing queries as PostgresClient._list_query, with asyncpg placeholders."""
+        select, parent_column, default_order = PostgresClient._LISTS[level]
+        where, args = [], []
+        if parent_id is not None:
+            args.append(parent_id)
+            where.append(f"{parent_column} = ${len(args)}")
+        if after_id is not None:
+            args.append(after_id)
+            where.append(f"id > ${len(args)}")
+
+        query = select
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        paged = keyset or limit is not None or after_id is not None
+        query += " ORDER BY " + ("id" if paged else default_order)
+        if limit is not None:
+            args.append(limit)
+            query += f" LIMIT ${len(args)}"
+        return query + ";", args
+
+    async def iter_catalog(self, level: str, parent_id: Optional[int] = None, after_id: Optional[int] = None,
+                           batch_size: int = 2000) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a whole catalog level in id order through a server-side
+        cursor, prefetching `batch_size` rows at a time. Server passwords
+        are not included.
+        """
+        if self.pool is None:
+            await self.connect()
+        query, args = self._list_query(level, parent_id, after_id=after_id, keyset=True)
+        if level == "servers":
+            query = query.replace(", encrypted_password", "")
+        async with self.pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                async for row in conn.cursor(query, *args, prefetch=batch_size):
+                    yield dict(row)
+
+    # ------------------------
+    # Read methods (same results as PostgresClient)
+    # ------------------------
+
+    async def get_servers(self, limit: Optional[int] = None, after_id: Optional[int] = None,
+                          credentials: bool = True) -> List[Dict[str, Any]]:
+        """Return registered SQL Server instances, optionally one keyset page at a time (passwords encrypted)."""
+        query, args = self._list_query("servers", None, limit, after_id)
+        if not credentials:
+            query = query.replace(", encrypted_password", "")
+        return await self._fetch(query, args)
+
+    async def get_databases(self, server_id: Optional[int] = None,
+                            limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return databases; if server_id is None, return all. Paged by id with limit/after_id."""
+        return await self._fetch(*self._list_query("databases", server_id, limit, after_id))
+
+    async def get_schemas(self, database_id: Optional[int] = None,
+                          limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return schemas; if database_id is None, return all. Paged by id with limit/after_id."""
+        return await self._fetch(*self._list_query("schemas", database_id, limit, after_id))
+
+    async def get_tables(self, schema_id: Optional[int] = None,
+                         limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return tables; if schema_id is None, return all. Paged by id with limit/after_id."""
+        return await self._fetch(*self._list_query("tables", schema_id, limit, after_id))
+
+    async def get_columns(self, table_id: Optional[int] = None,
+                          limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return columns; if table_id is None, return all. Paged by id with limit/after_id."""
+        return await self._fetch(*self._list_query("columns", table_id, limit, after_id))
+
+    async def search(self, q: str, kinds: Optional[Iterable[str]] = None, data_type: Optional[str] = None,
+                     limit: int = 20, min_score: float = 0.3) -> List[Dict[str, Any]]:
+        """Same ranked search as PostgresClient.search."""
+        kinds = set(kinds or PostgresClient.SEARCH_KINDS)
+        if data_type:
+            kinds = {"column"}
+        placeholders = {"q": "$1::text", "limit": "$2::int", "min_score": "$3::float8", "data_type": "$4::text"}
+        args = [q, limit, min_score]
+        if data_type:
+            args.append(data_type)
+        query = PostgresClient._search_query(kinds, bool(data_type), placeholders)
+        return await self._fetch(query, args)
+
+    async def get_tree_size(self, root: str, root_id: Optional[int] = None, depth: Optional[int] = None) -> int:
+        """Number of nodes at the deepest level of the tree get_tree() would return."""
+        placeholder = "$1" if root_id is not None else None
+        rows = await self._fetch(PostgresClient._tree_size_query(root, depth, placeholder),
+                                 (root_id,) if root_id is not None else ())
+        return rows[0]["nodes"]
+
+    async def get_tree(self, root: str, root_id: Optional[int] = None, depth: Optional[int] = None,
+                       column_fields: Iterable[str] = PostgresClient.TREE_COLUMN_FIELDS) -> str:
+        """Same JSON catalog tree as PostgresClient.get_tree."""
+        placeholder = "$1" if root_id is not None else None
+        rows = await self._fetch(PostgresClient._tree_query(root, depth, column_fields, placeholder),
+                                 (root_id,) if root_id is not None else ())
+        return rows[0]["tree"]
+
+    async def get_table_database_id(self, table_id: int) -> Optional[int]:
+        """Return the id of the database a table belongs to, or None if the table is unknown."""
+        rows = await self._fetch(PostgresClient._TABLE_DATABASE_QUERY.format(table_id="$1"), (table_id,))
+        return rows[0]["database_id"] if rows else None
+
+    async def get_relationship_edges(self, database_id: int) -> List[Dict[str, Any]]:
+        """Return every foreign key column pair of a database (see PostgresClient)."""
+        return await self._fetch(PostgresClient._RELATIONSHIP_EDGES_QUERY.format(database_id="$1"), (database_id,))
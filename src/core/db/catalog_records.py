@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass(frozen=True, slots=True)
+class SchemaRecord:
+    """A schema discovered in a SQL Server database."""
+    name: str
+
+
+@dataclass(frozen=True, slots=True)
+class TableRecord:
+    """
+    A user table discovered in a SQL Server database. `columns_harvested`
+    is False when an incremental harvest skipped the table's columns and
+    foreign keys because it was not modified since the last watermark.
+    """
+    schema_name: str
+    name: str
+    object_id: int
+    modify_date: Optional[datetime] = None
+    columns_harvested: bool = True
+
+
+@dataclass(frozen=True, slots=True)
+class ColumnRecord:
+    """
+    A column of a user table, with the same fields the per-table
+    discover_columns JSON output exposes.
+    """
+    schema_name: str
+    table_name: str
+    name: str
+    data_type: str
+    max_length: Optional[int]
+    numeric_scale: Optional[int]
+    is_nullable: bool
+    default_value: Optional[str]
+    ordinal_position: int
+    is_primary_key: bool
+    is_foreign_key: bool
+
+
+@dataclass(frozen=True, slots=True)
+class ForeignKeyRecord:
+    """One column pair of a foreign key constraint."""
+    constraint_name: str
+    schema_name: str
+    table_name: str
+    column_name: str
+    referenced_schema: str
+    referenced_table: str
+    referenced_column: str
+    ordinal: int
+
+
+@dataclass(frozen=True, slots=True)
+class TableStatsRecord:
+    """
+    Size statistics of a user table: rows (heap or clustered index),
+    reserved and used 8 KB pages over all of its indexes, number of
+    indexes, and the last time any of its statistics was updated.
+    """
+    schema_name: str
+    table_name: str
+    row_count: Optional[int]
+    reserved_pages: Optional[int]
+    used_pages: Optional[int]
+    index_count: int
+    stats_updated_at: Optional[datetime] = None
@@ -1,64 +1,256 @@
+import hashlib
+import io
 import json
-from typing import List, Dict, Any, Optional
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Set, Tuple, Iterable, Iterator
 
 import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import execute_values, RealDictCursor
 
+from core.db.catalog_records import SchemaRecord, TableRecord, ColumnRecord, ForeignKeyRecord, TableStatsRecord
+from core.db.postgres_pool import PostgresConnectionPool
 from core.utils.crypto_utils import CryptoUtils
+from core.utils.metrics import POSTGRES_SECONDS, timed
+
+
+def _copy_row(values: tuple) -> str:
+    """Format one row for COPY ... FROM STDIN in PostgreSQL's text format."""
+    fields = []
+    for value in values:
+        if value is None:
+            fields.append("\\N")
+        elif isinstance(value, bool):
+            fields.append("t" if value else "f")
+        else:
+            fields.append(
+                str(value)
+                .replace("\\", "\\\\")
+                .replace("\t", "\\t")
+                .replace("\n", "\\n")
+                .replace("\r", "\\r")
+            )
+    return "\t".join(fields) + "\n"
+
 
 class PostgresClient:
     """
     Generic PostgreSQL client for metadata management.
     """
 
-    def __init__(self, host: str, port: int, user: str, password: str, dbname: str):
+    def __init__(self, host: str, port: int, user: str, password: str, dbname: str,
+                 min_connections: int = 1, max_connections: int = 10,
+                 checkout_timeout: float = 30.0, validate_after: float = 30.0):
         self.host = host
         self.port = port
         self.user = user
         self.password = password
         self.dbname = dbname
-        self.conn = None
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.checkout_timeout = checkout_timeout
+        self.validate_after = validate_after
+        self.pool: Optional[PostgresConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        self._local = threading.local()
 
     def connect(self):
-        self.conn = psycopg2.connect(
-            host=self.host,
-            port=self.port,
-            user=self.user,
-            password=self.password,
-            dbname=self.dbname,
-        )
+        """Open the connection pool (idempotent)."""
+        with self._pool_lock:
+            if self.pool is None:
+                self.pool = PostgresConnectionPool(
+                    self.min_connections,
+                    self.max_connections,
+                    checkout_timeout=self.checkout_timeout,
+                    validate_after=self.validate_after,
+                    host=self.host,
+                    port=self.port,
+                    user=self.user,
+                    password=self.password,
+                    dbname=self.dbname,
+                )
 
     def close(self):
-        if self.conn:
-            self.conn.close()
+        """Return this thread's session connection and close the pool."""
+        self.release()
+        with self._pool_lock:
+            if self.pool is not None:
+                self.pool.closeall()
+                self.pool = None
+
+    @contextmanager
+    def connection(self) -> Iterator[extensions.connection]:
+        """Check out a pooled connection for one unit of work (e.g. one API request)."""
+        if self.pool is None:
+            self.connect()
+        with self.pool.connection() as conn:
+            yield conn
+
+    @property
+    def conn(self) -> extensions.connection:
+        """
+        Session connection pinned to the calling thread, for write paths
+        that span several statements before commit() (e.g. the sync writer).
+        Stays checked out until release() or close().
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None or conn.closed:
+            if self.pool is None:
+                # close() closed every pooled connection, this one included.
+                self.connect()
+            elif conn is not None:
+                self.pool.putconn(conn, discard=True)
+            conn = self.pool.getconn()
+            self._local.conn = conn
+        return conn
+
+    def release(self):
+        """Return the calling thread's session connection to the pool."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            self.pool.putconn(conn)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Saturation and wait-time statistics of the connection pool."""
+        if self.pool is None:
+            return {}
+        return self.pool.stats()
 
     # ---------------------------------------------------------------------
     # Generic query runner
     # ---------------------------------------------------------------------
 
-    def _execute(self, query: str, params: Optional[tuple] = None, fetch: bool = True) -> Optional[
-        List[Dict[str, Any]]]:
+    def _execute(self, query: str, params: Optional[tuple] = None, fetch: bool = True,
+                 write: bool = False) -> Optional[List[Dict[str, Any]]]:
         """
-        Execute a SQL query against the metadata database.
+        Execute a SQL query against the metadata database on a pooled connection.
         If `fetch` is True, returns the results as a list of dicts.
+        A query that fails because its connection died is retried once on a
+        fresh connection. A `write` is only retried if the connection failed
+        before the statement was sent: it may have committed just before the
+        connection died. Statement timeouts (QueryCanceledError) are never
+        retried.
         """
-        if not self.conn:
-            self.connect()
+        for attempt in range(2):
+            sent = False
+            try:
+                with self.connection() as conn:
+                    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                        sent = True
+                        cur.execute(query, params)
+                        result = cur.fetchall() if fetch else None
+                    conn.commit()
+                    return result
+            except extensions.QueryCanceledError:
+                raise
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                if attempt or (write and sent):
+                    raise
 
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(query, params)
-            if fetch:
-                return cur.fetchall()
-            else:
-                self.conn.commit()
-                return None
+    # ---------------------------------------------------------------------
+    # Catalog listing (keyset pagination / streaming)
+    # ---------------------------------------------------------------------
+
+    # level -> (select list, parent column, default ORDER BY)
+    _LISTS = {
+        "servers": (
+            "SELECT id, name, host, port, username, encrypted_password FROM servers",
+            None,
+            "id",
+        ),
+        "databases": (
+            "SELECT id, name, server_id, created_at FROM databases",
+            "server_id",
+            "name",
+        ),
+        "schemas": (
+            "SELECT id, name, database_id, created_at FROM schemas",
+            "database_id",
+            "name",
+        ),
+        "tables": (
+            """SELECT
+                    id, name, schema_id, row_count, reserved_pages, used_pages,
+                    index_count, stats_updated_at, created_at
+                FROM tables""",
+            "schema_id",
+            "name",
+        ),
+        "columns": (
+            """SELECT
+                    id, name, data_type, max_length, is_nullable,
+                    is_primary_key, is_foreign_key, default_value,
+                    ordinal_position, table_id, created_at
+                FROM columns""",
+            "table_id",
+            "table_id, ordinal_position",
+        ),
+    }
+
+    def _list_query(self, level: str, parent_id: Optional[int] = None,
+                    limit: Optional[int] = None, after_id: Optional[int] = None,
+                    keyset: bool = False) -> tuple:
+        """
+        Build the listing query of a catalog level. Paged (or `keyset`)
+        listings are ordered by id so that `after_id` can resume them
+        with an index range scan instead of an OFFSET.
+        """
+        select, parent_column, default_order = self._LISTS[level]
+        where, params = [], []
+        if parent_id is not None:
+            where.append(f"{parent_column} = %s")
+            params.append(parent_id)
+        if after_id is not None:
+            where.append("id > %s")
+            params.append(after_id)
+
+        query = select
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        paged = keyset or limit is not None or after_id is not None
+        query += " ORDER BY " + ("id" if paged else default_order)
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        return query + ";", tuple(params) or None
+
+    def iter_catalog(self, level: str, parent_id: Optional[int] = None, after_id: Optional[int] = None,
+                     batch_size: int = 2000, ranked: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a whole catalog level in id order through a server-side
+        (named) cursor, `batch_size` rows per round trip, so memory stays
+        constant whatever the catalog size. Server passwords are not included.
+
+        With `ranked`, rows also carry `rank`, their 0-based position in the
+        unpaged listing order, and (below servers) `parent_rank`, their
+        position when ordered by parent id (NULLs first), then id.
+        """
+        query, params = self._list_query(level, parent_id, after_id=after_id, keyset=True)
+        if level == "servers":
+            query = query.replace(", encrypted_password", "")
+        if ranked:
+            _, parent_column, default_order = self._LISTS[level]
+            windows = f"row_number() OVER (ORDER BY {default_order}) - 1 AS rank"
+            if parent_column is not None:
+                windows += f", row_number() OVER (ORDER BY {parent_column} NULLS FIRST, id) - 1 AS parent_rank"
+            query = f"SELECT l.*, {windows} FROM ({query.rstrip(';')}) l ORDER BY id;"
+        with self.connection() as conn:
+            with conn.cursor(name=f"iter_{level}_{uuid.uuid4().hex}", cursor_factory=RealDictCursor) as cur:
+                cur.itersize = batch_size
+                cur.execute(query, params)
+                for row in cur:
+                    yield row
 
     # ------------------------
     # Methods for servers metadata table interaction
     # ------------------------
 
-    def insert_server_if_not_exists(self, name, host, port, username, password):
-        """Insert a database entry if not already present."""
+    @timed(POSTGRES_SECONDS, "insert_server_if_not_exists")
+    def insert_server_if_not_exists(self, name, host, port, username, password) -> int:
+        """Insert a server entry if not already present. Returns the number of rows inserted."""
         with self.conn.cursor() as cur:
             cry = CryptoUtils()
             cur.execute("""
@@ -68,20 +260,35 @@ class PostgresClient:
                     SELECT 1 FROM servers WHERE name=%s AND host=%s
                 );
             """, (name, host, port, username, cry.encrypt(password), name, host))
+            return cur.rowcount
+
+    @timed(POSTGRES_SECONDS, "get_servers")
+    def get_servers(self, limit: Optional[int] = None, after_id: Optional[int] = None,
+                    credentials: bool = True) -> List[Dict[str, Any]]:
+        """
+        Return registered SQL Server instances, optionally one keyset page at
+        a time. Passwords stay encrypted (credential_vault decrypts them when
+        connecting); `credentials=False` leaves them out entirely.
+        """
+        query, params = self._list_query("servers", None, limit, after_id)
+        if not credentials:
+            query = query.replace(", encrypted_password", "")
+        return self._execute(query, params)
 
-    def get_servers(self) -> List[Dict[str, Any]]:
-        """Return all registered SQL Server instances."""
-        query = "SELECT id, name, host, port, username, encrypted_password FROM servers ORDER BY id;"
-        servers = self._execute(query)
-        cry = CryptoUtils()
-        for server in servers:
-            server['encrypted_password'] = cry.decrypt(server['encrypted_password'])
-        return servers
+    @timed(POSTGRES_SECONDS, "get_server")
+    def get_server(self, server_id: int) -> Optional[Dict[str, Any]]:
+        """Return one registered server (password encrypted, as in get_servers), or None."""
+        rows = self._execute(
+            "SELECT id, name, host, port, username, encrypted_password FROM servers WHERE id = %s;",
+            (server_id,),
+        )
+        return rows[0] if rows else None
 
     # ------------------------
     # Methods for databases metadata table interaction
     # ------------------------
 
+    @timed(POSTGRES_SECONDS, "insert_database_if_not_exists")
     def insert_database_if_not_exists(self, server_id, db_name):
         """Insert a database entry if not already present."""
         with self.conn.cursor() as cur:
@@ -101,228 +308,905 @@ class PostgresClient:
                 cur.execute("SELECT id FROM databases WHERE server_id=%s AND name=%s;", (server_id, db_name))
                 return cur.fetchone()[0]
 
-    def get_databases(self, server_id: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Return databases; if server_id is None, return all."""
-        if server_id is not None:
-            query = """
-                SELECT id, name, server_id, created_at
-                FROM databases
-                WHERE server_id = %s
-                ORDER BY name;
-            """
-            params = (server_id,)
-        else:
-            query = """
-                SELECT id, name, server_id, created_at
-                FROM databases
-                ORDER BY name;
-            """
-            params = None
-        return self._execute(query, params)
+    @timed(POSTGRES_SECONDS, "get_database")
+    def get_database(self, database_id: int) -> Optional[Dict[str, Any]]:
+        """Return one database row, or None."""
+        rows = self._execute("SELECT id, name, server_id, created_at FROM databases WHERE id = %s;", (database_id,))
+        return rows[0] if rows else None
+
+    @timed(POSTGRES_SECONDS, "get_databases")
+    def get_databases(self, server_id: Optional[int] = None,
+                      limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Return databases; if server_id is None, return all. With `limit` and/or
+        `after_id`, return one keyset page ordered by id instead.
+        """
+        return self._execute(*self._list_query("databases", server_id, limit, after_id))
 
     # ------------------------
     # Methods for scemas metadata table interaction
     # ------------------------
 
-    def insert_schema_if_not_exists(self, database_id, schema_name):
-        """Insert a schema entry if not already present."""
-        with self.conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO schemas (database_id, name)
-                SELECT %s, %s
-                WHERE NOT EXISTS (
-                    SELECT 1 FROM schemas WHERE database_id=%s AND name=%s
-                )
-                RETURNING id;
-            """, (database_id, schema_name, database_id, schema_name))
-
-            result = cur.fetchone()
-            if result:
-                return result[0]
-            else:
-                # Already exists, fetch id
-                cur.execute("SELECT id FROM schemas WHERE database_id=%s AND name=%s;", (database_id, schema_name))
-                return cur.fetchone()[0]
-
-    def get_schemas(self, database_id: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Return schemas; if database_id is None, return all."""
-        if database_id is not None:
-            query = """
-                SELECT id, name, database_id, created_at
-                FROM schemas
-                WHERE database_id = %s
-                ORDER BY name;
-            """
-            params = (database_id,)
-        else:
-            query = """
-                SELECT id, name, database_id, created_at
-                FROM schemas
-                ORDER BY name;
-            """
-            params = None
-        return self._execute(query, params)
+    @timed(POSTGRES_SECONDS, "get_schemas")
+    def get_schemas(self, database_id: Optional[int] = None,
+                    limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Return schemas; if database_id is None, return all. With `limit` and/or
+        `after_id`, return one keyset page ordered by id instead.
+        """
+        return self._execute(*self._list_query("schemas", database_id, limit, after_id))
 
     # ------------------------
     # Methods for tables metadata table interaction
     # ------------------------
 
-    def insert_table_if_not_exists(self, schema_id: int, table_name: str):
-        """Light sync - just record table existence"""
-        with self.conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO tables (schema_id, name)
-                VALUES (%s, %s)
-                ON CONFLICT (schema_id, name) DO UPDATE 
-                SET created_at = NOW()
-                RETURNING id;
-                """,
-                (schema_id, table_name)
-            )
-
-            result = cur.fetchone()
-            if result:
-                return result[0]
-            else:
-                # Already exists, fetch id
-                cur.execute("SELECT id FROM schemas WHERE schema_id=%s AND name=%s;", (schema_id, table_name))
-                return cur.fetchone()[0]
-
-    def get_tables(self, schema_id: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Return tables; if schema_id is None, return all."""
-        if schema_id is not None:
-            query = """
-                SELECT id, name, schema_id, created_at
-                FROM tables
-                WHERE schema_id = %s
-                ORDER BY name;
-            """
-            params = (schema_id,)
-        else:
-            query = """
-                SELECT id, name, schema_id, created_at
-                FROM tables
-                ORDER BY name;
-            """
-            params = None
-        return self._execute(query, params)
+    @timed(POSTGRES_SECONDS, "get_tables")
+    def get_tables(self, schema_id: Optional[int] = None,
+                   limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Return tables; if schema_id is None, return all. With `limit` and/or
+        `after_id`, return one keyset page ordered by id instead.
+        """
+        return self._execute(*self._list_query("tables", schema_id, limit, after_id))
 
     # ------------------------
     # Methods for columns metadata table interaction
     # ------------------------
 
-    def insert_columns_if_not_exists(self, table_id: int, columns_json_str: str):
+    @timed(POSTGRES_SECONDS, "get_columns")
+    def get_columns(self, table_id: Optional[int] = None,
+                    limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Return columns; if table_id is None, return all. With `limit` and/or
+        `after_id`, return one keyset page ordered by id instead.
+        """
+        return self._execute(*self._list_query("columns", table_id, limit, after_id))
+
+    # ---------------------------------------------------------------------
+    # Query scopes
+    # ---------------------------------------------------------------------
+
+    @staticmethod
+    def _glob_to_like(pattern: str) -> str:
+        """Translate a `tenant_*` style glob into a LIKE pattern."""
+        escaped = pattern.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return escaped.replace("*", "%").replace("?", "_")
+
+    @timed(POSTGRES_SECONDS, "resolve_databases")
+    def resolve_databases(self, server_ids: Optional[List[int]] = None, database_pattern: Optional[str] = None,
+                          table: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Return the databases matching every given criterion: on one of
+        `server_ids`, named like `database_pattern` (a case-insensitive glob
+        such as `tenant_*`), and containing `table` (`name` or
+        `schema.name`). Rows have database_id, database and server_id.
+        """
+        where, params = [], []
+        if server_ids:
+            where.append("d.server_id = ANY(%s)")
+            params.append(list(server_ids))
+        if database_pattern:
+            where.append("d.name ILIKE %s")
+            params.append(self._glob_to_like(database_pattern))
+        if table:
+            schema_name, _, table_name = table.rpartition(".")
+            condition = "t.name ILIKE %s"
+            params.append(self._glob_to_like(table_name))
+            if schema_name:
+                condition += " AND s.name ILIKE %s"
+                params.append(self._glob_to_like(schema_name))
+            where.append(f"""EXISTS (
+                SELECT 1 FROM schemas s JOIN tables t ON t.schema_id = s.id
+                WHERE s.database_id = d.id AND {condition}
+            )""")
+        query = "SELECT d.id AS database_id, d.name AS database, d.server_id FROM databases d"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        return self._execute(query + " ORDER BY d.server_id, d.name;", tuple(params) or None)
+
+    @timed(POSTGRES_SECONDS, "get_table_sizes")
+    def get_table_sizes(self, databases: List[Tuple[int, str]], table_names: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        Size statistics of the tables named `table_names` (case-insensitive,
+        any schema) in each (server_id, database name) of `databases`. Rows
+        have server_id, database, schema, table, row_count, reserved_pages,
+        used_pages, index_count and stats_updated_at.
+        """
+        names = sorted({name.upper() for name in table_names})
+        if not databases or not names:
+            return []
+        return self._execute("""
+            SELECT d.server_id, d.name AS database, s.name AS schema, t.name AS "table",
+                   t.row_count, t.reserved_pages, t.used_pages, t.index_count, t.stats_updated_at
+            FROM unnest(%s::int[], %s::text[]) AS target(server_id, name)
+            JOIN databases d ON d.server_id = target.server_id AND d.name = target.name
+            JOIN schemas s ON s.database_id = d.id
+            JOIN tables t ON t.schema_id = s.id
+            WHERE UPPER(t.name) = ANY(%s);
+        """, ([server_id for server_id, _ in databases], [name for _, name in databases], names))
+
+    @timed(POSTGRES_SECONDS, "get_sample_target")
+    def get_sample_target(self, table_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Where a table lives and how large it is, for sampling it: the
+        server row (id, name, host, port, username, encrypted_password)
+        plus database, schema, table, row_count and used_pages. None if the
+        table is unknown.
+        """
+        rows = self._execute("""
+            SELECT sv.id, sv.name, sv.host, sv.port, sv.username, sv.encrypted_password,
+                   d.name AS database, s.name AS schema, t.name AS "table", t.row_count, t.used_pages
+            FROM tables t
+            JOIN schemas s ON s.id = t.schema_id
+            JOIN databases d ON d.id = s.database_id
+            JOIN servers sv ON sv.id = d.server_id
+            WHERE t.id = %s;
+        """, (table_id,))
+        return rows[0] if rows else None
+
+    # ---------------------------------------------------------------------
+    # Fuzzy search (pg_trgm)
+    # ---------------------------------------------------------------------
+
+    SEARCH_KINDS = ("server", "database", "schema", "table", "column")
+
+    # kind -> candidate query. Each one is a KNN scan of the GiST trigram
+    # index on `name` (ORDER BY query <<-> name LIMIT n), so the work per
+    # kind is bounded by `limit` whatever the catalog size; the path is
+    # only joined for those candidates. `{q}`, `{limit}` and `{data_type}`
+    # are replaced by driver placeholders in _search_query.
+    _SEARCH_BRANCHES = {
+        "server": """
+            SELECT 'server' AS kind, sv.id, sv.name, sv.dist,
+                   sv.name AS server, NULL AS database, NULL AS schema,
+                   NULL AS "table", NULL AS "column", NULL AS data_type
+            FROM (SELECT id, name, {q} <<-> name AS dist
+                  FROM servers ORDER BY dist LIMIT {limit}) sv""",
+        "database": """
+            SELECT 'database' AS kind, d.id, d.name, d.dist,
+                   sv.name AS server, d.name AS database, NULL AS schema,
+                   NULL AS "table", NULL AS "column", NULL AS data_type
+            FROM (SELECT id, server_id, name, {q} <<-> name AS dist
+                  FROM databases ORDER BY dist LIMIT {limit}) d
+            JOIN servers sv ON sv.id = d.server_id""",
+        "schema": """
+            SELECT 'schema' AS kind, sc.id, sc.name, sc.dist,
+                   sv.name AS server, d.name AS database, sc.name AS schema,
+                   NULL AS "table", NULL AS "column", NULL AS data_type
+            FROM (SELECT id, database_id, name, {q} <<-> name AS dist
+                  FROM schemas ORDER BY dist LIMIT {limit}) sc
+            JOIN databases d ON d.id = sc.database_id
+            JOIN servers sv ON sv.id = d.server_id""",
+        "table": """
+            SELECT 'table' AS kind, t.id, t.name, t.dist,
+                   sv.name AS server, d.name AS database, sc.name AS schema,
+                   t.name AS "table", NULL AS "column", NULL AS data_type
+            FROM (SELECT id, schema_id, name, {q} <<-> name AS dist
+                  FROM tables ORDER BY dist LIMIT {limit}) t
+            JOIN schemas sc ON sc.id = t.schema_id
+            JOIN databases d ON d.id = sc.database_id
+            JOIN servers sv ON sv.id = d.server_id""",
+        "column": """
+            SELECT 'column' AS kind, c.id, c.name, c.dist,
+                   sv.name AS server, d.name AS database, sc.name AS schema,
+                   t.name AS "table", c.name AS "column", c.data_type
+            FROM (SELECT id, table_id, name, data_type, {q} <<-> name AS dist
+                  FROM columns {column_filter} ORDER BY dist LIMIT {limit}) c
+            JOIN tables t ON t.id = c.table_id
+            JOIN schemas sc ON sc.id = t.schema_id
+            JOIN databases d ON d.id = sc.database_id
+            JOIN servers sv ON sv.id = d.server_id""",
+    }
+
+    @classmethod
+    def _search_query(cls, kinds: Iterable[str], with_data_type: bool, placeholders: Dict[str, str]) -> str:
+        """
+        Build the ranked search over `kinds`. Hits are ordered exact name
+        match first, then by word similarity of the query to the name, then
+        by whole-name similarity (so `email` ranks above `email_verified_at`).
         """
-        Inserts or updates column metadata for a specific table using data
-        from the discover_columns_json method's output.
+        column_filter = f"WHERE data_type ILIKE {placeholders['data_type']}" if with_data_type else ""
+        branches = [
+            cls._SEARCH_BRANCHES[kind].format(column_filter=column_filter, **placeholders)
+            for kind in cls.SEARCH_KINDS if kind in kinds
+        ]
+        return """
+            SELECT kind, id,
+                   concat_ws('.', server, database, schema, "table", "column") AS path,
+                   server, database, schema, "table", "column", data_type,
+                   round((1 - dist)::numeric, 3)::float AS score
+            FROM ({branches}) hits
+            WHERE 1 - dist >= {min_score}
+            ORDER BY lower(name) = lower({q}) DESC, dist, similarity(name, {q}) DESC, kind, id
+            LIMIT {limit};
+        """.format(branches=" UNION ALL ".join(branches), **placeholders)
+
+    @timed(POSTGRES_SECONDS, "search")
+    def search(self, q: str, kinds: Optional[Iterable[str]] = None, data_type: Optional[str] = None,
+               limit: int = 20, min_score: float = 0.3) -> List[Dict[str, Any]]:
         """
-        # 1. Parse the JSON string into a Python list of dictionaries
+        Ranked fuzzy/substring search over server, database, schema, table
+        and column names, e.g. `q="customer email"` finds
+        `crm.sales.dbo.Customers.EmailAddress`. `data_type` (an ILIKE
+        pattern such as `%char%`) restricts the search to columns of that
+        type. Requires the pg_trgm indexes of init_metadata.sql.
+        """
+        kinds = set(kinds or self.SEARCH_KINDS)
+        if data_type:
+            kinds = {"column"}
+        placeholders = {"q": "%(q)s", "limit": "%(limit)s", "min_score": "%(min_score)s",
+                        "data_type": "%(data_type)s"}
+        query = self._search_query(kinds, bool(data_type), placeholders)
+        return self._execute(query, {"q": q, "limit": limit, "min_score": min_score, "data_type": data_type})
+
+    # ---------------------------------------------------------------------
+    # Catalog tree (one nested JSON document per request)
+    # ---------------------------------------------------------------------
+
+    TREE_LEVELS = ("servers", "databases", "schemas", "tables", "columns")
+
+    # level -> (node fields, parent column, children ORDER BY)
+    _TREE = {
+        "servers": (("id", "name", "host", "port", "username"), None, "id"),
+        "databases": (("id", "name", "created_at"), "server_id", "name"),
+        "schemas": (("id", "name", "created_at"), "database_id", "name"),
+        "tables": (("id", "name", "row_count", "reserved_pages", "used_pages", "index_count", "stats_updated_at",
+                    "created_at"), "schema_id", "name"),
+        "columns": (("id", "name", "data_type", "max_length", "is_nullable", "is_primary_key", "is_foreign_key",
+                     "default_value", "ordinal_position"), "table_id", "ordinal_position"),
+    }
+    TREE_COLUMN_FIELDS = _TREE["columns"][0]
+
+    @classmethod
+    def _tree_levels(cls, root: str, depth: Optional[int]) -> Tuple[str, ...]:
+        start = cls.TREE_LEVELS.index(root)
+        return cls.TREE_LEVELS[start:] if depth is None else cls.TREE_LEVELS[start:start + depth + 1]
+
+    @classmethod
+    def _tree_query(cls, root: str, depth: Optional[int], column_fields: Iterable[str],
+                    placeholder: Optional[str]) -> str:
+        """
+        One statement returning the subtree below `root` nodes (the one with
+        id `placeholder`, or all of them) as a single JSON text: each node
+        is a json_build_object of its fields plus its children, aggregated
+        with json_agg by a correlated subquery on the parent column, down to
+        `depth` levels (None: down to columns) below the root.
+        """
+        levels = cls._tree_levels(root, depth)
+        column_fields = tuple(column_fields)
+
+        def node(i: int) -> str:
+            level, alias = levels[i], f"n{i}"
+            fields = column_fields if level == "columns" else cls._TREE[level][0]
+            pairs = [f"'{field}', {alias}.{field}" for field in fields]
+            if i + 1 < len(levels):
+                child, child_alias = levels[i + 1], f"n{i + 1}"
+                _, parent_column, order = cls._TREE[child]
+                pairs.append(
+                    f"'{child}', (SELECT COALESCE(json_agg({node(i + 1)} ORDER BY {child_alias}.{order}, "
+                    f"{child_alias}.id), '[]'::json) FROM {child} {child_alias} "
+                    f"WHERE {child_alias}.{parent_column} = {alias}.id)"
+                )
+            return f"json_build_object({', '.join(pairs)})"
+
+        where = f" WHERE n0.id = {placeholder}" if placeholder else ""
+        order = cls._TREE[root][2]
+        return (f"SELECT COALESCE(json_agg({node(0)} ORDER BY n0.{order}, n0.id), '[]'::json)::text AS tree "
+                f"FROM {root} n0{where};")
+
+    @classmethod
+    def _tree_size_query(cls, root: str, depth: Optional[int], placeholder: Optional[str]) -> str:
+        """Count the nodes of the deepest level of a tree (see _tree_query)."""
+        levels = cls._tree_levels(root, depth)
+        query = f"SELECT count(*) AS nodes FROM {levels[-1]} n{len(levels) - 1}"
+        for i in range(len(levels) - 1, 0, -1):
+            query += f" JOIN {levels[i - 1]} n{i - 1} ON n{i - 1}.id = n{i}.{cls._TREE[levels[i]][1]}"
+        return query + (f" WHERE n0.id = {placeholder};" if placeholder else ";")
+
+    @timed(POSTGRES_SECONDS, "get_tree_size")
+    def get_tree_size(self, root: str, root_id: Optional[int] = None, depth: Optional[int] = None) -> int:
+        """Number of nodes at the deepest level of the tree get_tree() would return."""
+        placeholder = "%s" if root_id is not None else None
+        rows = self._execute(self._tree_size_query(root, depth, placeholder),
+                             (root_id,) if root_id is not None else None)
+        return rows[0]["nodes"]
+
+    @timed(POSTGRES_SECONDS, "get_tree")
+    def get_tree(self, root: str, root_id: Optional[int] = None, depth: Optional[int] = None,
+                 column_fields: Iterable[str] = TREE_COLUMN_FIELDS) -> str:
+        """
+        The catalog tree below the `root` level (servers, databases, ...)
+        node with id `root_id`, or below every node of that level, as JSON
+        text: a list of nodes, each with its children under the child
+        level's name. Built by Postgres in one statement (see _tree_query).
+        """
+        placeholder = "%s" if root_id is not None else None
+        rows = self._execute(self._tree_query(root, depth, column_fields, placeholder),
+                             (root_id,) if root_id is not None else None)
+        return rows[0]["tree"]
+
+    # ---------------------------------------------------------------------
+    # Foreign key relationships
+    # ---------------------------------------------------------------------
+
+    _TABLE_DATABASE_QUERY = """
+        SELECT s.database_id
+        FROM tables t
+        JOIN schemas s ON s.id = t.schema_id
+        WHERE t.id = {table_id};
+    """
+
+    _RELATIONSHIP_EDGES_QUERY = """
+        SELECT fk.constraint_name, fk.ordinal,
+               t.id AS table_id, s.name || '.' || t.name AS table_name, c.name AS column_name,
+               rt.id AS referenced_table_id, rs.name || '.' || rt.name AS referenced_table,
+               rc.name AS referenced_column
+        FROM foreign_keys fk
+        JOIN columns c ON c.id = fk.column_id
+        JOIN tables t ON t.id = c.table_id
+        JOIN schemas s ON s.id = t.schema_id
+        JOIN columns rc ON rc.id = fk.referenced_column_id
+        JOIN tables rt ON rt.id = rc.table_id
+        JOIN schemas rs ON rs.id = rt.schema_id
+        WHERE fk.database_id = {database_id}
+        ORDER BY t.id, fk.constraint_name, fk.ordinal;
+    """
+
+    @timed(POSTGRES_SECONDS, "get_table_database_id")
+    def get_table_database_id(self, table_id: int) -> Optional[int]:
+        """Return the id of the database a table belongs to, or None if the table is unknown."""
+        rows = self._execute(self._TABLE_DATABASE_QUERY.format(table_id="%s"), (table_id,))
+        return rows[0]["database_id"] if rows else None
+
+    @timed(POSTGRES_SECONDS, "get_relationship_edges")
+    def get_relationship_edges(self, database_id: int) -> List[Dict[str, Any]]:
+        """Return every foreign key column pair of a database, with table ids and qualified names."""
+        return self._execute(self._RELATIONSHIP_EDGES_QUERY.format(database_id="%s"), (database_id,))
+
+    # ---------------------------------------------------------------------
+    # Bulk catalog sync (COPY into staging tables + set-based merge)
+    # ---------------------------------------------------------------------
+
+    # Harvested records buffered before they are copied into the staging tables.
+    COPY_BATCH_ROWS = 10000
+
+    @timed(POSTGRES_SECONDS, "sync_database_catalog")
+    def sync_database_catalog(self, database_id: int, records: Iterable[Any],
+                              changed: Optional[Set[Tuple[str, str]]] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Merge a harvested snapshot of one database into the catalog.
+
+        `records` is the output of SQLServerClient.harvest_database(). The
+        schemas, tables and columns are loaded into temporary staging tables
+        with COPY FROM STDIN, every COPY_BATCH_ROWS records as they arrive,
+        then merged into the metadata tables with set-based INSERT ... ON
+        CONFLICT / UPDATE / DELETE statements in a single transaction.
+        Objects that no longer exist at the source are removed. Besides the
+        current batch, only one fingerprint per table is kept in memory; the
+        transaction stays open while `records` is being consumed.
+
+        Each table keeps a fingerprint (hash of its column definitions) and
+        its SQL Server modify_date. Columns are only merged for tables whose
+        fingerprint changed, so unchanged tables cost no writes, and tables
+        skipped by an incremental harvest keep their stored columns. The
+        database's modify watermark is advanced to the newest modify_date.
+
+        Foreign keys are stored as column-to-column edges in foreign_keys;
+        the edges of every harvested table are replaced by the harvested
+        ones (edges of dropped columns go away by cascade).
+
+        Table size statistics (row count, pages, index count, last stats
+        update) are written on the tables rows, only where they changed;
+        they are counted as "table_stats" updates. These move on every live
+        database and are not catalog changes: callers should not bump the
+        catalog version for them.
+
+        Returns insert/update/delete counts per level, e.g.
+        {"schemas": {"inserted": 0, "updated": 0, "deleted": 1}, ...}.
+        If `changed` is given, the (schema, table) names of tables that were
+        added, dropped or whose columns changed are added to it once the
+        transaction commits.
+        """
+        buffers = {level: io.StringIO() for level in ("schemas", "tables", "columns", "foreign_keys", "table_stats")}
+        # The table rows are copied before their columns are seen; their fingerprints follow at the end.
+        copy_targets = {level: f"stage_{level}" for level in buffers}
+        copy_targets["tables"] = "stage_tables (schema_name, name, modify_date, columns_harvested)"
+        fingerprints: Dict[Tuple[str, str], Any] = {}
+        counts = {level: {"inserted": 0, "updated": 0, "deleted": 0} for level in buffers}
+
+        def flush(cur):
+            for level, buf in buffers.items():
+                if buf.tell():
+                    buf.seek(0)
+                    cur.copy_expert(f"COPY {copy_targets[level]} FROM STDIN", buf)
+                    buf.seek(0)
+                    buf.truncate()
+
         try:
-            columns_data: List[Dict[str, Any]] = json.loads(columns_json_str)
-        except json.JSONDecodeError:
-            print("Error: Could not decode JSON string.")
-            return 0
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    CREATE TEMP TABLE stage_schemas (
+                        name TEXT NOT NULL
+                    ) ON COMMIT DROP;
+                    CREATE TEMP TABLE stage_tables (
+                        schema_name TEXT NOT NULL,
+                        name TEXT NOT NULL,
+                        modify_date TIMESTAMP,
+                        columns_harvested BOOLEAN NOT NULL,
+                        fingerprint TEXT
+                    ) ON COMMIT DROP;
+                    CREATE TEMP TABLE stage_fingerprints (
+                        schema_name TEXT NOT NULL,
+                        table_name TEXT NOT NULL,
+                        fingerprint TEXT NOT NULL
+                    ) ON COMMIT DROP;
+                    CREATE TEMP TABLE stage_columns (
+                        schema_name TEXT NOT NULL,
+                        table_name TEXT NOT NULL,
+                        name TEXT NOT NULL,
+                        data_type TEXT NOT NULL,
+                        max_length INTEGER,
+                        is_nullable BOOLEAN,
+                        is_primary_key BOOLEAN,
+                        is_foreign_key BOOLEAN,
+                        default_value TEXT,
+                        ordinal_position INTEGER
+                    ) ON COMMIT DROP;
+                    CREATE TEMP TABLE stage_foreign_keys (
+                        constraint_name TEXT NOT NULL,
+                        schema_name TEXT NOT NULL,
+                        table_name TEXT NOT NULL,
+                        column_name TEXT NOT NULL,
+                        referenced_schema TEXT NOT NULL,
+                        referenced_table TEXT NOT NULL,
+                        referenced_column TEXT NOT NULL,
+                        ordinal INTEGER NOT NULL
+                    ) ON COMMIT DROP;
+                    CREATE TEMP TABLE stage_table_stats (
+                        schema_name TEXT NOT NULL,
+                        table_name TEXT NOT NULL,
+                        row_count BIGINT,
+                        reserved_pages BIGINT,
+                        used_pages BIGINT,
+                        index_count INTEGER,
+                        stats_updated_at TIMESTAMP
+                    ) ON COMMIT DROP;
+                """)
+                buffered = 0
+                for record in records:
+                    if isinstance(record, SchemaRecord):
+                        buffers["schemas"].write(_copy_row((record.name,)))
+                    elif isinstance(record, TableRecord):
+                        buffers["tables"].write(_copy_row((
+                            record.schema_name,
+                            record.name,
+                            record.modify_date,
+                            record.columns_harvested,
+                        )))
+                    elif isinstance(record, ColumnRecord):
+                        values = (
+                            record.schema_name,
+                            record.table_name,
+                            record.name,
+                            record.data_type,
+                            record.max_length,
+                            record.is_nullable,
+                            record.is_primary_key,
+                            record.is_foreign_key,
+                            record.default_value,
+                            record.ordinal_position,
+                        )
+                        fingerprint = fingerprints.setdefault((record.schema_name, record.table_name), hashlib.md5())
+                        fingerprint.update(repr(values[2:]).encode())
+                        buffers["columns"].write(_copy_row(values))
+                    elif isinstance(record, ForeignKeyRecord):
+                        buffers["foreign_keys"].write(_copy_row((
+                            record.constraint_name,
+                            record.schema_name,
+                            record.table_name,
+                            record.column_name,
+                            record.referenced_schema,
+                            record.referenced_table,
+                            record.referenced_column,
+                            record.ordinal,
+                        )))
+                    elif isinstance(record, TableStatsRecord):
+                        buffers["table_stats"].write(_copy_row((
+                            record.schema_name,
+                            record.table_name,
+                            record.row_count,
+                            record.reserved_pages,
+                            record.used_pages,
+                            record.index_count,
+                            record.stats_updated_at,
+                        )))
+                    buffered += 1
+                    if buffered >= self.COPY_BATCH_ROWS:
+                        flush(cur)
+                        buffered = 0
+                flush(cur)
+
+                fingerprint_rows = io.StringIO()
+                for (schema_name, table_name), fingerprint in fingerprints.items():
+                    fingerprint_rows.write(_copy_row((schema_name, table_name, fingerprint.hexdigest())))
+                fingerprint_rows.seek(0)
+                cur.copy_expert("COPY stage_fingerprints FROM STDIN", fingerprint_rows)
+                cur.execute("""
+                    ANALYZE stage_fingerprints;
+                    UPDATE stage_tables st
+                    SET fingerprint = sf.fingerprint
+                    FROM stage_fingerprints sf
+                    WHERE sf.schema_name = st.schema_name AND sf.table_name = st.name;
+                    UPDATE stage_tables SET fingerprint = %(empty)s WHERE fingerprint IS NULL;
+                """, {"empty": hashlib.md5().hexdigest()})
+                cur.execute("ANALYZE stage_schemas; ANALYZE stage_tables; ANALYZE stage_columns; "
+                            "ANALYZE stage_foreign_keys; ANALYZE stage_table_stats;")
+
+                # 1. Schemas
+                cur.execute("""
+                    INSERT INTO schemas (database_id, name)
+                    SELECT DISTINCT %(db)s, st.name
+                    FROM stage_schemas st
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM schemas s WHERE s.database_id = %(db)s AND s.name = st.name
+                    );
+                """, {"db": database_id})
+                counts["schemas"]["inserted"] = cur.rowcount
+
+                # 2. Tables: new ones get no fingerprint yet, so they land in changed_tables below
+                cur.execute("""
+                    INSERT INTO tables (schema_id, name)
+                    SELECT s.id, st.name
+                    FROM stage_tables st
+                    JOIN schemas s ON s.database_id = %(db)s AND s.name = st.schema_name
+                    ON CONFLICT (schema_id, name) DO NOTHING;
+                """, {"db": database_id})
+                counts["tables"]["inserted"] = cur.rowcount
+
+                cur.execute("""
+                    CREATE TEMP TABLE changed_tables ON COMMIT DROP AS
+                    SELECT t.id AS table_id, s.name AS schema_name, t.name AS table_name,
+                           st.modify_date, st.fingerprint
+                    FROM stage_tables st
+                    JOIN schemas s ON s.database_id = %(db)s AND s.name = st.schema_name
+                    JOIN tables t ON t.schema_id = s.id AND t.name = st.name
+                    WHERE st.columns_harvested
+                      AND t.fingerprint IS DISTINCT FROM st.fingerprint;
+                    ANALYZE changed_tables;
+                """, {"db": database_id})
+                cur.execute("SELECT schema_name, table_name FROM changed_tables;")
+                changed_names = set(cur.fetchall())
+
+                # 3. Columns of changed tables: insert new ones, update only the ones that changed
+                cur.execute("""
+                    WITH upserted AS (
+                        INSERT INTO columns (
+                            table_id, name, data_type, max_length, is_nullable,
+                            is_primary_key, is_foreign_key, default_value, ordinal_position
+                        )
+                        SELECT
+                            ct.table_id, sc.name, sc.data_type, sc.max_length, sc.is_nullable,
+                            sc.is_primary_key, sc.is_foreign_key, sc.default_value, sc.ordinal_position
+                        FROM stage_columns sc
+                        JOIN changed_tables ct
+                            ON ct.schema_name = sc.schema_name AND ct.table_name = sc.table_name
+                        ON CONFLICT (table_id, name) DO UPDATE
+                        SET
+                            data_type = EXCLUDED.data_type,
+                            max_length = EXCLUDED.max_length,
+                            is_nullable = EXCLUDED.is_nullable,
+                            is_primary_key = EXCLUDED.is_primary_key,
+                            is_foreign_key = EXCLUDED.is_foreign_key,
+                            default_value = EXCLUDED.default_value,
+                            ordinal_position = EXCLUDED.ordinal_position,
+                            updated_at = NOW()
+                        WHERE (
+                            columns.data_type, columns.max_length, columns.is_nullable,
+                            columns.is_primary_key, columns.is_foreign_key,
+                            columns.default_value, columns.ordinal_position
+                        ) IS DISTINCT FROM (
+                            EXCLUDED.data_type, EXCLUDED.max_length, EXCLUDED.is_nullable,
+                            EXCLUDED.is_primary_key, EXCLUDED.is_foreign_key,
+                            EXCLUDED.default_value, EXCLUDED.ordinal_position
+                        )
+                        RETURNING (xmax = 0) AS inserted
+                    )
+                    SELECT
+                        COUNT(*) FILTER (WHERE inserted),
+                        COUNT(*) FILTER (WHERE NOT inserted)
+                    FROM upserted;
+                """)
+                counts["columns"]["inserted"], counts["columns"]["updated"] = cur.fetchone()
+
+                cur.execute("""
+                    SELECT COUNT(*)
+                    FROM changed_tables ct
+                    JOIN tables t ON t.id = ct.table_id
+                    WHERE t.fingerprint IS NOT NULL;
+                """)
+                counts["tables"]["updated"] = cur.fetchone()[0]
+
+                cur.execute("""
+                    UPDATE tables t
+                    SET fingerprint = ct.fingerprint,
+                        modify_date = ct.modify_date,
+                        updated_at = CASE WHEN t.fingerprint IS NULL THEN t.updated_at ELSE NOW() END
+                    FROM changed_tables ct
+                    WHERE t.id = ct.table_id;
+                """)
 
-        inserted_count = 0
+                # 4. Remove objects dropped at the source, bottom-up so each level is counted
+                cur.execute("""
+                    DELETE FROM columns c
+                    USING tables t, schemas s
+                    WHERE c.table_id = t.id
+                      AND t.schema_id = s.id
+                      AND s.database_id = %(db)s
+                      AND (
+                          NOT EXISTS (
+                              SELECT 1 FROM stage_tables st
+                              WHERE st.schema_name = s.name AND st.name = t.name
+                          )
+                          OR (
+                              t.id IN (SELECT table_id FROM changed_tables)
+                              AND NOT EXISTS (
+                                  SELECT 1 FROM stage_columns sc
+                                  WHERE sc.schema_name = s.name AND sc.table_name = t.name AND sc.name = c.name
+                              )
+                          )
+                      );
+                """, {"db": database_id})
+                counts["columns"]["deleted"] = cur.rowcount
 
+                cur.execute("""
+                    DELETE FROM tables t
+                    USING schemas s
+                    WHERE t.schema_id = s.id
+                      AND s.database_id = %(db)s
+                      AND NOT EXISTS (
+                          SELECT 1 FROM stage_tables st
+                          WHERE st.schema_name = s.name AND st.name = t.name
+                      )
+                    RETURNING s.name, t.name;
+                """, {"db": database_id})
+                counts["tables"]["deleted"] = cur.rowcount
+                changed_names.update(cur.fetchall())
+
+                cur.execute("""
+                    DELETE FROM schemas s
+                    WHERE s.database_id = %(db)s
+                      AND NOT EXISTS (SELECT 1 FROM stage_schemas st WHERE st.name = s.name);
+                """, {"db": database_id})
+                counts["schemas"]["deleted"] = cur.rowcount
+
+                # 5. Foreign key edges of harvested tables, resolved to column ids
+                cur.execute("""
+                    CREATE TEMP TABLE harvested_foreign_keys ON COMMIT DROP AS
+                    SELECT sf.constraint_name, sf.ordinal, c.id AS column_id, rc.id AS referenced_column_id
+                    FROM stage_foreign_keys sf
+                    JOIN schemas s ON s.database_id = %(db)s AND s.name = sf.schema_name
+                    JOIN tables t ON t.schema_id = s.id AND t.name = sf.table_name
+                    JOIN columns c ON c.table_id = t.id AND c.name = sf.column_name
+                    JOIN schemas rs ON rs.database_id = %(db)s AND rs.name = sf.referenced_schema
+                    JOIN tables rt ON rt.schema_id = rs.id AND rt.name = sf.referenced_table
+                    JOIN columns rc ON rc.table_id = rt.id AND rc.name = sf.referenced_column;
+                """, {"db": database_id})
+
+                cur.execute("""
+                    DELETE FROM foreign_keys fk
+                    USING columns c, tables t, schemas s, stage_tables st
+                    WHERE fk.column_id = c.id
+                      AND c.table_id = t.id
+                      AND t.schema_id = s.id
+                      AND s.database_id = %(db)s
+                      AND st.schema_name = s.name AND st.name = t.name
+                      AND st.columns_harvested
+                      AND NOT EXISTS (
+                          SELECT 1 FROM harvested_foreign_keys h
+                          WHERE h.column_id = fk.column_id
+                            AND h.constraint_name = fk.constraint_name
+                            AND h.ordinal = fk.ordinal
+                      );
+                """, {"db": database_id})
+                counts["foreign_keys"]["deleted"] = cur.rowcount
+
+                cur.execute("""
+                    WITH upserted AS (
+                        INSERT INTO foreign_keys (database_id, constraint_name, column_id, referenced_column_id, ordinal)
+                        SELECT %(db)s, constraint_name, column_id, referenced_column_id, ordinal
+                        FROM harvested_foreign_keys
+                        ON CONFLICT (column_id, constraint_name, ordinal) DO UPDATE
+                        SET referenced_column_id = EXCLUDED.referenced_column_id
+                        WHERE foreign_keys.referenced_column_id <> EXCLUDED.referenced_column_id
+                        RETURNING (xmax = 0) AS inserted
+                    )
+                    SELECT
+                        COUNT(*) FILTER (WHERE inserted),
+                        COUNT(*) FILTER (WHERE NOT inserted)
+                    FROM upserted;
+                """, {"db": database_id})
+                counts["foreign_keys"]["inserted"], counts["foreign_keys"]["updated"] = cur.fetchone()
+
+                # 6. Table size statistics, where they changed
+                cur.execute("""
+                    UPDATE tables t
+                    SET row_count = sts.row_count,
+                        reserved_pages = sts.reserved_pages,
+                        used_pages = sts.used_pages,
+                        index_count = sts.index_count,
+                        stats_updated_at = sts.stats_updated_at
+                    FROM stage_table_stats sts
+                    JOIN schemas s ON s.database_id = %(db)s AND s.name = sts.schema_name
+                    WHERE t.schema_id = s.id
+                      AND t.name = sts.table_name
+                      AND (t.row_count, t.reserved_pages, t.used_pages, t.index_count, t.stats_updated_at)
+                          IS DISTINCT FROM
+                          (sts.row_count, sts.reserved_pages, sts.used_pages, sts.index_count, sts.stats_updated_at);
+                """, {"db": database_id})
+                counts["table_stats"]["updated"] = cur.rowcount
+
+                # 7. Advance the incremental watermark
+                cur.execute("""
+                    UPDATE databases
+                    SET modify_watermark = GREATEST(
+                        modify_watermark, (SELECT MAX(modify_date) FROM stage_tables)
+                    )
+                    WHERE id = %(db)s;
+                """, {"db": database_id})
+
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        if changed is not None:
+            changed.update(changed_names)
+        return counts
+
+    @timed(POSTGRES_SECONDS, "get_modify_watermarks")
+    def get_modify_watermarks(self) -> Dict[tuple, Any]:
+        """
+        Return the incremental sync watermark of every known database,
+        keyed by (server_id, database_name).
+        """
+        rows = self._execute("SELECT server_id, name, modify_watermark FROM databases;")
+        return {(row["server_id"], row["name"]): row["modify_watermark"] for row in rows}
+
+    @timed(POSTGRES_SECONDS, "delete_databases_not_in")
+    def delete_databases_not_in(self, server_id: int, db_names: List[str], allow_empty: bool = False) -> int:
+        """
+        Remove databases of a server that were dropped at the source, along
+        with their schemas, tables and columns. Returns the number of
+        databases removed.
+
+        An empty `db_names` would remove the server's whole catalog; it is
+        more often a failed or restricted listing than a server without
+        databases, so it raises ValueError unless `allow_empty` is set.
+        """
+        if not db_names and not allow_empty:
+            raise ValueError(f"Refusing to remove every database of server {server_id}")
         with self.conn.cursor() as cur:
-            # Prepare the base SQL statement
-            sql_statement = """
-            INSERT INTO columns (
-                table_id, 
-                name, 
-                data_type, 
-                max_length, 
-                is_nullable, 
-                is_primary_key, 
-                is_foreign_key, 
-                default_value, 
-                ordinal_position
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (table_id, name) DO UPDATE 
-            SET 
-                data_type = EXCLUDED.data_type,
-                max_length = EXCLUDED.max_length,
-                is_nullable = EXCLUDED.is_nullable,
-                is_primary_key = EXCLUDED.is_primary_key,
-                is_foreign_key = EXCLUDED.is_foreign_key,
-                default_value = EXCLUDED.default_value,
-                ordinal_position = EXCLUDED.ordinal_position,
-                created_at = NOW() -- optional: update timestamp to reflect sync
-            """
-
-            # 2. Iterate and execute the upsert for each column
-            for column in columns_data:
-                # Prepare the values tuple
-                values = (
-                    table_id,
-                    column['name'],
-                    column['data_type'],
-                    column.get('max_length', None),
-                    bool(column['is_nullable']),  # Convert 0/1 to boolean
-                    bool(column['is_primary_key']),  # Convert 0/1 to boolean
-                    bool(column['is_foreign_key']),  # Convert 0/1 to boolean
-                    column.get('default_value'),  # Use .get() in case it's null
-                    column['ordinal_position']
-                )
+            cur.execute("""
+                DELETE FROM schemas s
+                USING databases d
+                WHERE s.database_id = d.id
+                  AND d.server_id = %s
+                  AND d.name <> ALL(%s);
+            """, (server_id, list(db_names)))
+            cur.execute("""
+                DELETE FROM databases
+                WHERE server_id = %s AND name <> ALL(%s);
+            """, (server_id, list(db_names)))
+            deleted = cur.rowcount
+        self.conn.commit()
+        return deleted
+
+    # ---------------------------------------------------------------------
+    # Sync lock
+    # ---------------------------------------------------------------------
 
-                cur.execute(sql_statement, values)
-                inserted_count += cur.rowcount  # Keep track of rows inserted/updated
+    def try_advisory_lock(self, key: int) -> bool:
+        """
+        Take a session-level advisory lock on this thread's session
+        connection without waiting. Held until advisory_unlock() or until
+        the connection closes, so a crashed holder never blocks others.
+        """
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s);", (key,))
+            acquired = cur.fetchone()[0]
+        self.conn.commit()
+        return acquired
 
-        # Commit transaction outside the cursor block (assuming self.conn is set to autocommit=False)
+    def advisory_unlock(self, key: int):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (key,))
         self.conn.commit()
 
-        return inserted_count
+    # ---------------------------------------------------------------------
+    # Catalog version
+    # ---------------------------------------------------------------------
 
-    def get_columns(self, table_id: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Return columns; if table_id is None, return all."""
-        if table_id is not None:
-            query = """
-                SELECT
-                    id, name, data_type, max_length, is_nullable,
-                    is_primary_key, is_foreign_key, default_value,
-                    ordinal_position, table_id, created_at
-                FROM columns
-                WHERE table_id = %s
-                ORDER BY ordinal_position;
-            """
-            params = (table_id,)
-        else:
-            query = """
-                SELECT
-                    id, name, data_type, max_length, is_nullable,
-                    is_primary_key, is_foreign_key, default_value,
-                    ordinal_position, table_id, created_at
-                FROM columns
-                ORDER BY table_id, ordinal_position;
-            """
-            params = None
-        return self._execute(query, params)
+    @timed(POSTGRES_SECONDS, "get_catalog_version")
+    def get_catalog_version(self) -> int:
+        """Return the current catalog version (0 if no sync changed anything yet)."""
+        rows = self._execute("SELECT version FROM catalog_state WHERE id;")
+        return rows[0]["version"] if rows else 0
+
+    @timed(POSTGRES_SECONDS, "bump_catalog_version")
+    def bump_catalog_version(self) -> int:
+        """Increment the catalog version after a sync changed the catalog, and return it."""
+        rows = self._execute("""
+            INSERT INTO catalog_state (id, version, updated_at)
+            VALUES (TRUE, 1, NOW())
+            ON CONFLICT (id) DO UPDATE
+            SET version = catalog_state.version + 1, updated_at = NOW()
+            RETURNING version;
+        """, write=True)
+        return rows[0]["version"]
+
+    # ---------------------------------------------------------------------
+    # Query logs
+    # ---------------------------------------------------------------------
+
+    @timed(POSTGRES_SECONDS, "insert_query_logs")
+    def insert_query_logs(self, records: Iterable[Any]):
+        """Append QueryLogRecords to query_logs with a single COPY."""
+        buf = io.StringIO()
+        for record in records:
+            buf.write(_copy_row((
+                record.query_text,
+                json.dumps(record.target_scope, default=str),
+                record.execution_time_ms,
+                record.status,
+                record.row_count,
+                record.cached,
+                record.created_at,
+            )))
+        buf.seek(0)
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.copy_expert(
+                        "COPY query_logs (query_text, target_scope, execution_time_ms, status, "
+                        "row_count, cached, created_at) FROM STDIN",
+                        buf,
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
 
     # ---------------------------------------------------------------------
     # Utility for testing / debugging
     # ---------------------------------------------------------------------
 
     def reset_metadata(self):
-        self._execute("DROP TABLE IF EXISTS columns;")
-        self._execute("DROP TABLE IF EXISTS tables;")
-        self._execute("DROP TABLE IF EXISTS schemas;")
-        self._execute("DROP TABLE IF EXISTS databases;")
-        self._execute("DROP TABLE IF EXISTS servers;")
+        """
+        Drop the catalog tables, referencing ones first (init_metadata.sql
+        recreates them). The catalog version is bumped rather than zeroed:
+        replicas only move their version forward, so a version going back
+        would leave them serving listings of the dropped catalog.
+        """
+        self._execute("DROP TABLE IF EXISTS foreign_keys;", fetch=False, write=True)
+        self._execute("DROP TABLE IF EXISTS columns;", fetch=False, write=True)
+        self._execute("DROP TABLE IF EXISTS tables;", fetch=False, write=True)
+        self._execute("DROP TABLE IF EXISTS schemas;", fetch=False, write=True)
+        self._execute("DROP TABLE IF EXISTS databases;", fetch=False, write=True)
+        self._execute("DROP TABLE IF EXISTS servers;", fetch=False, write=True)
+        if self._execute("SELECT to_regclass('catalog_state') IS NOT NULL AS found;")[0]["found"]:
+            self.bump_catalog_version()
 
     def ping(self) -> bool:
-        """Check if the PostgreSQL connection is alive."""
+        """Check if the PostgreSQL metadata store is reachable."""
         try:
-            if not self.conn:
-                self.connect()
-            with self.conn.cursor() as cur:
-                cur.execute("SELECT 1;")
+            with self.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1;")
             return True
         except Exception:
             return False
 
     def commit(self):
-        if self.conn:
-            self.conn.commit()
\ No newline at end of file
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.commit()
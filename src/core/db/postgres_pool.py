@@ -0,0 +1,150 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import ThreadedConnectionPool
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be checked out within the timeout."""
+
+
+class PostgresConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections.
+
+    Wraps ThreadedConnectionPool, which fails immediately when exhausted,
+    with a semaphore so that callers wait (up to `checkout_timeout`
+    seconds) for a free connection instead. Connections are validated on
+    checkout: closed ones are replaced, and ones idle for more than
+    `validate_after` seconds are probed with SELECT 1 and transparently
+    reconnected if the probe fails.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, checkout_timeout: float = 30.0,
+                 validate_after: float = 30.0, **conn_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.checkout_timeout = checkout_timeout
+        self.validate_after = validate_after
+        self._pool = ThreadedConnectionPool(minconn, maxconn, **conn_kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used: Dict[int, float] = {}
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "reconnects": 0,
+            "in_use": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+        }
+
+    # ------------------------
+    # Checkout / checkin
+    # ------------------------
+
+    def getconn(self) -> extensions.connection:
+        """Check out a validated connection. Must be returned with putconn()."""
+        start = time.perf_counter()
+        waited = not self._slots.acquire(blocking=False)
+        if waited and not self._slots.acquire(timeout=self.checkout_timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise PoolTimeoutError(
+                f"No PostgreSQL connection available after {self.checkout_timeout}s "
+                f"(pool size {self.maxconn})"
+            )
+        wait_ms = (time.perf_counter() - start) * 1000
+
+        try:
+            conn = self._validated(self._pool.getconn())
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["wait_ms_total"] += wait_ms
+                self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], wait_ms)
+        return conn
+
+    def putconn(self, conn: extensions.connection, discard: bool = False):
+        """Return a connection to the pool, closing it if broken or `discard` is set."""
+        try:
+            if not conn.closed and not discard:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            discard = discard or bool(conn.closed)
+        except psycopg2.Error:
+            discard = True
+        finally:
+            with self._lock:
+                if discard:
+                    self._last_used.pop(id(conn), None)
+                else:
+                    self._last_used[id(conn)] = time.monotonic()
+                self._stats["in_use"] -= 1
+            self._pool.putconn(conn, close=discard)
+            self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[extensions.connection]:
+        """Check out a connection for the duration of the `with` block."""
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+        except extensions.QueryCanceledError:
+            # A statement timeout: the connection itself is fine.
+            raise
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def _validated(self, conn: extensions.connection) -> extensions.connection:
+        """Return `conn` if alive, otherwise a freshly opened replacement."""
+        idle_since = self._last_used.get(id(conn))
+        needs_probe = idle_since is not None and time.monotonic() - idle_since > self.validate_after
+        if not conn.closed and not needs_probe:
+            return conn
+        if not conn.closed:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1;")
+                conn.rollback()
+                return conn
+            except psycopg2.Error:
+                pass
+
+        self._pool.putconn(conn, close=True)
+        self._last_used.pop(id(conn), None)
+        with self._lock:
+            self._stats["reconnects"] += 1
+        return self._pool.getconn()
+
+    # ------------------------
+    # Lifecycle / stats
+    # ------------------------
+
+    def closeall(self):
+        self._pool.closeall()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool saturation and wait-time statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["min_size"] = self.minconn
+        stats["max_size"] = self.maxconn
+        stats["saturation"] = stats["in_use"] / self.maxconn if self.maxconn else 0.0
+        stats["wait_ms_avg"] = stats["wait_ms_total"] / stats["waits"] if stats["waits"] else 0.0
+        return stats
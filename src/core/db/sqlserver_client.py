@@ -1,5 +1,19 @@
+import time
+from datetime import datetime
+from typing import Iterator, Optional, Union
+
 import pyodbc
 
+from core.db.catalog_records import SchemaRecord, TableRecord, ColumnRecord, ForeignKeyRecord, TableStatsRecord
+from core.utils.metrics import SQLSERVER_SECONDS, timed
+
+CatalogRecord = Union[SchemaRecord, TableRecord, ColumnRecord, ForeignKeyRecord, TableStatsRecord]
+
+
+def _labels(client: "SQLServerClient", database_name: str = "", *args, **kwargs):
+    return {"server": client.host, "database": database_name}
+
+
 class SQLServerClient:
     """
     Generic SQL Server client for connecting, discovering databases and schemas.
@@ -11,6 +25,8 @@ class SQLServerClient:
         self.username = username
         self.password = password
         self.conn = None
+        # Seconds spent in the driver (execute/fetch) by harvest queries, for sync timing.
+        self.driver_seconds = 0.0
 
     def connect(self):
         conn_str = (
@@ -25,12 +41,14 @@ class SQLServerClient:
         if self.conn:
             self.conn.close()
 
+    @timed(SQLSERVER_SECONDS, "discover_databases", _labels)
     def discover_databases(self):
         """Return a list of non-system databases."""
         cursor = self.conn.cursor()
         cursor.execute("SELECT name FROM sys.databases WHERE name NOT IN ('master','tempdb','model','msdb');")
         return [row[0] for row in cursor.fetchall()]
 
+    @timed(SQLSERVER_SECONDS, "discover_schemas", _labels)
     def discover_schemas(self, database_name: str):
         """Return a list of schemas in the given database."""
         cursor = self.conn.cursor()
@@ -39,6 +57,7 @@ class SQLServerClient:
         cursor.execute(query)
         return [row[0] for row in cursor.fetchall()]
 
+    @timed(SQLSERVER_SECONDS, "discover_tables", _labels)
     def discover_tables(self, database_name: str, schema_name: str):
         """Return a list of tables in the given database and schema."""
         cursor = self.conn.cursor()
@@ -53,6 +72,7 @@ class SQLServerClient:
         cursor.close()
         return tables
 
+    @timed(SQLSERVER_SECONDS, "discover_columns", _labels)
     def discover_columns(self, database_name: str, schema_name: str, table_name: str) -> str:
         """
         Returns a JSON string of column metadata for a specific table,
@@ -156,4 +176,229 @@ class SQLServerClient:
         cursor.close()
 
         # The SQL query handles the JSON formatting, so just return the string
-        return json_result
\ No newline at end of file
+        return json_result
+
+    # ---------------------------------------------------------------------
+    # Set-based catalog harvest
+    # ---------------------------------------------------------------------
+
+    def harvest_database(self, database_name: str, batch_size: int = 5000,
+                         modified_since: Optional[datetime] = None) -> Iterator[CatalogRecord]:
+        """
+        Stream every schema, table, column and foreign key of a database, and
+        the size statistics of its tables.
+
+        Runs one set-based query per catalog level instead of one query per
+        table, and yields typed records in that order (all SchemaRecords,
+        then TableRecords, then ColumnRecords, then ForeignKeyRecords, then
+        TableStatsRecords).
+        Rows are fetched in batches of `batch_size` so memory stays bounded
+        whatever the size of the database.
+
+        When `modified_since` is given, the (cheap) schema and table lists are
+        still returned in full so dropped objects can be detected, but columns
+        and foreign keys are only read for tables whose sys.objects.modify_date
+        is at or after that watermark. Table statistics change without
+        touching modify_date, so they are always read for every table.
+        """
+        db = f"[{database_name}]"
+        if modified_since is not None:
+            modified_filter = "AND t.modify_date >= ?"
+            fk_modified_filter = "AND pt.modify_date >= ?"
+            params = (modified_since,)
+        else:
+            modified_filter = fk_modified_filter = ""
+            params = ()
+
+        schemas_query = f"SELECT s.name FROM {db}.sys.schemas s ORDER BY s.name"
+        for row in self._stream(schemas_query, batch_size,
+                                operation="harvest_schemas", database=database_name):
+            yield SchemaRecord(name=row[0])
+
+        tables_query = f"""
+        SELECT s.name, t.name, t.object_id, t.modify_date
+        FROM {db}.sys.tables t
+        INNER JOIN {db}.sys.schemas s ON s.schema_id = t.schema_id
+        WHERE t.is_ms_shipped = 0
+        ORDER BY s.name, t.name
+        """
+        for row in self._stream(tables_query, batch_size,
+                                operation="harvest_tables", database=database_name):
+            yield TableRecord(
+                schema_name=row[0],
+                name=row[1],
+                object_id=row[2],
+                modify_date=row[3],
+                columns_harvested=modified_since is None or row[3] >= modified_since,
+            )
+
+        columns_query = f"""
+        SELECT
+            s.name AS schema_name,
+            t.name AS table_name,
+            c.name AS name,
+            tn.name AS data_type,
+            CASE
+                WHEN tn.name IN ('nchar', 'nvarchar')
+                    THEN CASE WHEN c.max_length = -1 THEN -1 ELSE c.max_length / 2 END
+                WHEN tn.name IN ('char', 'varchar', 'binary', 'varbinary') THEN c.max_length
+                WHEN tn.name IN ('tinyint', 'smallint', 'int', 'bigint', 'decimal', 'numeric',
+                                 'float', 'real', 'money', 'smallmoney') THEN c.precision
+                ELSE NULL
+            END AS max_length,
+            CASE
+                WHEN tn.name IN ('tinyint', 'smallint', 'int', 'bigint', 'decimal', 'numeric',
+                                 'money', 'smallmoney') THEN c.scale
+                ELSE NULL
+            END AS numeric_scale,
+            c.is_nullable,
+            dc.definition AS default_value,
+            c.column_id AS ordinal_position,
+            CASE WHEN pk.column_id IS NOT NULL THEN 1 ELSE 0 END AS is_primary_key,
+            CASE WHEN fk.parent_column_id IS NOT NULL THEN 1 ELSE 0 END AS is_foreign_key
+        FROM {db}.sys.columns c
+        INNER JOIN {db}.sys.tables t ON t.object_id = c.object_id
+        INNER JOIN {db}.sys.schemas s ON s.schema_id = t.schema_id
+        -- Alias types (and sysname) are reported as their base system type. CLR types
+        -- (geography, hierarchyid, ...) have no base type row: use their own name.
+        INNER JOIN {db}.sys.types ty ON ty.user_type_id = c.user_type_id
+        LEFT JOIN {db}.sys.types bt ON bt.user_type_id = c.system_type_id
+        CROSS APPLY (VALUES (COALESCE(bt.name, ty.name))) tn (name)
+        LEFT JOIN {db}.sys.default_constraints dc ON dc.object_id = c.default_object_id
+        LEFT JOIN (
+            SELECT ic.object_id, ic.column_id
+            FROM {db}.sys.index_columns ic
+            INNER JOIN {db}.sys.indexes i
+                ON i.object_id = ic.object_id AND i.index_id = ic.index_id
+            WHERE i.is_primary_key = 1
+        ) pk ON pk.object_id = c.object_id AND pk.column_id = c.column_id
+        LEFT JOIN (
+            SELECT DISTINCT parent_object_id, parent_column_id
+            FROM {db}.sys.foreign_key_columns
+        ) fk ON fk.parent_object_id = c.object_id AND fk.parent_column_id = c.column_id
+        WHERE t.is_ms_shipped = 0
+        {modified_filter}
+        ORDER BY s.name, t.name, c.column_id
+        """
+        for row in self._stream(columns_query, batch_size, *params,
+                                operation="harvest_columns", database=database_name):
+            yield ColumnRecord(
+                schema_name=row[0],
+                table_name=row[1],
+                name=row[2],
+                data_type=row[3],
+                max_length=row[4],
+                numeric_scale=row[5],
+                is_nullable=bool(row[6]),
+                default_value=row[7],
+                ordinal_position=row[8],
+                is_primary_key=bool(row[9]),
+                is_foreign_key=bool(row[10]),
+            )
+
+        foreign_keys_query = f"""
+        SELECT
+            fk.name,
+            ps.name, pt.name, pc.name,
+            rs.name, rt.name, rc.name,
+            fkc.constraint_column_id
+        FROM {db}.sys.foreign_key_columns fkc
+        INNER JOIN {db}.sys.foreign_keys fk ON fk.object_id = fkc.constraint_object_id
+        INNER JOIN {db}.sys.tables pt ON pt.object_id = fkc.parent_object_id
+        INNER JOIN {db}.sys.schemas ps ON ps.schema_id = pt.schema_id
+        INNER JOIN {db}.sys.columns pc
+            ON pc.object_id = fkc.parent_object_id AND pc.column_id = fkc.parent_column_id
+        INNER JOIN {db}.sys.tables rt ON rt.object_id = fkc.referenced_object_id
+        INNER JOIN {db}.sys.schemas rs ON rs.schema_id = rt.schema_id
+        INNER JOIN {db}.sys.columns rc
+            ON rc.object_id = fkc.referenced_object_id AND rc.column_id = fkc.referenced_column_id
+        WHERE pt.is_ms_shipped = 0
+        {fk_modified_filter}
+        ORDER BY ps.name, pt.name, fk.name, fkc.constraint_column_id
+        """
+        for row in self._stream(foreign_keys_query, batch_size, *params,
+                                operation="harvest_foreign_keys", database=database_name):
+            yield ForeignKeyRecord(
+                constraint_name=row[0],
+                schema_name=row[1],
+                table_name=row[2],
+                column_name=row[3],
+                referenced_schema=row[4],
+                referenced_table=row[5],
+                referenced_column=row[6],
+                ordinal=row[7],
+            )
+
+        # Rows come from the heap or clustered index (index_id 0/1) only; pages from every index.
+        table_stats_query = f"""
+        SELECT
+            s.name, t.name,
+            ps.row_count, ps.reserved_pages, ps.used_pages,
+            ix.index_count,
+            st.stats_updated_at
+        FROM {db}.sys.tables t
+        INNER JOIN {db}.sys.schemas s ON s.schema_id = t.schema_id
+        LEFT JOIN (
+            SELECT
+                object_id,
+                SUM(CASE WHEN index_id IN (0, 1) THEN row_count ELSE 0 END) AS row_count,
+                SUM(reserved_page_count) AS reserved_pages,
+                SUM(used_page_count) AS used_pages
+            FROM {db}.sys.dm_db_partition_stats
+            GROUP BY object_id
+        ) ps ON ps.object_id = t.object_id
+        LEFT JOIN (
+            SELECT object_id, COUNT(*) AS index_count
+            FROM {db}.sys.indexes
+            WHERE index_id > 0
+            GROUP BY object_id
+        ) ix ON ix.object_id = t.object_id
+        OUTER APPLY (
+            SELECT MAX(sp.last_updated) AS stats_updated_at
+            FROM {db}.sys.stats sts
+            CROSS APPLY {db}.sys.dm_db_stats_properties(sts.object_id, sts.stats_id) sp
+            WHERE sts.object_id = t.object_id
+        ) st
+        WHERE t.is_ms_shipped = 0
+        ORDER BY s.name, t.name
+        """
+        for row in self._stream(table_stats_query, batch_size,
+                                operation="harvest_table_stats", database=database_name):
+            yield TableStatsRecord(
+                schema_name=row[0],
+                table_name=row[1],
+                row_count=row[2],
+                reserved_pages=row[3],
+                used_pages=row[4],
+                index_count=row[5] or 0,
+                stats_updated_at=row[6],
+            )
+
+    def _stream(self, query: str, batch_size: int, *params, operation: str = "stream",
+                database: str = "") -> Iterator[pyodbc.Row]:
+        """
+        Execute a query and yield its rows, fetching `batch_size` rows at a
+        time. Driver time (execute and fetches, not the consumer's) is added
+        to driver_seconds and observed as `operation` once the query ends.
+        """
+        labels = {"operation": operation, "server": self.host, "database": database}
+        cursor = self.conn.cursor()
+        driver = 0.0
+        try:
+            started = time.perf_counter()
+            cursor.execute(query, *params)
+            driver += time.perf_counter() - started
+            while True:
+                started = time.perf_counter()
+                rows = cursor.fetchmany(batch_size)
+                driver += time.perf_counter() - started
+                if not rows:
+                    break
+                yield from rows
+        except pyodbc.Error:
+            SQLSERVER_SECONDS.errors.inc(**labels)
+            raise
+        finally:
+            cursor.close()
+            self.driver_seconds += driver
+            SQLSERVER_SECONDS.observe(driver, **labels)
@@ -0,0 +1,263 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Tuple
+
+import pyodbc
+
+from config import settings
+from core.db.sqlserver_client import SQLServerClient
+from core.utils.circuit_breaker import CircuitBreaker
+from core.utils.credential_vault import CredentialVault, credential_vault
+
+
+class _ServerPool:
+    """Warm connections and statistics for one SQL Server instance."""
+
+    def __init__(self, server_id: int, signature: tuple, breaker: CircuitBreaker):
+        self.server_id = server_id
+        self.signature = signature
+        self.breaker = breaker
+        self.idle: Deque[Tuple[SQLServerClient, float]] = deque()
+        self.in_use = 0
+        self.cond = threading.Condition()
+        self.stats = {
+            "checkouts": 0,
+            "reuses": 0,
+            "logins": 0,
+            "login_failures": 0,
+            "login_ms_total": 0.0,
+            "login_ms_max": 0.0,
+            "login_ms_last": 0.0,
+            "validation_failures": 0,
+            "evictions": 0,
+            "discarded": 0,
+        }
+
+
+class SQLServerConnectionManager:
+    """
+    Pools warm pyodbc connections per registered server.
+
+    Each server (keyed by its metadata id) gets up to `max_size` connections.
+    Checked-out connections idle for more than `validate_after` seconds are
+    probed with SELECT 1 before use, idle connections older than
+    `idle_timeout` seconds are closed, and every server is wrapped in a
+    CircuitBreaker so that an unreachable instance fails fast for
+    `breaker_cooldown` seconds after `breaker_threshold` consecutive
+    connection failures instead of waiting out TCP/login timeouts.
+    Passwords are decrypted by `credentials` at login, not before.
+    """
+
+    def __init__(self, max_size: int = 4, checkout_timeout: float = 30.0, idle_timeout: float = 300.0,
+                 validate_after: float = 30.0, breaker_threshold: int = 3, breaker_cooldown: float = 30.0,
+                 client_factory: Callable[..., SQLServerClient] = SQLServerClient,
+                 credentials: CredentialVault = credential_vault):
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.idle_timeout = idle_timeout
+        self.validate_after = validate_after
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.client_factory = client_factory
+        self.credentials = credentials
+        self._pools: Dict[int, _ServerPool] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------
+    # Checkout / checkin
+    # ------------------------
+
+    @contextmanager
+    def client(self, server: Dict[str, Any]) -> Iterator[SQLServerClient]:
+        """
+        Check out a connected SQLServerClient for `server` (a row from
+        PostgresClient.get_servers()). Do not call close() on it; it goes
+        back to the pool when the `with` block exits.
+        """
+        pool = self._pool_for(server)
+        pool.breaker.before_call()
+        try:
+            sql = self._checkout(pool, server)
+        except Exception:
+            # A failed login already tripped the breaker; free a half-open trial otherwise.
+            pool.breaker.release_trial()
+            raise
+
+        broken = False
+        try:
+            yield sql
+        except (pyodbc.OperationalError, pyodbc.InterfaceError) as e:
+            # Query timeouts (HYT00) leave the connection usable and say nothing about the server.
+            broken = not (e.args and e.args[0] == "HYT00")
+            raise
+        finally:
+            if broken:
+                pool.breaker.record_failure()
+            else:
+                pool.breaker.record_success()
+            self._checkin(pool, sql, discard=broken)
+
+    def _pool_for(self, server: Dict[str, Any]) -> _ServerPool:
+        server_id = server.get('id')
+        signature = (server.get('host'), server.get('port'), server.get('username'),
+                     server.get('encrypted_password'))
+        with self._lock:
+            pool = self._pools.get(server_id)
+            if pool is None or pool.signature != signature:
+                if pool is not None:
+                    self._close_idle(pool)
+                breaker = pool.breaker if pool is not None else CircuitBreaker(
+                    f"server {server.get('name', server_id)}",
+                    failure_threshold=self.breaker_threshold,
+                    reset_timeout=self.breaker_cooldown,
+                )
+                pool = _ServerPool(server_id, signature, breaker)
+                self._pools[server_id] = pool
+            return pool
+
+    def _checkout(self, pool: _ServerPool, server: Dict[str, Any]) -> SQLServerClient:
+        deadline = time.monotonic() + self.checkout_timeout
+        with pool.cond:
+            self._evict_expired(pool)
+            while not pool.idle and pool.in_use >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"No SQL Server connection available for server {pool.server_id} "
+                        f"after {self.checkout_timeout}s (pool size {self.max_size})"
+                    )
+                pool.cond.wait(remaining)
+            pool.in_use += 1
+            pool.stats["checkouts"] += 1
+            reused = pool.idle.pop() if pool.idle else None
+
+        try:
+            if reused is not None:
+                sql, last_used = reused
+                if time.monotonic() - last_used <= self.validate_after or self._is_alive(sql):
+                    with pool.cond:
+                        pool.stats["reuses"] += 1
+                    return sql
+                with pool.cond:
+                    pool.stats["validation_failures"] += 1
+                self._safe_close(sql)
+            return self._login(pool, server)
+        except Exception:
+            with pool.cond:
+                pool.in_use -= 1
+                pool.cond.notify()
+            raise
+
+    def _checkin(self, pool: _ServerPool, sql: SQLServerClient, discard: bool):
+        with pool.cond:
+            pool.in_use -= 1
+            if discard or self._pools.get(pool.server_id) is not pool:
+                pool.stats["discarded"] += 1
+                self._safe_close(sql)
+            else:
+                pool.idle.append((sql, time.monotonic()))
+            pool.cond.notify()
+
+    def _login(self, pool: _ServerPool, server: Dict[str, Any]) -> SQLServerClient:
+        sql = self.client_factory(
+            server.get('host'),
+            server.get('port'),
+            server.get('username'),
+            self.credentials.password(server),
+        )
+        start = time.perf_counter()
+        try:
+            sql.connect()
+        except Exception:
+            with pool.cond:
+                pool.stats["login_failures"] += 1
+            pool.breaker.record_failure()
+            raise
+        login_ms = (time.perf_counter() - start) * 1000
+        pool.breaker.record_success()
+        with pool.cond:
+            pool.stats["logins"] += 1
+            pool.stats["login_ms_total"] += login_ms
+            pool.stats["login_ms_last"] = login_ms
+            pool.stats["login_ms_max"] = max(pool.stats["login_ms_max"], login_ms)
+        return sql
+
+    @staticmethod
+    def _is_alive(sql: SQLServerClient) -> bool:
+        try:
+            cursor = sql.conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _safe_close(sql: SQLServerClient):
+        try:
+            sql.close()
+        except Exception:
+            pass
+
+    # ------------------------
+    # Eviction / lifecycle
+    # ------------------------
+
+    def _evict_expired(self, pool: _ServerPool):
+        """Close idle connections unused for more than idle_timeout. Caller holds pool.cond."""
+        now = time.monotonic()
+        while pool.idle and now - pool.idle[0][1] > self.idle_timeout:
+            sql, _ = pool.idle.popleft()
+            pool.stats["evictions"] += 1
+            self._safe_close(sql)
+
+    def _close_idle(self, pool: _ServerPool):
+        with pool.cond:
+            while pool.idle:
+                sql, _ = pool.idle.popleft()
+                self._safe_close(sql)
+
+    def evict_idle(self):
+        """Close idle connections past idle_timeout on every server."""
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            with pool.cond:
+                self._evict_expired(pool)
+
+    def close_all(self):
+        """Close every idle connection (checked-out ones close on checkin)."""
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            self._close_idle(pool)
+
+    def stats(self) -> Dict[int, Dict[str, Any]]:
+        """Per-server reuse counts, login latency, pool occupancy and breaker state."""
+        with self._lock:
+            pools = list(self._pools.values())
+        result = {}
+        for pool in pools:
+            with pool.cond:
+                stats = dict(pool.stats)
+                stats["idle"] = len(pool.idle)
+                stats["in_use"] = pool.in_use
+                stats["max_size"] = self.max_size
+            stats["login_ms_avg"] = stats["login_ms_total"] / stats["logins"] if stats["logins"] else 0.0
+            stats["breaker"] = pool.breaker.stats()
+            result[pool.server_id] = stats
+        return result
+
+
+connection_manager = SQLServerConnectionManager(
+    max_size=settings.SQLSERVER_POOL_MAX,
+    checkout_timeout=settings.SQLSERVER_POOL_TIMEOUT,
+    idle_timeout=settings.SQLSERVER_POOL_IDLE_TIMEOUT,
+    validate_after=settings.SQLSERVER_POOL_VALIDATE_AFTER,
+    breaker_threshold=settings.SQLSERVER_BREAKER_THRESHOLD,
+    breaker_cooldown=settings.SQLSERVER_BREAKER_COOLDOWN,
+)
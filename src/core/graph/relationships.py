@@ -0,0 +1,182 @@
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.cache.catalog_version import CatalogVersion, catalog_version
+
+
+@dataclass(frozen=True)
+class ForeignKeyEdge:
+    """One foreign key constraint, from the referencing table to the referenced one."""
+    constraint_name: str
+    table_id: int
+    table: str
+    referenced_table_id: int
+    referenced_table: str
+    # (column, referenced column) pairs in constraint order
+    columns: Tuple[Tuple[str, str], ...]
+
+
+class RelationshipGraph:
+    """
+    Undirected adjacency graph of the tables of one database, with one
+    edge per foreign key constraint (composite keys are a single edge).
+
+    Built once from PostgresClient.get_relationship_edges() rows; lookups
+    are plain dict walks, so neighbours are O(degree) and join paths a
+    breadth-first search in O(edges).
+    """
+
+    def __init__(self, database_id: int, edges: Iterable[ForeignKeyEdge]):
+        self.database_id = database_id
+        self.edges = list(edges)
+        self.tables: Dict[int, str] = {}
+        self._adjacent: Dict[int, List[Tuple[int, ForeignKeyEdge, str]]] = defaultdict(list)
+        for edge in self.edges:
+            self.tables[edge.table_id] = edge.table
+            self.tables[edge.referenced_table_id] = edge.referenced_table
+            self._adjacent[edge.table_id].append((edge.referenced_table_id, edge, "outgoing"))
+            if edge.referenced_table_id != edge.table_id:
+                self._adjacent[edge.referenced_table_id].append((edge.table_id, edge, "incoming"))
+
+    @classmethod
+    def from_rows(cls, database_id: int, rows: Iterable[Dict[str, Any]]) -> "RelationshipGraph":
+        """Group column-pair rows (ordered by constraint and ordinal) into constraint edges."""
+        grouped: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        for row in rows:
+            key = (row["table_id"], row["constraint_name"])
+            edge = grouped.setdefault(key, {
+                "constraint_name": row["constraint_name"],
+                "table_id": row["table_id"],
+                "table": row["table_name"],
+                "referenced_table_id": row["referenced_table_id"],
+                "referenced_table": row["referenced_table"],
+                "columns": [],
+            })
+            edge["columns"].append((row["column_name"], row["referenced_column"]))
+        return cls(database_id, (
+            ForeignKeyEdge(**{**edge, "columns": tuple(edge["columns"])}) for edge in grouped.values()
+        ))
+
+    @staticmethod
+    def _step(from_id: int, to_id: int, edge: ForeignKeyEdge, direction: str) -> Dict[str, Any]:
+        """Describe traversing `edge` from `from_id` to `to_id`, with join columns oriented the same way."""
+        if direction == "outgoing":
+            on = [[column, referenced] for column, referenced in edge.columns]
+            from_table, to_table = edge.table, edge.referenced_table
+        else:
+            on = [[referenced, column] for column, referenced in edge.columns]
+            from_table, to_table = edge.referenced_table, edge.table
+        return {
+            "from_table_id": from_id,
+            "from_table": from_table,
+            "to_table_id": to_id,
+            "to_table": to_table,
+            "constraint": edge.constraint_name,
+            "direction": direction,
+            "on": on,
+        }
+
+    def neighbours(self, table_id: int) -> List[Dict[str, Any]]:
+        """Tables directly related to `table_id`: ones it references (outgoing) and ones referencing it (incoming)."""
+        return [self._step(table_id, other, edge, direction) for other, edge, direction in self._adjacent.get(table_id, ())]
+
+    def join_paths(self, source: int, target: int, max_hops: int = 4, limit: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Return up to `limit` shortest join paths from `source` to `target`
+        (each a list of join steps), or [] if they are not connected within
+        `max_hops` joins.
+        """
+        if source == target:
+            return [[]]
+        depth = {source: 0}
+        parents: Dict[int, List[Tuple[int, ForeignKeyEdge, str]]] = defaultdict(list)
+        frontier = [source]
+        hops = 0
+        while frontier and target not in depth and hops < max_hops:
+            hops += 1
+            next_frontier = []
+            for table_id in frontier:
+                for other, edge, direction in self._adjacent.get(table_id, ()):
+                    if other not in depth:
+                        depth[other] = hops
+                        next_frontier.append(other)
+                    if depth[other] == hops:
+                        parents[other].append((table_id, edge, direction))
+            frontier = next_frontier
+        if target not in depth:
+            return []
+
+        paths: List[List[Dict[str, Any]]] = []
+
+        def walk(table_id: int, suffix: List[Dict[str, Any]]):
+            if len(paths) >= limit:
+                return
+            if table_id == source:
+                paths.append(list(reversed(suffix)))
+                return
+            for previous, edge, direction in parents[table_id]:
+                walk(previous, suffix + [self._step(previous, table_id, edge, direction)])
+
+        walk(target, [])
+        return paths
+
+
+class RelationshipGraphCache:
+    """
+    Per-database RelationshipGraphs, built on first use and dropped when
+    the catalog version changes, so graphs are rebuilt after every sync
+    that changed the catalog.
+    """
+
+    def __init__(self, version: CatalogVersion):
+        self.version = version
+        self._graphs: Dict[int, Tuple[int, RelationshipGraph]] = {}
+        self._lock = threading.Lock()
+        version.subscribe(lambda _: self.clear())
+
+    def _cached(self, database_id: int) -> Tuple[int, Optional[RelationshipGraph]]:
+        version = self.version.current()
+        with self._lock:
+            cached = self._graphs.get(database_id)
+        if cached is not None and cached[0] == version:
+            return version, cached[1]
+        return version, None
+
+    def _store(self, version: int, graph: RelationshipGraph):
+        with self._lock:
+            self._graphs[graph.database_id] = (version, graph)
+
+    def get(self, database_id: int, loader: Callable[[int], List[Dict[str, Any]]]) -> RelationshipGraph:
+        """Return the graph of a database, building it from `loader(database_id)` rows on a miss."""
+        version, graph = self._cached(database_id)
+        if graph is None:
+            graph = RelationshipGraph.from_rows(database_id, loader(database_id))
+            self._store(version, graph)
+        return graph
+
+    async def get_async(self, database_id: int,
+                        loader: Callable[[int], Awaitable[List[Dict[str, Any]]]]) -> RelationshipGraph:
+        """get() for async loaders (AsyncPostgresClient)."""
+        version, graph = self._cached(database_id)
+        if graph is None:
+            graph = RelationshipGraph.from_rows(database_id, await loader(database_id))
+            self._store(version, graph)
+        return graph
+
+    def clear(self):
+        with self._lock:
+            self._graphs.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            graphs = [graph for _, graph in self._graphs.values()]
+        return {
+            "databases": len(graphs),
+            "tables": sum(len(graph.tables) for graph in graphs),
+            "edges": sum(len(graph.edges) for graph in graphs),
+        }
+
+
+relationship_graphs = RelationshipGraphCache(catalog_version)
@@ -0,0 +1,387 @@
+import heapq
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from core.db.sqlserver_pool import SQLServerConnectionManager, connection_manager
+from core.query.execution import QueryCancelledError, QueryError, QueryExecution, QueryTimeoutError
+from core.query.readonly import ensure_read_only
+
+MERGE_MODES = ("concat", "merge", "aggregate")
+
+# How partial aggregates computed on each target are combined centrally.
+AGGREGATES: Dict[str, Callable[[Any, Any], Any]] = {
+    "sum": lambda a, b: a + b,
+    "count": lambda a, b: a + b,
+    "min": min,
+    "max": max,
+}
+
+# Origin columns prepended to every row in concat and merge mode.
+ORIGIN_COLUMNS = [{"name": "_server", "type": "str"}, {"name": "_database", "type": "str"}]
+
+_END = object()
+
+
+@dataclass
+class FanOutTarget:
+    """One database a fan-out statement runs on, and how that went."""
+    server: Dict[str, Any]
+    database_id: int
+    database: str
+    status: str = "pending"
+    rows: int = 0
+    truncated: bool = False
+    elapsed_ms: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def origin(self) -> Tuple[str, str]:
+        return self.server.get("name"), self.database
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "server": self.server.get("name"),
+            "database": self.database,
+            "database_id": self.database_id,
+            "status": self.status,
+            "rows": self.rows,
+            "truncated": self.truncated,
+            "elapsed_ms": round(self.elapsed_ms, 1),
+            "error": self.error,
+        }
+
+
+class FanOutDispatcher:
+    """
+    Runs one read-only statement on many databases concurrently and merges
+    the results into a single stream.
+
+    Every target runs as a QueryExecution (same row limit, timeout and
+    read-only guarantees as /query) on a pool of `max_workers` threads,
+    with at most `per_server` targets of the same server running at once.
+    Targets are scheduled per server rather than queued in order: each
+    server starts with up to `per_server` targets (interleaved across
+    servers), and a server's next target is submitted when one of its
+    running targets ends, so no worker ever waits on a busy server while
+    other servers have work.
+    A failing or timed-out target never fails the run; it is reported in
+    the summary.
+
+    Merge modes:
+      - concat: rows are streamed as they arrive, tagged with their origin.
+      - merge: k-way merge on the `key` columns; each target must return
+        its rows ordered by that key (ORDER BY in the statement).
+      - aggregate: the statement returns partial aggregates per target,
+        which are combined per `group_by` group with `aggregates`
+        ({column: sum|count|min|max}) once every target is done.
+
+    run() yields ("columns", [...]), ("rows", [...]) and finally
+    ("done", summary) events. cancel() stops every target.
+    """
+
+    def __init__(self, statement: str, targets: Sequence[FanOutTarget], merge: str = "concat",
+                 key: Sequence[str] = (), descending: bool = False,
+                 group_by: Sequence[str] = (), aggregates: Optional[Dict[str, str]] = None,
+                 per_server: int = 4, max_workers: int = 32, timeout: float = 30.0,
+                 max_rows: int = 10000, batch_size: int = 1000, queue_size: int = 16,
+                 connections: SQLServerConnectionManager = connection_manager):
+        if merge not in MERGE_MODES:
+            raise ValueError(f"merge must be one of {', '.join(MERGE_MODES)}")
+        if merge == "merge" and not key:
+            raise ValueError("merge mode needs at least one key column")
+        if merge == "aggregate":
+            if not aggregates:
+                raise ValueError("aggregate mode needs at least one aggregate column")
+            unknown = sorted(set(aggregates.values()) - set(AGGREGATES))
+            if unknown:
+                raise ValueError(f"Unsupported aggregate(s): {', '.join(unknown)}")
+        self.statement = ensure_read_only(statement)
+        self.targets = list(targets)
+        self.merge = merge
+        self.key = list(key)
+        self.descending = descending
+        self.group_by = list(group_by)
+        self.aggregates = dict(aggregates or {})
+        self.per_server = max(1, per_server)
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.queue_size = max(1, queue_size)
+        self.connections = connections
+        self.columns: Optional[List[Dict[str, Any]]] = None
+        self._column_names: List[str] = []
+        self._key_idx: List[int] = []
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._executions: set = set()
+        self._pending: Dict[Any, deque] = {}
+
+    # ------------------------
+    # Workers
+    # ------------------------
+
+    def _start(self, pool: ThreadPoolExecutor, sink: Callable[[int, Any], bool]):
+        """Submit the first `per_server` targets of every server, round-robin across servers."""
+        for index, target in enumerate(self.targets):
+            self._pending.setdefault(target.server.get("id"), deque()).append(index)
+        for _ in range(self.per_server):
+            for server_id in list(self._pending):
+                self._submit_next(pool, server_id, sink)
+
+    def _submit_next(self, pool: ThreadPoolExecutor, server_id: Any, sink: Callable[[int, Any], bool]):
+        """Submit the next pending target of `server_id`; it submits its successor when it ends."""
+        with self._lock:
+            pending = self._pending.get(server_id)
+            if not pending:
+                return
+            index = pending.popleft()
+        try:
+            future = pool.submit(self._run_target, index, self.targets[index], sink)
+        except RuntimeError:
+            # The run is over (pool shut down): this server's remaining targets never start.
+            with self._lock:
+                skipped = [index] + list(pending)
+                pending.clear()
+            for index in skipped:
+                self.targets[index].status, self.targets[index].error = "cancelled", "Query was cancelled"
+            return
+        future.add_done_callback(lambda _: self._submit_next(pool, server_id, sink))
+
+    def _register_columns(self, columns: List[Dict[str, Any]]):
+        """The first target defines the result shape; the others must match it."""
+        names = [column["name"] for column in columns]
+        with self._lock:
+            if self.columns is None:
+                missing = [name for name in self.key + self.group_by + list(self.aggregates) if name not in names]
+                if missing:
+                    raise QueryError(f"Result has no column(s) {', '.join(missing)}")
+                self.columns = columns
+                self._column_names = names
+                self._key_idx = [names.index(name) for name in self.key]
+            elif names != self._column_names:
+                raise QueryError(f"Result columns {names} differ from {self._column_names}")
+
+    def _run_target(self, index: int, target: FanOutTarget, sink: Callable[[int, Any], bool]):
+        started = time.monotonic()
+        execution = None
+        try:
+            if self._cancelled.is_set():
+                raise QueryCancelledError("Query was cancelled")
+            execution = QueryExecution(
+                target.server, target.database, self.statement,
+                max_rows=self.max_rows, timeout=self.timeout,
+                batch_size=self.batch_size, connections=self.connections,
+            )
+            with self._lock:
+                self._executions.add(execution)
+            target.status = "running"
+            self._register_columns(execution.start())
+            while True:
+                rows = execution.fetch()
+                if not rows:
+                    break
+                target.rows += len(rows)
+                if not sink(index, rows):
+                    raise QueryCancelledError("Query was cancelled")
+            target.truncated = execution.truncated
+            if target.status == "running":
+                target.status = "ok"
+        except QueryTimeoutError as e:
+            target.status, target.error = "timeout", str(e)
+        except QueryCancelledError as e:
+            target.status, target.error = "cancelled", str(e)
+        except Exception as e:
+            target.status, target.error = "error", str(e)
+        finally:
+            if execution is not None:
+                execution.cancel()
+                with self._lock:
+                    self._executions.discard(execution)
+            target.elapsed_ms = (time.monotonic() - started) * 1000
+            sink(index, _END)
+
+    def _put(self, q: "queue.Queue", item: Any) -> bool:
+        """Blocking put that gives up once the run is cancelled."""
+        while not self._cancelled.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: "queue.Queue") -> Any:
+        """Blocking get that gives up once the run is cancelled."""
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if self._cancelled.is_set():
+                    raise QueryCancelledError("Query was cancelled")
+
+    # ------------------------
+    # Merging
+    # ------------------------
+
+    def run(self) -> Iterator[Tuple[str, Any]]:
+        started = time.monotonic()
+        servers = len({target.server.get("id") for target in self.targets})
+        pool = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, self.per_server * servers,
+                                                         len(self.targets))),
+                                  thread_name_prefix="fanout")
+        if self.merge == "merge":
+            events = self._run_merge(pool)
+        else:
+            events = self._run_unordered(pool)
+        emitted = 0
+        finished = False
+        try:
+            for kind, payload in events:
+                if kind == "rows":
+                    emitted += len(payload)
+                yield kind, payload
+            if self.columns is None:
+                yield "columns", []
+            finished = True
+        finally:
+            if not finished:
+                # The consumer went away (or failed): stop the remaining targets.
+                self.cancel()
+            pool.shutdown(wait=False)
+
+        failed = [target.report() for target in self.targets if target.status != "ok"]
+        yield "done", {
+            "rows": emitted,
+            "targets": len(self.targets),
+            "succeeded": len(self.targets) - len(failed),
+            "failed": len(failed),
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+            "slowest_target_ms": round(max((t.elapsed_ms for t in self.targets), default=0.0), 1),
+            "errors": failed,
+            "target_report": [target.report() for target in self.targets],
+        }
+
+    def _output_columns(self) -> List[Dict[str, Any]]:
+        if self.merge == "aggregate":
+            by_name = {column["name"]: column for column in self.columns}
+            return [by_name[name] for name in self.group_by + list(self.aggregates)]
+        return ORIGIN_COLUMNS + self.columns
+
+    def _run_unordered(self, pool: ThreadPoolExecutor) -> Iterator[Tuple[str, Any]]:
+        """concat and aggregate: one shared bounded queue, consumed in arrival order."""
+        results: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        self._start(pool, lambda i, rows: self._put(results, (i, rows)))
+
+        groups: Dict[tuple, list] = {}
+        header_sent = False
+        remaining = len(self.targets)
+        while remaining:
+            index, rows = self._get(results)
+            if rows is _END:
+                remaining -= 1
+                continue
+            if self.merge == "aggregate":
+                self._accumulate(groups, rows)
+                continue
+            if not header_sent:
+                header_sent = True
+                yield "columns", self._output_columns()
+            server, database = self.targets[index].origin
+            yield "rows", [(server, database) + tuple(row) for row in rows]
+
+        if self.merge == "aggregate" and self.columns is not None:
+            yield "columns", self._output_columns()
+            combined = [key + tuple(values) for key, values in groups.items()]
+            for start in range(0, len(combined), self.batch_size):
+                yield "rows", combined[start:start + self.batch_size]
+        elif not header_sent and self.columns is not None:
+            yield "columns", self._output_columns()
+
+    def _accumulate(self, groups: Dict[tuple, list], rows: List[tuple]):
+        index = {name: i for i, name in enumerate(self._column_names)}
+        group_idx = [index[name] for name in self.group_by]
+        aggregate_idx = [(index[name], AGGREGATES[function]) for name, function in self.aggregates.items()]
+        for row in rows:
+            key = tuple(row[i] for i in group_idx)
+            current = groups.get(key)
+            if current is None:
+                groups[key] = [row[i] for i, _ in aggregate_idx]
+                continue
+            for position, (i, combine) in enumerate(aggregate_idx):
+                value = row[i]
+                if value is None:
+                    continue
+                current[position] = value if current[position] is None else combine(current[position], value)
+
+    def _run_merge(self, pool: ThreadPoolExecutor) -> Iterator[Tuple[str, Any]]:
+        """
+        k-way merge: one queue per target. Each target's queue is bounded
+        by its row limit rather than a batch count, because the merge can
+        only advance once every target has produced its next row and
+        targets beyond the worker/server limits start later.
+        """
+        queues = [queue.Queue() for _ in self.targets]
+        self._start(pool, lambda i, rows: self._put(queues[i], rows))
+
+        def target_rows(index: int) -> Iterator[tuple]:
+            server, database = self.targets[index].origin
+            previous = None
+            while True:
+                rows = self._get(queues[index])
+                if rows is _END:
+                    return
+                for row in rows:
+                    key = self._sort_key(row)
+                    if previous is not None and (key < previous if not self.descending else key > previous):
+                        target = self.targets[index]
+                        target.status = "error"
+                        target.error = f"Rows are not ordered by {', '.join(self.key)}; add an ORDER BY"
+                        self._drain(queues[index])
+                        return
+                    previous = key
+                    yield (server, database) + tuple(row)
+
+        merged = heapq.merge(*(target_rows(i) for i in range(len(self.targets))),
+                             key=lambda row: self._sort_key(row[2:]), reverse=self.descending)
+        header_sent = False
+        batch: List[tuple] = []
+        for row in merged:
+            if not header_sent:
+                header_sent = True
+                yield "columns", self._output_columns()
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield "rows", batch
+                batch = []
+        if batch:
+            yield "rows", batch
+        if not header_sent and self.columns is not None:
+            yield "columns", self._output_columns()
+
+    def _sort_key(self, row: Sequence[Any]) -> tuple:
+        # NULLs sort first and never get compared with values.
+        return tuple((True, row[i]) if row[i] is not None else (False, 0) for i in self._key_idx)
+
+    def _drain(self, q: "queue.Queue"):
+        """Discard the rest of a rejected target's rows (its worker keeps running until it ends)."""
+        def drain():
+            try:
+                while self._get(q) is not _END:
+                    pass
+            except QueryCancelledError:
+                pass
+        threading.Thread(target=drain, daemon=True).start()
+
+    def cancel(self):
+        """Stop every running target and release their connections."""
+        self._cancelled.set()
+        with self._lock:
+            executions = list(self._executions)
+        for execution in executions:
+            execution.cancel()
@@ -0,0 +1,227 @@
+import threading
+import time
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional
+
+import pyodbc
+
+from core.db.sqlserver_pool import SQLServerConnectionManager, connection_manager
+from core.query.readonly import ensure_read_only
+
+
+class QueryError(Exception):
+    """A statement failed on the target server."""
+
+
+class QueryTimeoutError(QueryError):
+    """A statement ran longer than its timeout."""
+
+
+class QueryCancelledError(QueryError):
+    """A statement was cancelled (e.g. the client went away)."""
+
+
+class QueryExecution:
+    """
+    One read-only statement running on a pooled SQL Server connection,
+    consumed batch by batch.
+
+    start() checks out a connection, switches to `database` and executes
+    the statement; fetch() then returns up to `batch_size` rows per call
+    (cursor.fetchmany), so memory is bounded by the batch size whatever the
+    result size. Limits are enforced by the server: SET ROWCOUNT stops the
+    result after `max_rows` rows (one extra row is requested to report
+    truncation), and the ODBC query timeout plus an overall deadline bound
+    the run time to `timeout` seconds (checked before every batch, and by
+    the driver within each execute/fetch call). The statement runs in a
+    transaction that is always rolled back.
+
+    cancel() may be called from any thread, including while another thread
+    is blocked in fetch(); close() releases the connection and is deferred
+    to the end of an in-flight fetch().
+    """
+
+    def __init__(self, server: Dict[str, Any], database: str, statement: str,
+                 max_rows: int, timeout: float, batch_size: int = 1000,
+                 connections: SQLServerConnectionManager = connection_manager):
+        self.server = server
+        self.database = database
+        self.statement = ensure_read_only(statement)
+        self.max_rows = max_rows
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.connections = connections
+        self.columns: List[Dict[str, Any]] = []
+        self.row_count = 0
+        self.truncated = False
+        self.finished = False
+        self._stack = ExitStack()
+        self._sql = None
+        self._cursor: Optional[pyodbc.Cursor] = None
+        self._original_database: Optional[str] = None
+        self._deadline = 0.0
+        self._started_at = 0.0
+        self._lock = threading.Lock()
+        self._busy = False
+        self._cancelled = False
+        self._close_requested = False
+        self._closed = False
+        self._error: Optional[BaseException] = None
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self._started_at) * 1000 if self._started_at else 0.0
+
+    # ------------------------
+    # Execution
+    # ------------------------
+
+    def start(self) -> List[Dict[str, Any]]:
+        """Execute the statement and return its column descriptions."""
+        self._started_at = time.monotonic()
+        self._deadline = self._started_at + self.timeout
+        self._enter()
+        try:
+            self._sql = self._stack.enter_context(self.connections.client(self.server))
+            conn = self._sql.conn
+            setup = conn.cursor()
+            self._original_database = setup.execute("SELECT DB_NAME()").fetchval()
+            setup.execute(f"USE [{self.database.replace(']', ']]')}]")
+            setup.execute(f"SET ROWCOUNT {int(self.max_rows) + 1}")
+            setup.close()
+            conn.autocommit = False
+            # pyodbc applies the connection timeout to cursors when they are created.
+            conn.timeout = self._remaining()
+            cursor = conn.cursor()
+            with self._lock:
+                self._cursor = cursor
+            cursor.execute(self.statement)
+            if cursor.description is None:
+                raise QueryError("Statement returned no result set")
+            self.columns = [
+                {"name": column[0], "type": getattr(column[1], "__name__", str(column[1]))}
+                for column in cursor.description
+            ]
+            return self.columns
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._leave()
+
+    def fetch(self) -> List[tuple]:
+        """Return the next batch of rows, or [] once the result (or the row limit) is exhausted."""
+        if self.finished:
+            return []
+        self._enter()
+        try:
+            self._remaining()
+            wanted = min(self.batch_size, self.max_rows + 1 - self.row_count)
+            rows = self._cursor.fetchmany(wanted) if wanted > 0 else []
+            if self.row_count + len(rows) > self.max_rows:
+                rows = rows[:self.max_rows - self.row_count]
+                self.truncated = True
+            self.row_count += len(rows)
+            if not rows or self.truncated:
+                self.finished = True
+            return [tuple(row) for row in rows]
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._leave()
+
+    def _remaining(self) -> int:
+        """Seconds left before the deadline, as an ODBC query timeout (0 would mean no timeout)."""
+        remaining = self._deadline - time.monotonic()
+        if remaining <= 0:
+            raise QueryTimeoutError(f"Query exceeded its {self.timeout:g}s timeout")
+        return max(1, int(remaining + 0.999))
+
+    def _fail(self, error: BaseException):
+        translated = self._translate(error)
+        self._error = translated
+        if translated is error:
+            raise
+        raise translated from error
+
+    def _translate(self, error: BaseException) -> BaseException:
+        if isinstance(error, QueryError):
+            return error
+        if self._cancelled:
+            return QueryCancelledError("Query was cancelled")
+        if isinstance(error, pyodbc.Error):
+            if error.args and error.args[0] == "HYT00":
+                return QueryTimeoutError(f"Query exceeded its {self.timeout:g}s timeout")
+            return QueryError(str(error.args[1] if len(error.args) > 1 else error))
+        return error
+
+    # ------------------------
+    # Cancellation / cleanup
+    # ------------------------
+
+    def _enter(self):
+        with self._lock:
+            if self._cancelled:
+                raise QueryCancelledError("Query was cancelled")
+            if self._closed:
+                raise QueryError("Query is closed")
+            self._busy = True
+
+    def _leave(self):
+        with self._lock:
+            self._busy = False
+            close = self._close_requested or self._error is not None or self.finished
+        if close:
+            self.close()
+
+    def cancel(self):
+        """Abort the statement (thread-safe) and release the connection as soon as possible."""
+        with self._lock:
+            if self._closed or self.finished:
+                busy = False
+            else:
+                self._cancelled = True
+                busy = self._busy
+            cursor = self._cursor
+        if busy and cursor is not None:
+            try:
+                cursor.cancel()
+            except pyodbc.Error:
+                pass
+        self.close()
+
+    def close(self):
+        """Roll back, restore the session and return the connection to the pool (idempotent)."""
+        with self._lock:
+            if self._closed:
+                return
+            if self._busy:
+                self._close_requested = True
+                return
+            self._closed = True
+        sql, cursor, error = self._sql, self._cursor, self._error
+        reset_error = None
+        try:
+            if sql is not None and sql.conn is not None:
+                conn = sql.conn
+                if cursor is not None:
+                    cursor.close()
+                conn.rollback()
+                conn.autocommit = True
+                conn.timeout = 0
+                reset = conn.cursor()
+                reset.execute("SET ROWCOUNT 0")
+                if self._original_database:
+                    reset.execute(f"USE [{self._original_database.replace(']', ']]')}]")
+                reset.close()
+        except pyodbc.Error as e:
+            reset_error = e
+        finally:
+            # Hand driver errors to the pool so it can discard broken connections and
+            # trip the breaker; a cancelled statement says nothing about the server.
+            cause = error.__cause__ if isinstance(error, QueryError) else error
+            if reset_error is not None:
+                self._stack.__exit__(type(reset_error), reset_error, reset_error.__traceback__)
+            elif isinstance(cause, pyodbc.Error) and not self._cancelled:
+                self._stack.__exit__(type(cause), cause, cause.__traceback__)
+            else:
+                self._stack.close()
@@ -0,0 +1,122 @@
+import re
+from typing import List, Optional, Set, Tuple
+
+_TOKEN = re.compile(
+    r"""
+    (?P<string>N?'(?:[^']|'')*')
+    | (?P<quoted>\[(?:[^\]]|\]\])*\] | "(?:[^"]|"")*")
+    | (?P<comment>--[^\n]* | /\*.*?\*/)
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<word>[A-Za-z_@#][A-Za-z0-9_@#$]*)
+    | (?P<space>\s+)
+    | (?P<symbol>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# Words that end a table reference in a FROM/JOIN list rather than alias it.
+_CLAUSE_WORDS = frozenset({
+    "APPLY", "CROSS", "EXCEPT", "FOR", "FULL", "GROUP", "HAVING", "INNER", "INTERSECT", "JOIN",
+    "LEFT", "ON", "OPTION", "ORDER", "OUTER", "PIVOT", "RIGHT", "UNION", "UNPIVOT", "WHERE", "WITH",
+})
+
+
+def tokenize(statement: str) -> List[Tuple[str, str]]:
+    """(kind, text) tokens without whitespace and comments; identifiers and keywords upper-cased."""
+    tokens = []
+    for match in _TOKEN.finditer(statement):
+        kind, text = match.lastgroup, match.group()
+        if kind in ("space", "comment"):
+            continue
+        if kind == "quoted":
+            inner = text[1:-1].replace("]]", "]") if text[0] == "[" else text[1:-1].replace('""', '"')
+            kind, text = "word", inner.upper()
+        elif kind == "word":
+            text = text.upper()
+        tokens.append((kind, text))
+    return tokens
+
+
+def _quote(kind: str, text: str) -> str:
+    if kind == "word" and not re.fullmatch(r"[A-Z_@#][A-Z0-9_@#$]*", text):
+        return "[" + text.replace("]", "]]") + "]"
+    return text
+
+
+def _literal_list(tokens: List[Tuple[str, str]], start: int) -> Tuple[List[str], int]:
+    """Literals of a `(lit, lit, ...)` list at `start` and the index after it, or ([], start)."""
+    if start >= len(tokens) or tokens[start][1] != "(":
+        return [], start
+    literals, i = [], start + 1
+    while i + 1 < len(tokens) and tokens[i][0] in ("string", "number"):
+        literals.append(tokens[i][1])
+        if tokens[i + 1][1] == ")":
+            return literals, i + 2
+        if tokens[i + 1][1] != ",":
+            break
+        i += 2
+    return [], start
+
+
+def normalize_statement(statement: str) -> str:
+    """
+    Canonical text of a statement for result cache keys: comments dropped,
+    whitespace collapsed, keywords and identifiers upper-cased (SQL Server
+    collations are case-insensitive by default, string literals keep their
+    case), quoting unified, and literal-only IN lists sorted, so
+    `select  *  from [Orders] where id in (3, 1)` and
+    `SELECT * FROM orders WHERE id IN (1,3)` share one key.
+    """
+    tokens = tokenize(statement)
+    out: List[str] = []
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        if kind == "word" and text == "IN":
+            literals, end = _literal_list(tokens, i + 1)
+            if literals:
+                out.append("IN (" + ", ".join(sorted(literals)) + ")")
+                i = end
+                continue
+        out.append(_quote(kind, text))
+        i += 1
+    return " ".join(out).rstrip(" ;")
+
+
+def referenced_tables(statement: str) -> Set[Tuple[Optional[str], str]]:
+    """
+    Upper-cased (schema, table) pairs named after FROM and JOIN (schema is
+    None when the name is unqualified). CTE names and the like show up too;
+    the result cache only uses these to over-approximate invalidation.
+    """
+    tokens = tokenize(statement)
+    tables: Set[Tuple[Optional[str], str]] = set()
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        i += 1
+        if kind != "word" or text not in ("FROM", "JOIN"):
+            continue
+        while i < len(tokens) and tokens[i][0] == "word":
+            parts = [tokens[i][1]]
+            i += 1
+            while i + 1 < len(tokens) and tokens[i][1] == "." and tokens[i + 1][0] == "word":
+                parts.append(tokens[i + 1][1])
+                i += 2
+            if i < len(tokens) and tokens[i][1] == "(":
+                break  # table-valued function
+            tables.add((parts[-2] if len(parts) > 1 else None, parts[-1]))
+            # Skip an alias and table hints, then continue a comma-separated FROM list.
+            if i < len(tokens) and tokens[i][1] == "AS":
+                i += 1
+            if i < len(tokens) and tokens[i][0] == "word" and tokens[i][1] not in _CLAUSE_WORDS:
+                i += 1
+            if i + 1 < len(tokens) and tokens[i][1] == "WITH" and tokens[i + 1][1] == "(":
+                while i < len(tokens) and tokens[i][1] != ")":
+                    i += 1
+                i += 1
+            if i < len(tokens) and tokens[i][1] == ",":
+                i += 1
+                continue
+            break
+    return tables
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+@dataclass
+class QueryLogRecord:
+    """One row of query_logs."""
+    query_text: str
+    target_scope: Dict[str, Any]
+    execution_time_ms: int
+    status: str
+    row_count: int = 0
+    cached: bool = False
+    created_at: datetime = field(default_factory=datetime.now)
+
+
+class QueryLogWriter:
+    """
+    Background writer for query telemetry.
+
+    record() appends to a bounded in-memory buffer and never blocks or
+    touches the database, so logging adds no latency to a query. A flusher
+    thread hands the buffered records to `sink` (e.g.
+    PostgresClient.insert_query_logs, one COPY per batch) whenever
+    `batch_size` records are waiting or `flush_interval` seconds have
+    passed. When the buffer is full, or the sink fails, records are dropped
+    and counted instead of applying backpressure to requests. A capacity
+    of 0 disables logging.
+    """
+
+    def __init__(self, sink: Callable[[List[QueryLogRecord]], None], capacity: int = 10000,
+                 batch_size: int = 500, flush_interval: float = 2.0):
+        self.sink = sink
+        self.capacity = max(0, capacity)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._buffer: Deque[QueryLogRecord] = deque()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"recorded": 0, "written": 0, "dropped": 0, "failed": 0, "flushes": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def record(self, record: QueryLogRecord) -> bool:
+        """Queue a record; returns False (and counts a drop) if the buffer is full."""
+        if not self.enabled:
+            return False
+        with self._cond:
+            if len(self._buffer) >= self.capacity:
+                self._stats["dropped"] += 1
+                return False
+            self._buffer.append(record)
+            self._stats["recorded"] += 1
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None or not self.enabled:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Flush what is buffered and stop the flusher thread."""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout)
+        else:
+            self.flush()
+
+    def _run(self):
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            with self._cond:
+                while not self._stopping and len(self._buffer) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                stopping = self._stopping
+            self.flush()
+            deadline = time.monotonic() + self.flush_interval
+            if stopping:
+                return
+
+    def flush(self):
+        """Write every buffered record, in batches of `batch_size`."""
+        while True:
+            with self._cond:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            if not batch:
+                return
+            try:
+                self.sink(batch)
+                with self._cond:
+                    self._stats["written"] += len(batch)
+                    self._stats["flushes"] += 1
+            except Exception as e:
+                with self._cond:
+                    self._stats["failed"] += len(batch)
+                print(f"[WARN] Cannot write {len(batch)} query log records: {e}")
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["buffered"] = len(self._buffer)
+        stats["capacity"] = self.capacity
+        return stats
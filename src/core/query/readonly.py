@@ -0,0 +1,65 @@
+import re
+
+
+class ReadOnlyViolationError(ValueError):
+    """Raised when a statement submitted to the query engine could modify the server."""
+
+
+# Strings, quoted identifiers and comments, which may legitimately contain any word.
+_OPAQUE = re.compile(
+    r"""
+    '(?:[^']|'')*'          # 'string' with '' escapes
+    | N'(?:[^']|'')*'       # N'unicode string'
+    | \[(?:[^\]]|\]\])*\]   # [bracketed identifier]
+    | "(?:[^"]|"")*"        # "quoted identifier"
+    | --[^\n]*              # line comment
+    | /\*.*?\*/             # block comment
+    """,
+    re.VERBOSE | re.DOTALL | re.IGNORECASE,
+)
+
+_WORD = re.compile(r"[A-Za-z_@#][A-Za-z0-9_@#$]*")
+
+# T-SQL allows several statements in one batch without separators, so any of
+# these words outside literals rejects the batch, not only a leading one.
+_FORBIDDEN = frozenset({
+    "ALTER", "BACKUP", "BEGIN", "BULK", "CHECKPOINT", "COMMIT", "CREATE", "DBCC", "DECLARE",
+    "DELETE", "DENY", "DISABLE", "DROP", "ENABLE", "EXEC", "EXECUTE", "GRANT", "INSERT", "INTO",
+    "KILL", "MERGE", "OPENDATASOURCE", "OPENQUERY", "OPENROWSET", "RECONFIGURE", "RESTORE",
+    "REVERT", "REVOKE", "ROLLBACK", "SAVE", "SET", "SHUTDOWN", "TRUNCATE", "UPDATE", "UPDATETEXT",
+    "USE", "WAITFOR", "WRITETEXT",
+})
+
+# Word sequences that are forbidden even though each word alone is not:
+# NEXT VALUE FOR advances a sequence (NEXT alone is OFFSET ... FETCH NEXT).
+_FORBIDDEN_PHRASES = (("NEXT", "VALUE", "FOR"),)
+
+
+def ensure_read_only(statement: str) -> str:
+    """
+    Return `statement` stripped of surrounding whitespace and trailing
+    semicolons if it is a single read-only query (SELECT or WITH ... SELECT),
+    otherwise raise ReadOnlyViolationError.
+
+    This is a lexical guard; QueryExecution additionally runs every
+    statement in a transaction that is always rolled back.
+    """
+    statement = statement.strip().rstrip(";").strip()
+    if not statement:
+        raise ReadOnlyViolationError("Empty statement")
+
+    code = _OPAQUE.sub(" ", statement)
+    if "/*" in code or "'" in code:
+        raise ReadOnlyViolationError("Unterminated comment or string literal")
+    if ";" in code:
+        raise ReadOnlyViolationError("Only a single statement is allowed")
+
+    words = [word.upper() for word in _WORD.findall(code)]
+    if not words or words[0] not in ("SELECT", "WITH"):
+        raise ReadOnlyViolationError("Only SELECT statements are allowed")
+    forbidden = sorted(set(words) & _FORBIDDEN)
+    forbidden += [" ".join(phrase) for phrase in _FORBIDDEN_PHRASES
+                  if any(tuple(words[i:i + len(phrase)]) == phrase for i in range(len(words)))]
+    if forbidden:
+        raise ReadOnlyViolationError(f"Statement contains forbidden keyword(s): {', '.join(forbidden)}")
+    return statement
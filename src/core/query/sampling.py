@@ -0,0 +1,123 @@
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.db.sqlserver_pool import SQLServerConnectionManager, connection_manager
+from core.query.execution import QueryExecution
+
+# The driver cannot fetch CLR types and sql_variant; xml and image are large by nature.
+_OMITTED_TYPES = frozenset({"geography", "geometry", "hierarchyid", "sql_variant", "xml", "image"})
+# Text types whose values can be arbitrarily long: (max) types report max_length -1.
+_LONG_TEXT_TYPES = frozenset({"text", "ntext"})
+_TEXT_TYPES = frozenset({"char", "varchar", "nchar", "nvarchar"})
+# TABLESAMPLE picks whole pages, some of them sparse: read this many times the rows wanted.
+OVERSAMPLE = 4
+# Each page is picked with probability `percent`: expect at least this many, so that
+# an empty sample (and the TOP fallback) stays rare.
+MIN_SAMPLE_PAGES = 8
+# Above this share of the table a sample saves nothing over TOP.
+MAX_SAMPLE_PERCENT = 50.0
+
+
+class SampleError(ValueError):
+    """Raised when a table cannot be sampled (e.g. its columns were not harvested yet)."""
+
+
+@dataclass(frozen=True)
+class SamplePlan:
+    """How to read a few rows of a table."""
+    statement: str
+    method: str  # "top" or "tablesample"
+    percent: Optional[float]
+    columns: List[str]
+    # Columns left out of the projection (types the driver cannot fetch, or large objects).
+    omitted: List[str]
+    # TOP statement to fall back on when the sampled pages hold no rows.
+    fallback: Optional[str] = None
+
+
+def _quote(name: str) -> str:
+    return "[" + name.replace("]", "]]") + "]"
+
+
+def _projection(column: Dict[str, Any], max_value_length: int) -> Optional[str]:
+    """The select-list item of a catalog column, or None to leave it out."""
+    data_type = (column.get("data_type") or "").lower()
+    name = _quote(column["name"])
+    if data_type in _OMITTED_TYPES or (data_type == "varbinary" and column.get("max_length") == -1):
+        return None
+    long_text = data_type in _LONG_TEXT_TYPES or (data_type in _TEXT_TYPES and column.get("max_length") == -1)
+    if long_text and max_value_length > 0:
+        return f"CAST({name} AS nvarchar({int(max_value_length)})) AS {name}"
+    return name
+
+
+def sample_percent(rows: int, row_count: int, used_pages: Optional[int]) -> float:
+    """The TABLESAMPLE percentage expected to return about OVERSAMPLE * `rows` rows."""
+    if used_pages:
+        rows_per_page = max(1.0, row_count / used_pages)
+        pages = max(MIN_SAMPLE_PAGES, math.ceil(rows * OVERSAMPLE / rows_per_page))
+        percent = 100.0 * pages / used_pages
+    else:
+        percent = 100.0 * rows * OVERSAMPLE / row_count
+    return min(100.0, percent)
+
+
+def plan_sample(schema: str, table: str, columns: List[Dict[str, Any]], rows: int,
+                row_count: Optional[int], used_pages: Optional[int], tablesample_rows: int,
+                max_value_length: int) -> SamplePlan:
+    """
+    Plan a sample of `rows` rows of a table, projecting only its catalog
+    `columns` (PostgresClient.get_columns rows) with long text values cut
+    to `max_value_length` characters. Tables whose recorded row_count is
+    above `tablesample_rows` (0: never) are read with TABLESAMPLE SYSTEM,
+    which only touches a few random pages; smaller ones (or ones without
+    statistics) with TOP.
+    """
+    ordered = sorted(columns, key=lambda column: column.get("ordinal_position") or 0)
+    selected, names, omitted = [], [], []
+    for column in ordered:
+        item = _projection(column, max_value_length)
+        if item is None:
+            omitted.append(column["name"])
+        else:
+            selected.append(item)
+            names.append(column["name"])
+    if not selected:
+        raise SampleError(f"No columns of {schema}.{table} can be sampled"
+                          + (f" (omitted: {', '.join(omitted)})" if omitted else " (columns not harvested yet)"))
+
+    top = f"SELECT TOP ({int(rows)}) {', '.join(selected)} FROM {_quote(schema)}.{_quote(table)}"
+    if tablesample_rows > 0 and row_count and row_count > tablesample_rows:
+        percent = sample_percent(rows, row_count, used_pages)
+        if percent < MAX_SAMPLE_PERCENT:
+            literal = f"{percent:.10f}".rstrip("0")
+            return SamplePlan(f"{top} TABLESAMPLE SYSTEM ({literal} PERCENT)", "tablesample", float(literal),
+                              names, omitted, fallback=top)
+    return SamplePlan(top, "top", None, names, omitted)
+
+
+def _fetch_all(server: Dict[str, Any], database: str, statement: str, rows: int, timeout: float,
+               connections: SQLServerConnectionManager) -> List[tuple]:
+    execution = QueryExecution(server, database, statement, max_rows=rows, timeout=timeout, batch_size=rows,
+                               connections=connections)
+    fetched: List[tuple] = []
+    try:
+        execution.start()
+        while True:
+            batch = execution.fetch()
+            if not batch:
+                return fetched
+            fetched.extend(batch)
+    finally:
+        execution.close()
+
+
+def run_sample(server: Dict[str, Any], database: str, plan: SamplePlan, rows: int, timeout: float,
+               connections: SQLServerConnectionManager = connection_manager) -> Tuple[SamplePlan, List[tuple]]:
+    """Run `plan`, falling back on TOP if the sampled pages were empty. Returns the plan used and the rows."""
+    fetched = _fetch_all(server, database, plan.statement, rows, timeout, connections)
+    if not fetched and plan.fallback:
+        plan = SamplePlan(plan.fallback, "top", None, plan.columns, plan.omitted)
+        fetched = _fetch_all(server, database, plan.statement, rows, timeout, connections)
+    return plan, fetched
@@ -0,0 +1,75 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.query.normalize import tokenize, referenced_tables
+
+# Any of these makes a statement "bounded": it filters or caps what it reads.
+_BOUNDING_WORDS = frozenset({"WHERE", "TOP", "OFFSET", "FETCH", "TABLESAMPLE"})
+# Any of these needs every row before the first one can be returned, so a row
+# limit does not shorten the scan.
+_BLOCKING_WORDS = frozenset({"ORDER", "GROUP", "HAVING", "DISTINCT", "UNION", "EXCEPT", "INTERSECT", "OVER",
+                             "PIVOT", "UNPIVOT"})
+_AGGREGATES = frozenset({"AVG", "CHECKSUM_AGG", "COUNT", "COUNT_BIG", "MAX", "MIN", "STDEV", "STDEVP",
+                         "STRING_AGG", "SUM", "VAR", "VARP"})
+
+
+class LargeScanError(ValueError):
+    """Raised when a statement would scan a table above the large-scan threshold in full."""
+
+
+@dataclass(frozen=True)
+class ScanShape:
+    """What a statement's text says about how much it reads."""
+    bounded: bool
+    # True when stopping after N rows (SET ROWCOUNT) also stops the scan.
+    streamable: bool
+    tables: frozenset
+
+
+def scan_shape(statement: str) -> ScanShape:
+    """
+    Classify a statement lexically. A WHERE, TOP, OFFSET/FETCH or
+    TABLESAMPLE anywhere (subqueries included) counts as bounded, so this
+    only catches plainly unfiltered reads; it is a guard, not a planner.
+    """
+    tokens = tokenize(statement)
+    words = {text for kind, text in tokens if kind == "word"}
+    aggregate = any(kind == "word" and text in _AGGREGATES and i + 1 < len(tokens) and tokens[i + 1][1] == "("
+                    for i, (kind, text) in enumerate(tokens))
+    return ScanShape(
+        bounded=bool(words & _BOUNDING_WORDS),
+        streamable=not (words & _BLOCKING_WORDS) and not aggregate,
+        tables=frozenset(referenced_tables(statement)),
+    )
+
+
+def large_tables(shape: ScanShape, sizes: List[Dict[str, Any]], threshold: int) -> List[Dict[str, Any]]:
+    """The rows of `sizes` (PostgresClient.get_table_sizes) for tables of `shape` above `threshold` rows."""
+    wanted = {(schema, table) for schema, table in shape.tables}
+    return [
+        row for row in sizes
+        if (row["row_count"] or 0) > threshold
+        and ((row["schema"].upper(), row["table"].upper()) in wanted or (None, row["table"].upper()) in wanted)
+    ]
+
+
+def guard_scan(shape: ScanShape, sizes: List[Dict[str, Any]], threshold: int, auto_limit: int,
+               max_rows: int) -> Tuple[int, Optional[List[str]]]:
+    """
+    Apply the large-scan policy to an unbounded statement: if it reads a
+    table with more than `threshold` rows, either cap it at `auto_limit`
+    rows (when the cap also stops the scan early) or raise LargeScanError.
+    Returns (max_rows, names of the large tables if the statement was capped).
+    """
+    if shape.bounded or threshold <= 0:
+        return max_rows, None
+    large = large_tables(shape, sizes, threshold)
+    if not large:
+        return max_rows, None
+    names = sorted({f"{row['schema']}.{row['table']} ({row['row_count']:,} rows)" for row in large})
+    if shape.streamable and auto_limit > 0:
+        return min(max_rows, auto_limit), names
+    raise LargeScanError(
+        f"Statement scans large table(s) {', '.join(names)} without WHERE or TOP; "
+        f"tables over {threshold:,} rows need a filter"
+    )
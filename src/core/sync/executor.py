@@ -0,0 +1,370 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from core.db.catalog_records import TableRecord
+from core.db.postgres_client import PostgresClient
+from core.db.sqlserver_pool import SQLServerConnectionManager, connection_manager
+from core.sync.progress import SyncProgress
+from core.utils.metrics import SYNC_SECONDS
+
+
+# How often a harvest worker blocked on a full queue checks whether the sync was cancelled.
+_PUT_POLL_SECONDS = 0.5
+# Batches of records buffered per database between its harvest worker and the writer.
+_STREAM_DEPTH = 2
+_END = object()
+
+
+class _SyncCancelled(Exception):
+    """Raised in harvest workers once the writer gave up on the run (or on their database)."""
+
+
+class _HarvestFailed(Exception):
+    """Raised to the writer when the harvest of the database it is reading failed."""
+
+
+class _StreamStalled(Exception):
+    """Raised in a harvest worker whose batch the writer did not take within the stream timeout."""
+
+
+def _put(target: queue.Queue, item: Any, *cancelled: threading.Event, timeout: float = 0):
+    """
+    Put `item` on a bounded queue, giving up with _SyncCancelled once any of
+    `cancelled` is set, or with _StreamStalled after `timeout` seconds (0: never).
+    """
+    deadline = time.monotonic() + timeout if timeout > 0 else None
+    while not any(event.is_set() for event in cancelled):
+        if deadline is not None and time.monotonic() >= deadline:
+            raise _StreamStalled()
+        try:
+            target.put(item, timeout=_PUT_POLL_SECONDS)
+            return
+        except queue.Full:
+            pass
+    raise _SyncCancelled()
+
+
+class _RecordStream:
+    """
+    The records of one database, passed from its harvest worker to the
+    writer in batches through a small bounded queue: the worker blocks
+    while the writer is behind, so at most _STREAM_DEPTH batches of a
+    database wait in memory. A harvest error is re-raised to the writer
+    as _HarvestFailed.
+
+    A blocked worker still holds its SQL Server connection and open
+    result set, possibly while the writer works through up to
+    `queue_size` other databases. After `timeout` seconds (0: no limit)
+    on one batch it gives up, which releases them; fail() then makes the
+    writer report the database as not harvested once it gets to it.
+    """
+
+    def __init__(self, cancelled: threading.Event, timeout: float = 0):
+        self._batches: "queue.Queue[Any]" = queue.Queue(maxsize=_STREAM_DEPTH)
+        self._cancelled = cancelled
+        self._timeout = timeout
+        self._abandoned = threading.Event()
+        self._failure: Optional[BaseException] = None
+        # Set by the worker before the end of the stream.
+        self.harvest_seconds = 0.0
+        # Time the worker spent blocked on the writer, and the writer on the worker.
+        self.blocked_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.tables = 0
+        self.columns_harvested = 0
+
+    def put(self, item: Any):
+        """Worker side: queue a batch (list of records) or _END."""
+        started = time.perf_counter()
+        try:
+            _put(self._batches, item, self._cancelled, self._abandoned, timeout=self._timeout)
+        finally:
+            self.blocked_seconds += time.perf_counter() - started
+
+    def fail(self, error: BaseException):
+        """Worker side: end the stream with `error` without waiting for room in the queue."""
+        self._failure = error
+
+    def abandon(self):
+        """Writer side: stop reading, releasing the worker if it is blocked on put()."""
+        self._abandoned.set()
+
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            started = time.perf_counter()
+            try:
+                batch = self._batches.get(timeout=_PUT_POLL_SECONDS)
+            except queue.Empty:
+                batch = self._failure
+            finally:
+                self.wait_seconds += time.perf_counter() - started
+            if batch is None:
+                continue
+            if batch is _END:
+                return
+            if isinstance(batch, BaseException):
+                raise _HarvestFailed(str(batch)) from batch
+            for record in batch:
+                if isinstance(record, TableRecord):
+                    self.tables += 1
+                    self.columns_harvested += record.columns_harvested
+            yield from batch
+
+
+@dataclass
+class _HarvestedDatabase:
+    """Queue item: a database whose records are being harvested, ready to be written as they arrive."""
+    server_id: int
+    server_name: str
+    db_name: str
+    records: _RecordStream
+
+
+@dataclass
+class _ServerDone:
+    """Queue item: a server worker finished (successfully or not)."""
+    server_id: int
+    server_name: str
+    databases: Optional[List[str]] = None
+    errors: List[str] = field(default_factory=list)
+
+
+class ParallelSyncExecutor:
+    """
+    Sync many SQL Server instances into the metadata store concurrently.
+
+    Up to `max_servers` servers are harvested at once, and up to
+    `max_databases` databases per server, each on its own pyodbc
+    connection checked out from the SQLServerConnectionManager. Databases
+    are handed to a single writer (the calling thread, which owns the
+    Postgres connection) through a bounded queue of at most `queue_size`
+    databases, and their records follow in batches of `batch_size` through
+    a per-database queue of _STREAM_DEPTH batches, which the writer copies
+    into Postgres as they arrive (see PostgresClient.sync_database_catalog).
+    A harvest worker blocked for `stream_timeout` seconds on a writer busy
+    with other databases gives up its database (retried on the next sync)
+    rather than keep holding its SQL Server connection; 0 waits forever.
+
+    A server that cannot be reached, or a database that fails to harvest
+    or write, only fails its own slice: the error is reported in the
+    returned messages and every other server keeps syncing.
+
+    Unless `full` is set, databases are harvested incrementally: only
+    tables modified since the database's stored watermark have their
+    columns read from SQL Server.
+
+    Counters of the run are kept in `progress` (a SyncProgress), which
+    can be polled from another thread while run() is in progress.
+    """
+
+    def __init__(
+        self,
+        pg: PostgresClient,
+        max_servers: int = 4,
+        max_databases: int = 2,
+        queue_size: int = 8,
+        batch_size: int = 5000,
+        stream_timeout: float = 600.0,
+        connections: SQLServerConnectionManager = connection_manager,
+        full: bool = False,
+        progress: Optional[SyncProgress] = None,
+    ):
+        self.pg = pg
+        self.max_servers = max(1, max_servers)
+        self.max_databases = max(1, max_databases)
+        self.batch_size = batch_size
+        self.stream_timeout = stream_timeout
+        self.connections = connections
+        self.full = full
+        self.progress = progress if progress is not None else SyncProgress()
+        self._watermarks: Dict[tuple, Any] = {}
+        # Number of catalog rows inserted, updated or deleted by the last run. Table
+        # statistics move on every live database, so their updates are counted
+        # apart and do not make a new catalog version.
+        self.changes = 0
+        self.stats_updates = 0
+        # Tables whose definition changed or that were dropped, per (server_id, database),
+        # and the remaining databases of servers that had databases dropped.
+        self.changed_tables: Dict[Tuple[int, str], Set[Tuple[str, str]]] = {}
+        self.pruned_servers: Dict[int, List[str]] = {}
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self._cancelled = threading.Event()
+
+    def run(self, servers: List[Dict[str, Any]]) -> Tuple[bool, List[str]]:
+        """
+        Sync every server in `servers` (rows from PostgresClient.get_servers()).
+        Returns (ok, messages) where ok is False if any slice failed.
+        """
+        messages: List[str] = []
+        self.progress.begin(len(servers))
+        if not servers:
+            return True, messages
+
+        self.changes = 0
+        self.stats_updates = 0
+        self.changed_tables = {}
+        self.pruned_servers = {}
+        self._cancelled.clear()
+        if not self.full:
+            self._watermarks = self.pg.get_modify_watermarks()
+
+        with ThreadPoolExecutor(max_workers=self.max_servers, thread_name_prefix="sync-server") as pool:
+            for server in servers:
+                pool.submit(self._sync_server, server)
+            try:
+                messages.extend(self._write_until_done(len(servers)))
+            except BaseException:
+                # Nothing drains the queue any more: release the workers blocked
+                # on it, or the pool shutdown would wait for them forever.
+                self._cancelled.set()
+                raise
+
+        for phase, seconds in self.progress.snapshot()["time_spent_s"].items():
+            SYNC_SECONDS.observe(seconds, phase=phase)
+        return not messages, messages
+
+    # ------------------------
+    # Producer side (SQL Server)
+    # ------------------------
+
+    def _sync_server(self, server: Dict[str, Any]):
+        done = _ServerDone(server_id=server.get('id'), server_name=server.get('name'))
+        try:
+            with self.connections.client(server) as sql:
+                databases = sql.discover_databases()
+            print(f"[INFO] Found {len(databases)} databases on {done.server_name}")
+            self.progress.add_databases(len(databases))
+
+            with ThreadPoolExecutor(max_workers=self.max_databases,
+                                    thread_name_prefix=f"sync-{done.server_name}") as pool:
+                futures = {pool.submit(self._harvest_database, server, db_name): db_name for db_name in databases}
+                for future, db_name in futures.items():
+                    error = future.exception()
+                    if error is not None:
+                        self.progress.database_failed()
+                        done.errors.append(f"[ERROR] Cannot harvest {done.server_name}.{db_name}: {error}")
+            done.databases = databases
+        except Exception as e:
+            done.errors.append(f"[ERROR] Cannot connect to SQL Server {done.server_name}: {e}")
+        finally:
+            try:
+                _put(self._queue, done, self._cancelled)
+            except _SyncCancelled:
+                pass
+
+    def _harvest_database(self, server: Dict[str, Any], db_name: str):
+        if self._cancelled.is_set():
+            raise _SyncCancelled()
+        watermark = self._watermarks.get((server.get('id'), db_name))
+        stream = _RecordStream(self._cancelled, self.stream_timeout)
+        with self.connections.client(server) as sql:
+            # Blocks while the writer is behind, which keeps memory bounded.
+            _put(self._queue, _HarvestedDatabase(server.get('id'), server.get('name'), db_name, stream),
+                 self._cancelled)
+            started, driver_before = time.perf_counter(), sql.driver_seconds
+            try:
+                batch = []
+                for record in sql.harvest_database(db_name, batch_size=self.batch_size, modified_since=watermark):
+                    batch.append(record)
+                    if len(batch) == self.batch_size:
+                        stream.put(batch)
+                        batch = []
+                if batch:
+                    stream.put(batch)
+                elapsed, driver = time.perf_counter() - started, sql.driver_seconds - driver_before
+                stream.harvest_seconds = elapsed - stream.blocked_seconds
+                self.progress.add_time(sqlserver=driver, harvest_python=stream.harvest_seconds - driver)
+                stream.put(_END)
+            except _SyncCancelled:
+                # The writer gave up on this database (and reported why) or on the run.
+                return
+            except _StreamStalled:
+                stream.fail(RuntimeError(f"the writer took no batch for {self.stream_timeout:g}s; "
+                                         f"released the connection, retrying on the next sync"))
+                return
+            except Exception as e:
+                stream.fail(e)
+
+    # ------------------------
+    # Consumer side (PostgreSQL)
+    # ------------------------
+
+    def _write_until_done(self, server_count: int) -> List[str]:
+        messages: List[str] = []
+        remaining = server_count
+        started = time.perf_counter()
+        idle = postgres = 0.0
+        while remaining:
+            waiting = time.perf_counter()
+            item = self._queue.get()
+            writing = time.perf_counter()
+            idle += writing - waiting
+            if isinstance(item, _ServerDone):
+                remaining -= 1
+                self.progress.server_done(failed=item.databases is None)
+                messages.extend(item.errors)
+                for msg in item.errors:
+                    print(msg)
+                    self.progress.error(msg)
+                if item.databases == []:
+                    # A failed or restricted listing is likelier than a server without databases.
+                    print(f"[WARN] {item.server_name} listed no databases; keeping its catalog")
+                elif item.databases is not None:
+                    try:
+                        dropped = self.pg.delete_databases_not_in(item.server_id, item.databases)
+                        self.changes += dropped
+                        if dropped:
+                            self.pruned_servers[item.server_id] = item.databases
+                            print(f"[INFO] Removed {dropped} databases dropped from {item.server_name}")
+                    except Exception as e:
+                        self._rollback()
+                        msg = f"[ERROR] Cannot prune databases of {item.server_name}: {e}"
+                        messages.append(msg)
+                        self.progress.error(msg)
+                postgres += time.perf_counter() - writing
+                continue
+
+            stream = item.records
+            try:
+                db_id = self.pg.insert_database_if_not_exists(item.server_id, item.db_name)
+                changed: Set[Tuple[str, str]] = set()
+                counts = self.pg.sync_database_catalog(db_id, stream, changed=changed)
+                write_seconds = time.perf_counter() - writing - stream.wait_seconds
+                if changed:
+                    self.changed_tables[(item.server_id, item.db_name)] = changed
+                changes = sum(sum(c.values()) for level, c in counts.items() if level != "table_stats")
+                self.changes += changes
+                self.stats_updates += counts["table_stats"]["updated"]
+                self.progress.database_done(stream.tables, stream.columns_harvested, changes,
+                                            counts["table_stats"]["updated"])
+                self.progress.database_timing(item.server_name, item.db_name, stream.tables,
+                                              stream.harvest_seconds, write_seconds)
+                print(f"[INFO] {item.server_name}.{item.db_name}: " + ", ".join(
+                    f"{level} +{c['inserted']} ~{c['updated']} -{c['deleted']}" for level, c in counts.items()
+                ))
+            except Exception as e:
+                self._rollback()
+                action = "harvest" if isinstance(e, _HarvestFailed) else "write"
+                msg = f"[ERROR] Cannot {action} {item.server_name}.{item.db_name}: {e}"
+                print(msg)
+                messages.append(msg)
+                self.progress.database_failed()
+                self.progress.error(msg)
+            finally:
+                stream.abandon()
+                idle += stream.wait_seconds
+                postgres += time.perf_counter() - writing - stream.wait_seconds
+        self.progress.add_time(postgres=postgres, writer_idle=idle,
+                               writer_python=time.perf_counter() - started - idle - postgres)
+        return messages
+
+    def _rollback(self):
+        """Roll back the writer's transaction; a dead connection is discarded on next use."""
+        try:
+            self.pg.conn.rollback()
+        except Exception as e:
+            print(f"[WARN] Cannot roll back the sync transaction: {e}")
@@ -0,0 +1,169 @@
+import random
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.sync.progress import SyncProgress
+
+
+class SyncAlreadyRunningError(Exception):
+    """Raised by a sync runner when another process already holds the sync lock."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class SyncJob:
+    """One background metadata sync and its outcome."""
+    id: str
+    full: bool
+    trigger: str
+    state: str = "queued"
+    created_at: datetime = field(default_factory=_now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    progress: SyncProgress = field(default_factory=SyncProgress)
+    messages: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "full": self.full,
+            "trigger": self.trigger,
+            "state": self.state,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress.snapshot(),
+            "messages": self.messages,
+            "error": self.error,
+        }
+
+
+class SyncJobManager:
+    """
+    Runs metadata syncs as background jobs, one at a time.
+
+    submit() is single-flight: while a job is queued or running, further
+    triggers (API calls or the scheduler) get that job back instead of
+    starting a second sync. `runner` is called as
+    runner(full=..., progress=...) on a dedicated thread and returns
+    (ok, messages) like init_metadata.sync_metadata. The last `history`
+    jobs are kept for status lookups.
+    """
+
+    def __init__(self, runner: Callable[..., Tuple[bool, List[str]]], history: int = 20):
+        self.runner = runner
+        self.history = max(1, history)
+        self._jobs: "OrderedDict[str, SyncJob]" = OrderedDict()
+        self._active: Optional[SyncJob] = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def submit(self, full: bool = False, trigger: str = "api") -> Tuple[SyncJob, bool]:
+        """Start a sync unless one is in flight. Returns (job, created)."""
+        with self._lock:
+            if self._active is not None:
+                return self._active, False
+            job = SyncJob(id=uuid.uuid4().hex, full=full, trigger=trigger)
+            self._active = job
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                oldest = next(iter(self._jobs))
+                if self._jobs[oldest] is job:
+                    break
+                del self._jobs[oldest]
+        threading.Thread(target=self._run, args=(job,), name=f"sync-job-{job.id[:8]}", daemon=True).start()
+        return job, True
+
+    def _run(self, job: SyncJob):
+        job.state = "running"
+        job.started_at = _now()
+        try:
+            ok, messages = self.runner(full=job.full, progress=job.progress)
+            job.messages = list(messages)
+            job.state = "succeeded" if ok else "completed_with_errors"
+        except SyncAlreadyRunningError as e:
+            job.state = "skipped"
+            job.error = str(e)
+        except Exception as e:
+            job.state = "failed"
+            job.error = str(e)
+            print(f"[ERROR] Metadata sync job {job.id} failed: {e}")
+        finally:
+            job.progress.finish()
+            job.finished_at = _now()
+            with self._lock:
+                self._active = None
+                self._idle.notify_all()
+
+    def get(self, job_id: str) -> Optional[SyncJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[SyncJob]:
+        """Known jobs, most recent first."""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    @property
+    def active(self) -> Optional[SyncJob]:
+        with self._lock:
+            return self._active
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until no job is running. Returns False on timeout."""
+        with self._lock:
+            return self._idle.wait_for(lambda: self._active is None, timeout)
+
+
+class SyncScheduler:
+    """
+    Submits a sync every `interval` seconds, randomized by +/- `jitter`
+    (a fraction of the interval) so that replicas started together do not
+    hit every SQL Server at the same moment. Ticks that land while a sync
+    is still running are absorbed by SyncJobManager's single-flight.
+    """
+
+    def __init__(self, jobs: SyncJobManager, interval: float, jitter: float = 0.1):
+        self.jobs = jobs
+        self.interval = interval
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def next_delay(self) -> float:
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="sync-scheduler", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self.next_delay()):
+            job, created = self.jobs.submit(trigger="schedule")
+            if created:
+                print(f"[INFO] Scheduled metadata sync started (job {job.id})")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
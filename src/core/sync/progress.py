@@ -0,0 +1,143 @@
+import heapq
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+class SyncProgress:
+    """
+    Thread-safe progress counters of one sync run, updated by the
+    ParallelSyncExecutor workers and read by the job status endpoint.
+
+    Databases only become known once their server has been listed, so
+    `databases.total` grows while servers are being discovered.
+
+    `time_spent_s` splits the work between the SQL Server driver, Python
+    record building on the harvest workers, PostgreSQL writes, and the
+    writer's own Python time and idle time (waiting for harvests). Harvest
+    phases are summed over the parallel workers, so they can exceed the
+    elapsed time.
+    """
+
+    TIME_PHASES = ("sqlserver", "harvest_python", "postgres", "writer_python", "writer_idle")
+
+    def __init__(self, max_errors: int = 50, slowest: int = 10):
+        self._lock = threading.Lock()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.servers_total = 0
+        self.servers_done = 0
+        self.servers_failed = 0
+        self.databases_total = 0
+        self.databases_done = 0
+        self.databases_failed = 0
+        self.tables_done = 0
+        self.tables_harvested = 0
+        self.changes = 0
+        self.stats_updates = 0
+        self.error_count = 0
+        self.errors: Deque[str] = deque(maxlen=max_errors)
+        self.time_spent = dict.fromkeys(self.TIME_PHASES, 0.0)
+        self._slowest_limit = slowest
+        # min-heap of (seconds, details) keeping the `slowest` slowest databases
+        self._slowest: List[Tuple[float, int, Dict[str, Any]]] = []
+
+    def begin(self, servers: int):
+        with self._lock:
+            self.started_at = time.monotonic()
+            self.servers_total = servers
+
+    def add_databases(self, count: int):
+        with self._lock:
+            self.databases_total += count
+
+    def server_done(self, failed: bool = False):
+        with self._lock:
+            self.servers_done += 1
+            if failed:
+                self.servers_failed += 1
+
+    def database_done(self, tables: int, harvested: int, changes: int, stats_updates: int = 0):
+        with self._lock:
+            self.databases_done += 1
+            self.tables_done += tables
+            self.tables_harvested += harvested
+            self.changes += changes
+            self.stats_updates += stats_updates
+
+    def add_time(self, **seconds: float):
+        """Add seconds to phases of TIME_PHASES, e.g. add_time(postgres=0.4)."""
+        with self._lock:
+            for phase, value in seconds.items():
+                self.time_spent[phase] += value
+
+    def database_timing(self, server: str, database: str, tables: int, harvest_s: float, write_s: float):
+        """Record how long one database took to harvest and write, for the slowest-databases list."""
+        entry = {
+            "server": server,
+            "database": database,
+            "tables": tables,
+            "harvest_s": round(harvest_s, 3),
+            "write_s": round(write_s, 3),
+        }
+        item = (harvest_s + write_s, id(entry), entry)
+        with self._lock:
+            if len(self._slowest) < self._slowest_limit:
+                heapq.heappush(self._slowest, item)
+            elif item[0] > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def database_failed(self):
+        with self._lock:
+            self.databases_done += 1
+            self.databases_failed += 1
+
+    def error(self, message: str):
+        with self._lock:
+            self.error_count += 1
+            self.errors.append(message)
+
+    def finish(self):
+        with self._lock:
+            self.finished_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters, remaining work, throughput and a rough ETA as a JSON-ready dict."""
+        with self._lock:
+            if self.started_at is None:
+                elapsed = 0.0
+            else:
+                elapsed = (self.finished_at or time.monotonic()) - self.started_at
+            databases_remaining = self.databases_total - self.databases_done
+            db_rate = self.databases_done / elapsed if elapsed else 0.0
+            return {
+                "elapsed_s": round(elapsed, 3),
+                "servers": {
+                    "total": self.servers_total,
+                    "done": self.servers_done,
+                    "failed": self.servers_failed,
+                    "remaining": self.servers_total - self.servers_done,
+                },
+                "databases": {
+                    "total": self.databases_total,
+                    "done": self.databases_done,
+                    "failed": self.databases_failed,
+                    "remaining": databases_remaining,
+                },
+                "tables": {
+                    "done": self.tables_done,
+                    "harvested": self.tables_harvested,
+                },
+                "changes": self.changes,
+                "stats_updates": self.stats_updates,
+                "rates": {
+                    "databases_per_s": round(db_rate, 3),
+                    "tables_per_s": round(self.tables_done / elapsed, 3) if elapsed else 0.0,
+                },
+                "eta_s": round(databases_remaining / db_rate, 1) if db_rate and self.finished_at is None else None,
+                "time_spent_s": {phase: round(value, 3) for phase, value in self.time_spent.items()},
+                "slowest_databases": [entry for _, _, entry in sorted(self._slowest, reverse=True)],
+                "error_count": self.error_count,
+                "errors": list(self.errors),
+            }
@@ -0,0 +1,81 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from core.utils.crypto_utils import CryptoUtils
+from core.utils.secrets_manager import get_secret
+
+
+class CredentialVault:
+    """
+    In-memory cache of decrypted server passwords.
+
+    Server rows carry their Fernet ciphertext (`encrypted_password`); the
+    vault decrypts a server's password the first time a connection to it is
+    opened and keeps the plaintext in process memory only. A password is
+    decrypted again only when the row's ciphertext changes or the key
+    rotates: through rotate_key(), or when the secret store's
+    PASSWORD_ENCRYPTION_KEY changes (secret values are refreshed in the
+    background). Listing servers therefore costs no crypto work.
+    """
+
+    def __init__(self, key: Optional[str] = None):
+        self._key = key
+        self._crypto: Optional[CryptoUtils] = None
+        self._crypto_key: Optional[str] = None
+        # server id -> (ciphertext, key generation, plaintext)
+        self._secrets: Dict[Any, Tuple[str, int, str]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "decryptions": 0, "rotations": 0}
+
+    def _cipher(self) -> Tuple[CryptoUtils, int]:
+        key = self._key if self._key is not None else get_secret("PASSWORD_ENCRYPTION_KEY")
+        with self._lock:
+            if self._crypto is None or key != self._crypto_key:
+                if self._crypto is not None:
+                    self._generation += 1
+                    self._secrets.clear()
+                    self._stats["rotations"] += 1
+                self._crypto, self._crypto_key = CryptoUtils(key), key
+            return self._crypto, self._generation
+
+    def password(self, server: Dict[str, Any]) -> Optional[str]:
+        """The plaintext password of `server` (a row from PostgresClient.get_servers())."""
+        ciphertext = server.get("encrypted_password")
+        if not ciphertext:
+            return ciphertext
+        server_id = server.get("id", (server.get("host"), server.get("port"), server.get("username")))
+        crypto, generation = self._cipher()
+        with self._lock:
+            cached = self._secrets.get(server_id)
+            if cached is not None and cached[0] == ciphertext and cached[1] == generation:
+                self._stats["hits"] += 1
+                return cached[2]
+        plaintext = crypto.decrypt(ciphertext)
+        with self._lock:
+            if generation == self._generation:
+                self._secrets[server_id] = (ciphertext, generation, plaintext)
+            self._stats["decryptions"] += 1
+        return plaintext
+
+    def rotate_key(self, key: str):
+        """Decrypt with `key` from now on and forget every cached password."""
+        CryptoUtils(key)  # reject an invalid key before dropping the current one
+        with self._lock:
+            self._key = key
+        self._cipher()
+
+    def forget(self, server_id: Any = None):
+        """Drop the cached password of one server, or of every server."""
+        with self._lock:
+            if server_id is None:
+                self._secrets.clear()
+            else:
+                self._secrets.pop(server_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "cached": len(self._secrets)}
+
+
+credential_vault = CredentialVault()
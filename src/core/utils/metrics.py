@@ -0,0 +1,201 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+# Seconds; spans sub-millisecond metadata reads up to multi-minute harvests.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+                   120.0, 300.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{_label_text(self.labelnames, key)} {_format(value)}" for key, value in values)
+        return lines
+
+
+class Histogram:
+    """
+    Latency histogram with labels, plus a `<name>_errors_total` counter for
+    timed blocks that raised.
+
+    observe() is a dict lookup, a bisect and an add under a lock, cheap
+    enough for every database call and request. Quantiles are estimated
+    from the buckets (linear interpolation, as Prometheus'
+    histogram_quantile does).
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.errors = Counter(f"{name.rsplit('_seconds', 1)[0]}_errors_total", f"Errors: {help}", labelnames)
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def observe(self, seconds: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the duration of the block; count an error if it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.errors.inc(**labels)
+            raise
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _quantile(self, counts: List[int], total: int, q: float) -> float:
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Per-series count, errors, mean and p50/p95/p99 in milliseconds."""
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        with self.errors._lock:
+            errors = dict(self.errors._values)
+        result = []
+        for key, counts, total, count in sorted(series):
+            result.append({
+                **dict(zip(self.labelnames, key)),
+                "count": count,
+                "errors": int(errors.get(key, 0)),
+                "mean_ms": round(total / count * 1000, 3) if count else 0.0,
+                **{f"p{int(q * 100)}_ms": round(self._quantile(counts, count, q) * 1000, 3)
+                   for q in (0.5, 0.95, 0.99)},
+            })
+        return result
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(counts), total, count) for key, (counts, total, count) in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % ("+Inf" if bound == float("inf") else _format(bound))
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {_format(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {count}")
+        return lines + self.errors.render()
+
+
+class MetricsRegistry:
+    """The process's metrics, rendered in the Prometheus text format by /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics if isinstance(metric, Histogram)}
+
+
+def timed(histogram: Histogram, operation: str,
+          labels: Optional[Callable[..., Dict[str, Any]]] = None) -> Callable:
+    """
+    Method decorator observing every call in `histogram` under
+    operation=`operation`, plus whatever `labels(self, *args, **kwargs)`
+    returns.
+    """
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            extra = labels(self, *args, **kwargs) if labels is not None else {}
+            with histogram.time(operation=operation, **extra):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+metrics = MetricsRegistry()
+
+SQLSERVER_SECONDS = metrics.histogram(
+    "mcp_sqlserver_operation_seconds", "SQL Server catalog calls", ("operation", "server", "database"))
+POSTGRES_SECONDS = metrics.histogram(
+    "mcp_postgres_operation_seconds", "Metadata store (PostgreSQL) calls", ("operation",))
+HTTP_SECONDS = metrics.histogram(
+    "mcp_http_request_seconds", "HTTP requests, until the last body byte", ("method", "route", "status"))
+SYNC_SECONDS = metrics.histogram(
+    "mcp_sync_seconds", "Metadata sync runs by phase (wall time summed over workers)", ("phase",))
@@ -1,61 +1,246 @@
 import os
-from typing import Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from dotenv import load_dotenv
 
-AVAILABLE_CLOUD_SECRET_MANAGER = []
+from core.utils.startup import startup_profile
+
 load_dotenv()
 
-try:
-    import boto3
-    AVAILABLE_CLOUD_SECRET_MANAGER.append("aws")
-except ModuleNotFoundError as e:
-    print("No module found for AWS secret store")
-
-try:
-    import secretmanager
-    AVAILABLE_CLOUD_SECRET_MANAGER.append("gcp")
-except ModuleNotFoundError as e:
-    print("No module found for GCP secret store")
-
-try:
-    import SecretClient
-    import DefaultAzureCredential
-    AVAILABLE_CLOUD_SECRET_MANAGER.append("azure")
-except ModuleNotFoundError as e:
-    print("No module found for Azure secret store")
+CLOUD_BACKENDS = ("aws", "gcp", "azure")
+# AWS BatchGetSecretValue accepts at most 20 secret ids per call.
+AWS_BATCH_SIZE = 20
+_NOT_FOUND_ERRORS = ("NotFound", "ResourceNotFoundError", "ResourceNotFoundException")
+# _fetch_one() result for a lookup that failed (as opposed to a secret that does not exist).
+_FAILED = object()
+
+
+class SecretResolver:
+    """
+    Resolves settings and secrets from Docker/K8s secret files, the
+    environment, or the cloud secret store selected by SECRET_BACKEND.
+
+    Cloud lookups share one client per process, created (and its SDK
+    imported) on first use. prefetch() resolves a list of names in one
+    pass (BatchGetSecretValue on AWS, concurrent lookups on GCP and Azure)
+    and keeps the values in memory. A background thread re-reads them
+    every SECRET_CACHE_TTL seconds, so get() never waits on the network
+    after the first resolution and picks up rotated values. With a TTL of
+    0 values are resolved once per process.
+    """
+
+    def __init__(self, backend: Optional[str] = None, ttl: Optional[float] = None):
+        self.backend = (backend or os.getenv("SECRET_BACKEND", "env")).lower()
+        self.ttl = float(os.getenv("SECRET_CACHE_TTL", 300)) if ttl is None else ttl
+        # name -> (value, or None if the store has no such secret or was never read; time resolved)
+        self._cache: Dict[str, Tuple[Optional[str], float]] = {}
+        self._client: Any = None
+        self._client_ready = False
+        self._lock = threading.Lock()
+        self._client_lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stats = {"hits": 0, "lookups": 0, "round_trips": 0, "errors": 0, "refreshes": 0}
+
+    # ------------------------
+    # Lookup
+    # ------------------------
+
+    def get(self, name: str, default: Any = None) -> Any:
+        # 1. Docker/K8s file secrets
+        secret_file = f"/run/secrets/{name}"
+        if os.path.isfile(secret_file):
+            with open(secret_file) as f:
+                return f.read().strip()
+
+        # 2. Environment variable
+        if self.backend == "env":
+            return os.getenv(name, default)
+        if self.backend not in CLOUD_BACKENDS:
+            return default
+
+        # 3. Cloud backends, through the cache
+        with self._lock:
+            entry = self._cache.get(name)
+            fresh = entry is not None and (not self.ttl or self._refresher is not None
+                                           or time.monotonic() - entry[1] < self.ttl)
+            if fresh:
+                self._stats["hits"] += 1
+        if not fresh:
+            self.prefetch([name], force=True)
+            with self._lock:
+                entry = self._cache.get(name)
+        value = entry[0] if entry is not None else None
+        return default if value is None else value
+
+    def prefetch(self, names: Iterable[str], force: bool = False):
+        """Resolve `names` from the cloud store in one batched pass and cache them."""
+        if self.backend not in CLOUD_BACKENDS:
+            return
+        with self._lock:
+            names = [name for name in dict.fromkeys(names)
+                     if (force or name not in self._cache) and not os.path.isfile(f"/run/secrets/{name}")]
+        if not names:
+            return
+        started = time.perf_counter()
+        values = self._fetch(names)
+        now = time.monotonic()
+        with self._lock:
+            for name in names:
+                if name in values:
+                    self._cache[name] = (values[name], now)
+                elif name not in self._cache:
+                    # The lookup failed: use the default until a refresh succeeds.
+                    self._cache[name] = (None, now)
+                # else keep the value read last time rather than losing it to a transient error
+        if not self._refresher_started():
+            startup_profile.add(f"secrets.prefetch[{len(names)}]", time.perf_counter() - started)
+        self._start_refresher()
+
+    # ------------------------
+    # Backends
+    # ------------------------
+
+    def _get_client(self) -> Any:
+        """The backend's client, created once; None if its SDK is not installed."""
+        with self._client_lock:
+            if self._client_ready:
+                return self._client
+            self._client_ready = True
+            try:
+                with startup_profile.step(f"secrets.{self.backend}.import"):
+                    if self.backend == "aws":
+                        import boto3
+                    elif self.backend == "gcp":
+                        from google.cloud import secretmanager
+                    else:
+                        from azure.identity import DefaultAzureCredential
+                        from azure.keyvault.secrets import SecretClient
+            except ModuleNotFoundError:
+                print(f"[WARN] No module found for {self.backend} secret store; using defaults")
+                return None
+            with startup_profile.step(f"secrets.{self.backend}.client"):
+                if self.backend == "aws":
+                    self._client = boto3.client("secretsmanager")
+                elif self.backend == "gcp":
+                    self._client = secretmanager.SecretManagerServiceClient()
+                else:
+                    self._client = SecretClient(vault_url=os.getenv("AZURE_KEYVAULT_URL"),
+                                                credential=DefaultAzureCredential())
+            return self._client
+
+    def _fetch(self, names: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Look `names` up in the store: their value, or None for secrets that
+        do not exist. Names whose lookup failed are left out.
+        """
+        client = self._get_client()
+        if client is None:
+            return {}
+        with self._lock:
+            self._stats["lookups"] += len(names)
+        if self.backend == "aws" and hasattr(client, "batch_get_secret_value"):
+            return self._fetch_aws_batch(client, names)
+        values: Dict[str, Optional[str]] = {}
+        with ThreadPoolExecutor(max_workers=min(16, len(names)), thread_name_prefix="secrets") as pool:
+            for name, value in zip(names, pool.map(lambda name: self._fetch_one(client, name), names)):
+                if value is not _FAILED:
+                    values[name] = value
+        return values
+
+    def _fetch_aws_batch(self, client: Any, names: List[str]) -> Dict[str, Optional[str]]:
+        values: Dict[str, Optional[str]] = {}
+        for i in range(0, len(names), AWS_BATCH_SIZE):
+            request: Dict[str, Any] = {"SecretIdList": names[i:i + AWS_BATCH_SIZE]}
+            while True:
+                with self._lock:
+                    self._stats["round_trips"] += 1
+                try:
+                    response = client.batch_get_secret_value(**request)
+                except Exception as e:
+                    self._failed(", ".join(request["SecretIdList"]), e)
+                    break
+                for secret in response.get("SecretValues", []):
+                    values[secret["Name"]] = secret.get("SecretString")
+                for error in response.get("Errors", []):
+                    if error.get("ErrorCode") in _NOT_FOUND_ERRORS:
+                        values[error.get("SecretId")] = None
+                    else:
+                        self._failed(error.get("SecretId"), error.get("Message"))
+                if not response.get("NextToken"):
+                    break
+                request["NextToken"] = response["NextToken"]
+        return values
+
+    def _fetch_one(self, client: Any, name: str) -> Any:
+        with self._lock:
+            self._stats["round_trips"] += 1
+        try:
+            if self.backend == "aws":
+                return client.get_secret_value(SecretId=name).get("SecretString")
+            if self.backend == "gcp":
+                project_id = os.getenv("GCP_PROJECT_ID")
+                secret_path = f"projects/{project_id}/secrets/{name}/versions/latest"
+                return client.access_secret_version(name=secret_path).payload.data.decode("UTF-8")
+            # Key Vault secret names only allow letters, digits and dashes.
+            return client.get_secret(name.replace("_", "-")).value
+        except Exception as e:
+            if type(e).__name__ in _NOT_FOUND_ERRORS:
+                return None
+            self._failed(name, e)
+            return _FAILED
+
+    def _failed(self, name: Optional[str], error: Any):
+        with self._lock:
+            self._stats["errors"] += 1
+        print(f"[WARN] Cannot read secret {name} from {self.backend}: {error}")
+
+    # ------------------------
+    # Background refresh
+    # ------------------------
+
+    def _refresher_started(self) -> bool:
+        with self._lock:
+            return self._refresher is not None
+
+    def _start_refresher(self):
+        if not self.ttl:
+            return
+        with self._lock:
+            if self._refresher is not None or self._stop.is_set():
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name="secrets-refresh", daemon=True)
+        self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.ttl):
+            with self._lock:
+                names = list(self._cache)
+            try:
+                self.prefetch(names, force=True)
+                with self._lock:
+                    self._stats["refreshes"] += 1
+            except Exception as e:
+                print(f"[WARN] Secret refresh failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": self.backend, "ttl_s": self.ttl, "cached": len(self._cache), **self._stats}
+
+
+secret_resolver = SecretResolver()
+
 
 def get_secret(name: str, default: Any = None) -> Any:
-    backend = os.getenv("SECRET_BACKEND", "env").lower()
-
-    # 1. Docker/K8s file secrets
-    secret_file = f"/run/secrets/{name}"
-    if os.path.isfile(secret_file):
-        with open(secret_file) as f:
-            return f.read().strip()
-
-    # 2. Environment variable
-    if backend == "env":
-        return os.getenv(name, default)
-
-    # 3. Cloud backends
-    if backend == "aws" and "aws" in AVAILABLE_CLOUD_SECRET_MANAGER:
-        client = boto3.client("secretsmanager")
-        resp = client.get_secret_value(SecretId=name)
-        return resp.get("SecretString")
-
-    if backend == "gcp" and "gcp" in AVAILABLE_CLOUD_SECRET_MANAGER:
-        client = secretmanager.SecretManagerServiceClient()
-        project_id = os.getenv("GCP_PROJECT_ID")
-        secret_path = f"projects/{project_id}/secrets/{name}/versions/latest"
-        resp = client.access_secret_version(name=secret_path)
-        return resp.payload.data.decode("UTF-8")
-
-    if backend == "azure" and "azure" in AVAILABLE_CLOUD_SECRET_MANAGER:
-        keyvault_url = os.getenv("AZURE_KEYVAULT_URL")
-        credential = DefaultAzureCredential()
-        client = SecretClient(vault_url=keyvault_url, credential=credential)
-        secret = client.get_secret(name)
-        return secret.value
-
-    return default
\ No newline at end of file
+    return secret_resolver.get(name, default)
+
+
+def prefetch_secrets(names: Iterable[str]):
+    """Resolve every name settings will ask for in one batched pass (no-op for the env backend)."""
+    secret_resolver.prefetch(names)
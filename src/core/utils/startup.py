@@ -0,0 +1,61 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+class StartupProfile:
+    """
+    Timings of the steps of a process start (module imports, secret
+    resolution, connection pools), logged once when the server is ready so
+    cold-start time can be tracked as replicas scale out. The clock starts
+    when this module is first imported, so import it first.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.steps: List[Tuple[str, float]] = []
+        self.total_s: float = 0.0
+        self._last_mark = self.started
+        self._logged = False
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.steps.append((name, seconds))
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def mark(self, name: str):
+        """Record the time from process start (or the previous mark) until now as `name`."""
+        now = time.perf_counter()
+        with self._lock:
+            self.steps.append((name, now - self._last_mark))
+            self._last_mark = now
+
+    def log(self):
+        """Print the profile, once."""
+        with self._lock:
+            if self._logged:
+                return
+            self._logged = True
+            self.total_s = time.perf_counter() - self.started
+            steps = list(self.steps)
+        details = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in steps)
+        print(f"[INFO] Startup took {self.total_s:.2f}s ({details})")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total_s": round(self.total_s, 3) if self._logged else None,
+                "steps": [{"step": name, "ms": round(seconds * 1000, 1)} for name, seconds in self.steps],
+            }
+
+
+startup_profile = StartupProfile()
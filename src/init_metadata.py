@@ -1,73 +1,122 @@
-from core.db.sqlserver_client import SQLServerClient
+import argparse
+from typing import Any, Dict, List, Optional
+
 from core.db.postgres_client import PostgresClient
 from config import settings
 from config.config_loader import load_server_configs
+from core.cache.catalog_snapshot import catalog_snapshots
+from core.cache.metadata_cache import metadata_cache
+from core.cache.query_cache import query_cache, sample_cache
+from core.db.sqlserver_pool import SQLServerConnectionManager, connection_manager
+from core.sync.executor import ParallelSyncExecutor
+from core.sync.jobs import SyncAlreadyRunningError, SyncJobManager, SyncScheduler
+from core.sync.progress import SyncProgress
+
+# pg_advisory_lock key serializing syncs across API replicas and CLI runs.
+SYNC_LOCK_KEY = 0x4D4350_53594E43
+
 
+def sync_metadata(full: bool = False, progress: Optional[SyncProgress] = None,
+                  servers: Optional[List[Dict[str, Any]]] = None,
+                  connections: SQLServerConnectionManager = connection_manager):
+    """
+    Sync every configured SQL Server into the metadata store.
 
-def sync_metadata():
-    servers = load_server_configs()
+    By default only tables modified since the last sync are re-read; pass
+    `full=True` to force a full reconciliation of every table. Counters are
+    reported into `progress` when given. `servers` (servers.yml entries)
+    and `connections` default to the configured servers and the shared
+    pool; the benchmarks substitute synthetic ones. Raises
+    SyncAlreadyRunningError if another process is syncing the same
+    metadata store.
+    """
+    if servers is None:
+        servers = load_server_configs()
 
     pg = PostgresClient(
         host=settings.POSTGRES_HOST,
         port=settings.POSTGRES_PORT,
         user=settings.POSTGRES_USER,
         password=settings.POSTGRES_PASSWORD,
-        dbname=settings.POSTGRES_DB
+        dbname=settings.POSTGRES_DB,
+        max_connections=2,
     )
     pg.connect()
+    if not pg.try_advisory_lock(SYNC_LOCK_KEY):
+        pg.close()
+        raise SyncAlreadyRunningError("Another metadata sync is already running")
 
-    for srv in servers:
-        print(f"🔄 Syncing server: {srv['name']} ({srv['host']})")
-        pg.insert_server_if_not_exists(
-            name=srv["name"],
-            host=srv["host"],
-            port=srv["port"],
-            username=srv["username"],
-            password=srv["password"],
-        )
-
-    servers = pg.get_servers()
-    message_errors = []
+    try:
+        new_servers = 0
+        for srv in servers:
+            print(f"🔄 Syncing server: {srv['name']} ({srv['host']})")
+            new_servers += pg.insert_server_if_not_exists(
+                name=srv["name"],
+                host=srv["host"],
+                port=srv["port"],
+                username=srv["username"],
+                password=srv["password"],
+            )
 
-    for server in servers:
-        server_id = server.get('id')
-        server_name = server.get('name')
-        host = server.get('host')
-        port = server.get('port')
-        username = server.get('username')
-        enc_pwd = server.get('encrypted_password')
+        pg.commit()
+        servers = pg.get_servers()
 
-        sql = SQLServerClient(host, port, username, enc_pwd)
+        executor = ParallelSyncExecutor(
+            pg,
+            max_servers=settings.SYNC_MAX_PARALLEL_SERVERS,
+            max_databases=settings.SYNC_MAX_PARALLEL_DATABASES,
+            queue_size=settings.SYNC_QUEUE_SIZE,
+            batch_size=settings.SYNC_HARVEST_BATCH_SIZE,
+            stream_timeout=settings.SYNC_STREAM_TIMEOUT,
+            full=full,
+            progress=progress,
+            connections=connections,
+        )
+        ok, message_errors = executor.run(servers)
+        pg.commit()
+        # Cached query results and samples only go stale when a table they read from changed.
+        for cache in (query_cache, sample_cache):
+            for (server_id, db_name), tables in executor.changed_tables.items():
+                cache.invalidate_tables(server_id, db_name, tables)
+            for server_id, db_names in executor.pruned_servers.items():
+                cache.retain_databases(server_id, db_names)
+        version = None
+        if new_servers or executor.changes:
+            version = pg.bump_catalog_version()
+            query_cache.mark_version_handled(version)
+            sample_cache.mark_version_handled(version)
+        # Before announcing the version, so that readers find the new snapshot when they look.
         try:
-            sql.connect()
+            catalog_snapshots.publish(pg, version, batch_size=settings.METADATA_STREAM_BATCH_SIZE)
         except Exception as e:
-            print(f"[ERROR] Cannot connect to SQL Server {server_name}: {e}")
-            message_errors.append(f"[ERROR] Cannot connect to SQL Server {server_name}: {e}")
-            continue
+            print(f"[WARN] Cannot publish catalog snapshot: {e}")
+        if version is not None:
+            metadata_cache.publish_version(version)
+            print(f"[INFO] Catalog version is now {version} ({executor.changes} changes)")
+        if executor.stats_updates:
+            print(f"[INFO] Updated size statistics of {executor.stats_updates} tables")
+    finally:
+        pg.close()  # also releases the advisory lock
 
-        databases = sql.discover_databases()
-        print(f"[INFO] Found {len(databases)} databases")
-        for db_name in databases:
-            db_id = pg.insert_database_if_not_exists(server_id, db_name)
-            schemas = sql.discover_schemas(db_name)
-            for schema_name in schemas:
-                sc_id = pg.insert_schema_if_not_exists(db_id, schema_name)
-                tables = sql.discover_tables(db_name, schema_name)
-                for table_name in tables:
-                    tab_id = pg.insert_table_if_not_exists(sc_id, table_name)
-                    columns = sql.discover_columns(db_name, schema_name, table_name)
-                    pg.insert_columns_if_not_exists(tab_id, columns)
-
-
-        sql.close()
-
-    pg.commit()
-    pg.close()
-    if message_errors:
+    if not ok:
         return False, message_errors
     else:
         print("[INFO] Metadata sync completed successfully.")
         return True, message_errors
 
+
+# Background jobs behind /metadata/resync, and the optional periodic sync.
+sync_jobs = SyncJobManager(sync_metadata, history=settings.SYNC_JOB_HISTORY)
+sync_scheduler = SyncScheduler(sync_jobs, interval=settings.SYNC_SCHEDULE_INTERVAL,
+                               jitter=settings.SYNC_SCHEDULE_JITTER)
+
 if __name__ == "__main__":
-    sync_metadata()
+    parser = argparse.ArgumentParser(description="Sync SQL Server metadata into the metadata store.")
+    parser.add_argument("--full", action="store_true", help="re-read every table instead of only modified ones")
+    args = parser.parse_args()
+    try:
+        sync_metadata(full=args.full)
+    except SyncAlreadyRunningError as e:
+        print(f"[WARN] {e}")
+    finally:
+        connection_manager.close_all()
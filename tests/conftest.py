@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules import each other from src/ (e.g. `from core.cache.lru import LRUCache`).
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,137 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("pyodbc", exc_type=ImportError)
+
+from core.query.dispatcher import FanOutDispatcher, FanOutTarget  # noqa: E402
+
+
+class FakeConnections:
+    """
+    Stands in for SQLServerConnectionManager: every statement returns one row
+    holding its database name. Statements are held until `overlap` of them
+    have been running at the same time (or `wait` seconds pass), and the
+    overlap seen is recorded.
+    """
+
+    def __init__(self, overlap: int, wait: float = 1.0):
+        self.overlap = overlap
+        self.wait = wait
+        self.active: Counter = Counter()
+        self.max_per_server: Counter = Counter()
+        self.max_servers = 0
+        self.max_running = 0
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def client(self, server):
+        yield FakeClient(self, server["id"])
+
+    def started(self, server_id):
+        with self.condition:
+            self.active[server_id] += 1
+            self.max_per_server[server_id] = max(self.max_per_server[server_id], self.active[server_id])
+            self.max_servers = max(self.max_servers, len(+self.active))
+            self.max_running = max(self.max_running, sum(self.active.values()))
+            self.condition.notify_all()
+            self.condition.wait_for(lambda: self.max_running >= self.overlap, timeout=self.wait)
+
+    def ended(self, server_id):
+        with self.condition:
+            self.active[server_id] -= 1
+
+
+class FakeClient:
+    def __init__(self, connections, server_id):
+        self.conn = FakeConnection(connections, server_id)
+
+
+class FakeConnection:
+    autocommit = True
+    timeout = 0
+
+    def __init__(self, connections, server_id):
+        self.connections = connections
+        self.server_id = server_id
+        self.database = "master"
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+
+class FakeCursor:
+    description = None
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+        self.running = False
+
+    def execute(self, sql):
+        if sql.startswith("USE "):
+            self.conn.database = sql[5:-1]
+        elif sql.startswith("SELECT") and sql != "SELECT DB_NAME()":
+            self.description = [("db", str, None, None, None, None, True)]
+            self.rows = [(self.conn.database,)]
+            self.running = True
+            self.conn.connections.started(self.conn.server_id)
+        return self
+
+    def fetchval(self):
+        return self.conn.database
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        if self.running:
+            self.running = False
+            self.conn.connections.ended(self.conn.server_id)
+
+
+def targets(servers: int, databases: int):
+    # Sorted by server, like resolve_databases returns them.
+    return [FanOutTarget({"id": s, "name": f"srv{s}"}, s * 100 + d, f"db{s}_{d}")
+            for s in range(servers) for d in range(databases)]
+
+
+def run(dispatcher: FanOutDispatcher):
+    rows, summary = [], None
+    for kind, payload in dispatcher.run():
+        if kind == "rows":
+            rows.extend(payload)
+        elif kind == "done":
+            summary = payload
+    return rows, summary
+
+
+def test_servers_overlap_when_workers_are_scarce():
+    connections = FakeConnections(overlap=3)
+    dispatcher = FanOutDispatcher("SELECT DB_NAME() AS db", targets(3, 4), per_server=1,
+                                  max_workers=3, connections=connections)
+    rows, summary = run(dispatcher)
+    assert connections.max_servers == 3
+    assert max(connections.max_per_server.values()) == 1
+    assert sorted(row[1] for row in rows) == sorted(t.database for t in dispatcher.targets)
+    assert summary["succeeded"] == 12 and summary["failed"] == 0
+
+
+def test_per_server_limit_in_merge_mode():
+    connections = FakeConnections(overlap=4)
+    dispatcher = FanOutDispatcher("SELECT DB_NAME() AS db", targets(2, 6), merge="merge", key=["db"],
+                                  per_server=2, max_workers=32, connections=connections)
+    rows, summary = run(dispatcher)
+    assert connections.max_running == 4
+    assert max(connections.max_per_server.values()) == 2
+    assert [row[2] for row in rows] == sorted(t.database for t in dispatcher.targets)
+    assert summary["succeeded"] == 12
@@ -0,0 +1,40 @@
+import pytest
+
+from core.query.readonly import ReadOnlyViolationError, ensure_read_only
+
+
+@pytest.mark.parametrize("statement", [
+    "SELECT * INTO #copy FROM dbo.orders",
+    "SELECT name INTO dbo.names FROM sys.tables",
+    "WITH doomed AS (SELECT TOP 10 * FROM dbo.orders) DELETE FROM doomed",
+    "WITH t AS (SELECT 1 AS a) UPDATE dbo.orders SET status = 0",
+    "SELECT 1 /* harmless */ DROP TABLE dbo.orders",
+    "SELECT 1 -- harmless\nDELETE FROM dbo.orders",
+    "SELECT 1 /* DROP TABLE dbo.orders",
+    "SELECT * FROM OPENQUERY(linked, 'SELECT 1')",
+    "SELECT * FROM OPENROWSET('SQLNCLI', 'Server=x;', 'SELECT 1')",
+    "SELECT 1; SELECT 2",
+    "SELECT 1; DELETE FROM dbo.orders;",
+    "SELECT 1 EXEC('DROP TABLE dbo.orders')",
+    "SELECT NEXT VALUE FOR dbo.order_ids",
+    "SELECT next /* */ value\nfor dbo.order_ids AS id",
+    "DELETE FROM dbo.orders",
+    "",
+])
+def test_rejects(statement):
+    with pytest.raises(ReadOnlyViolationError):
+        ensure_read_only(statement)
+
+
+@pytest.mark.parametrize("statement, expected", [
+    ("SELECT 1;", "SELECT 1"),
+    ("  select name from sys.tables ;; ", "select name from sys.tables"),
+    ("SELECT 'DELETE FROM x; DROP' AS note", None),
+    ("SELECT [drop], \"insert\" FROM dbo.[update]", None),
+    ("SELECT id FROM dbo.orders -- DELETE\n", "SELECT id FROM dbo.orders -- DELETE"),
+    ("WITH recent AS (SELECT TOP 5 id FROM dbo.orders) SELECT * FROM recent", None),
+    ("SELECT id FROM dbo.orders ORDER BY id OFFSET 10 ROWS FETCH NEXT 10 ROWS ONLY", None),
+    ("SELECT value FROM STRING_SPLIT('a,b', ',') FOR JSON AUTO", None),
+])
+def test_accepts(statement, expected):
+    assert ensure_read_only(statement) == (expected if expected is not None else statement)
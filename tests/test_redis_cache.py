@@ -0,0 +1,108 @@
+import time
+
+import fakeredis
+import pytest
+
+from core.cache.catalog_version import CatalogVersion
+from core.cache.metadata_cache import MetadataCache
+from core.cache.redis_cache import RedisMetadataCache
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def subscribed(server, cache: RedisMetadataCache) -> bool:
+    return fakeredis.FakeRedis(server=server).pubsub_numsub(cache.channel)[0][1] > 0
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def replica(server, **kwargs):
+    """A MetadataCache with its own CatalogVersion, sharing `server` like another API replica."""
+    version = CatalogVersion(refresh_interval=3600)
+    shared = RedisMetadataCache(fakeredis.FakeRedis(server=server), version, retry_interval=0.05, **kwargs)
+    return MetadataCache(version, max_entries=16, max_bytes=1 << 20, shared=shared)
+
+
+def test_fill_once_then_hit(server):
+    cache = replica(server).shared
+    calls = []
+
+    def filler():
+        calls.append(1)
+        return b'[{"id":1}]'
+
+    assert cache.get_or_fill("get_servers", (None,), 3, filler) == b'[{"id":1}]'
+    assert cache.get_or_fill("get_servers", (None,), 3, filler) == b'[{"id":1}]'
+    assert len(calls) == 1
+    assert cache.stats()["fills"] == 1 and cache.stats()["hits"] == 1
+
+
+def test_other_replica_reads_shared_entry(server):
+    first, second = replica(server), replica(server)
+    first.get_or_build("get_servers", (None,), lambda: [{"id": 1}])
+    version, body = second.get_or_build("get_servers", (None,), lambda: pytest.fail("should be a Redis hit"))
+    assert body == b'[{"id":1}]'
+    assert second.shared.stats()["hits"] == 1
+
+
+def test_version_bump_invalidates(server):
+    writer, reader = replica(server), replica(server)
+    reader.shared.listen()
+    try:
+        reader.get_or_build("get_servers", (None,), lambda: [{"id": 1}])
+        writer.publish_version(1)
+        assert wait_for(lambda: reader.version.current() == 1)
+        assert reader.lru.stats()["entries"] == 0
+        _, body = reader.get_or_build("get_servers", (None,), lambda: [{"id": 2}])
+        assert body == b'[{"id":2}]'
+    finally:
+        reader.shared.stop()
+
+
+def test_stale_announcement_does_not_move_version_back(server):
+    writer, reader = replica(server), replica(server)
+    seen = []
+    reader.version.subscribe(seen.append)
+    reader.shared.listen()
+    try:
+        assert wait_for(lambda: subscribed(server, reader.shared))
+        writer.shared.publish_version(5)
+        fakeredis.FakeRedis(server=server).publish(reader.shared.channel, "4")
+        writer.shared.publish_version(6)
+        assert wait_for(lambda: reader.shared.stats()["invalidations_received"] == 3)
+        assert seen == [5, 6]
+    finally:
+        reader.shared.stop()
+
+
+def test_listener_catches_up_after_reconnecting(server):
+    writer, reader = replica(server), replica(server)
+    reader.shared.listen()
+    try:
+        assert wait_for(lambda: subscribed(server, reader.shared))
+        server.connected = False
+        assert wait_for(lambda: reader.shared.stats()["errors"] > 0)
+        # Published while the listener is not subscribed: only the stored version survives.
+        server.connected = True
+        writer.shared.publish_version(9)
+        assert wait_for(lambda: reader.version.current() == 9)
+    finally:
+        reader.shared.stop()
+
+
+def test_redis_down_builds_directly(server):
+    cache = replica(server)
+    server.connected = False
+    _, body = cache.get_or_build("get_servers", (None,), lambda: [{"id": 1}])
+    assert body == b'[{"id":1}]'
+    assert cache.shared.stats()["errors"] == 1